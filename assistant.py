@@ -3,17 +3,27 @@ Orchestrator agent: routes user requests, uses tools, and maintains conversation
 """
 
 import anthropic
+import asyncio
 import os
+import time
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack
 from datetime import date
 from rich.console import Console
 from rich.markdown import Markdown
 
-from tools import get_tools, execute_tool
+from tools import get_tools, execute_tools, execute_tools_async, llm, memory_index
+from tools.compaction import compact_history, compact_history_async
+from tools.prompt_cache import cached_system, cached_tools, record_usage, with_history_breakpoint
 
 console = Console()
 _client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+# Shares the server-wide connection pool; streams keep the SDK's own retries
+_async_client = llm.client().with_options(max_retries=2)
 
-SYSTEM_PROMPT = """You are a highly capable personal assistant. Today's date is {today}.
+# Kept free of per-request values so it stays byte-identical and cacheable;
+# the date goes in a separate uncached system block (see _system()).
+SYSTEM_PROMPT = """You are a highly capable personal assistant.
 
 You have access to the following capabilities:
 - **Web search**: Look up current information, news, weather, and facts
@@ -26,28 +36,104 @@ You have access to the following capabilities:
 
 Guidelines:
 - Always check relevant data (calendar, reminders, memory) proactively when contextually useful
+- Memories relevant to the user's message are attached to it in <memory> tags; use recall only for anything not there
 - Be concise in responses but thorough when detail is needed
 - When given ambiguous dates, assume the nearest future occurrence
 - Store important user preferences using the remember tool
 - For research tasks requiring multiple searches, use the research_task sub-agent
 """
 
+DATE_PROMPT = "Today's date is {today}."
+
+# Appended to the user's message for this turn only (history stores the
+# message without it) and kept after the history breakpoint, so the cached
+# prefix matches what the next turn sends.
+MEMORY_PROMPT = "<memory>\nFrom your memory of this user (may be relevant):\n{memories}\n</memory>"
+
+SUMMARY_PROMPT = "\n\nSummary of the earlier part of this conversation (older turns were compacted):\n{summary}"
+
+
+def _system(summary: str | None = None) -> list:
+    dynamic = DATE_PROMPT.format(today=date.today().isoformat())
+    if summary:
+        dynamic += SUMMARY_PROMPT.format(summary=summary)
+    return cached_system(SYSTEM_PROMPT, dynamic)
+
+
+def _memory_block(user_message: str) -> dict | None:
+    """Text block with the memories relevant to `user_message`, if any."""
+    try:
+        lines = memory_index.relevant(user_message)
+    except Exception as e:
+        print(f"[memory] Relevant memories lookup failed: {e}")
+        return None
+    if not lines:
+        return None
+    return {"type": "text", "text": MEMORY_PROMPT.format(memories="\n".join(lines))}
+
+
+def _with_memory(content, memory: dict | None):
+    """`content` for the API with the memory block after it."""
+    if memory is None:
+        return content
+    blocks = content if isinstance(content, list) else [{"type": "text", "text": content}]
+    return [*blocks, memory]
+
+
+class _TurnStats:
+    """Wall-clock bookkeeping for one user turn, logged when it ends."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.model_calls = 0
+        self.tool_calls = 0
+        self.tool_seconds = 0.0
+        self.tokens = {"input": 0, "cache_read": 0, "cache_write": 0, "output": 0}
+
+    def add_response(self, response) -> None:
+        self.model_calls += 1
+        for key, value in record_usage("orchestrator", response.usage).items():
+            self.tokens[key] += value
+
+    def add_tools(self, count: int, seconds: float) -> None:
+        self.tool_calls += count
+        self.tool_seconds += seconds
+
+    def time_tools(self, count: int, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.add_tools(count, time.perf_counter() - start)
+
+    def summary(self) -> str:
+        total = time.perf_counter() - self.start
+        t = self.tokens
+        return (
+            f"{total:.1f}s total — {self.model_calls} model calls, "
+            f"{self.tool_calls} tool calls in {self.tool_seconds:.1f}s — "
+            f"input tokens: {t['cache_read']} cached, {t['cache_write']} cache-written, "
+            f"{t['input']} uncached; {t['output']} output"
+        )
+
 
 def run_turn(user_message: str, history: list) -> tuple[str, list]:
     """
     Process one user turn. Returns the assistant's reply and the updated history.
     Uses an agentic loop to handle tool calls.
     """
-    system = SYSTEM_PROMPT.format(today=date.today().isoformat())
+    # Older turns beyond the token budget are folded into a cached summary
+    summary, context = compact_history(history)
+    system = _system(summary)
     history.append({"role": "user", "content": user_message})
 
     # Working copy of messages for the agentic loop
-    messages = [
-        {"role": m["role"], "content": m["content"]}
-        for m in history
-    ]
+    messages = [{"role": m["role"], "content": m["content"]} for m in context]
+    memory = _memory_block(user_message)
+    messages.append({"role": "user", "content": _with_memory(user_message, memory)})
 
     final_text = ""
+    stats = _TurnStats()
 
     while True:
         with console.status("[bold cyan]Thinking…[/]", spinner="dots"):
@@ -56,10 +142,11 @@ def run_turn(user_message: str, history: list) -> tuple[str, list]:
                 max_tokens=16000,
                 thinking={"type": "adaptive"},
                 system=system,
-                tools=get_tools(),
-                messages=messages,
+                tools=cached_tools(get_tools()),
+                messages=with_history_breakpoint(messages, memory),
             ) as stream:
                 response = stream.get_final_message()
+        stats.add_response(response)
 
         # Collect text from this response
         turn_text = ""
@@ -78,28 +165,34 @@ def run_turn(user_message: str, history: list) -> tuple[str, list]:
                 "role": "assistant",
                 "content": final_text or "(no text response)",
             })
+            console.print(f"[dim]  ({stats.summary()})[/]")
             return final_text, history
 
         if response.stop_reason == "tool_use":
             # Include full content (with thinking blocks) in the loop messages
             messages.append({"role": "assistant", "content": response.content})
 
+            blocks = [block for block in response.content if block.type == "tool_use"]
+            for block in blocks:
+                console.print(
+                    f"[dim]  ↳ tool: [bold]{block.name}[/bold][/]"
+                )
+            with console.status("[bold cyan]Running tools…[/]", spinner="dots"):
+                results = stats.time_tools(
+                    len(blocks), execute_tools, [(b.name, dict(b.input)) for b in blocks]
+                )
+
             tool_results = []
-            for block in response.content:
-                if block.type == "tool_use":
-                    console.print(
-                        f"[dim]  ↳ tool: [bold]{block.name}[/bold][/]"
-                    )
-                    result = execute_tool(block.name, dict(block.input))
-                    preview = str(result)[:120].replace("\n", " ")
-                    if len(str(result)) > 120:
-                        preview += "…"
-                    console.print(f"[dim]    ← {preview}[/]")
-                    tool_results.append({
-                        "type": "tool_result",
-                        "tool_use_id": block.id,
-                        "content": str(result),
-                    })
+            for block, result in zip(blocks, results):
+                preview = str(result)[:120].replace("\n", " ")
+                if len(str(result)) > 120:
+                    preview += "…"
+                console.print(f"[dim]    ← {block.name}: {preview}[/]")
+                tool_results.append({
+                    "type": "tool_result",
+                    "tool_use_id": block.id,
+                    "content": str(result),
+                })
 
             messages.append({"role": "user", "content": tool_results})
 
@@ -117,39 +210,20 @@ def run_turn_headless(
     history: list,
     image_base64: str | None = None,
     image_mime_type: str | None = "image/jpeg",
+    conversation_id: str | None = None,
 ) -> tuple[str, list]:
     """
     API-friendly version of run_turn — no Rich console output.
     history: list of {"role": "user"|"assistant", "content": str}
     Returns: (reply_text, updated_history)
     """
-    system = SYSTEM_PROMPT.format(today=date.today().isoformat())
-    history = list(history)
-
-    # Build user content — multi-modal if image is present
-    if image_base64:
-        user_content = [
-            {
-                "type": "image",
-                "source": {
-                    "type": "base64",
-                    "media_type": image_mime_type or "image/jpeg",
-                    "data": image_base64,
-                },
-            },
-            {"type": "text", "text": user_message},
-        ]
-    else:
-        user_content = user_message
-
-    # Store text-only in persistent history (images are one-turn only)
-    history.append({"role": "user", "content": user_message})
-
-    # For the actual API call, use multi-modal content on the last turn
-    messages = [{"role": m["role"], "content": m["content"]} for m in history[:-1]]
-    messages.append({"role": "user", "content": user_content})
+    summary, context = compact_history(history, conversation_id)
+    system = _system(summary)
+    memory = _memory_block(user_message)
+    history, messages = _build_messages(user_message, history, context, memory, image_base64, image_mime_type)
 
     final_text = ""
+    stats = _TurnStats()
 
     while True:
         with _client.messages.stream(
@@ -157,10 +231,11 @@ def run_turn_headless(
             max_tokens=16000,
             thinking={"type": "adaptive"},
             system=system,
-            tools=get_tools(),
-            messages=messages,
+            tools=cached_tools(get_tools()),
+            messages=with_history_breakpoint(messages, memory),
         ) as stream:
             response = stream.get_final_message()
+        stats.add_response(response)
 
         turn_text = "".join(
             block.text for block in response.content if hasattr(block, "text")
@@ -170,20 +245,149 @@ def run_turn_headless(
 
         if response.stop_reason == "end_turn":
             history.append({"role": "assistant", "content": final_text or "(no response)"})
+            print(f"[turn] {stats.summary()}")
             return final_text, history
 
         if response.stop_reason == "tool_use":
             messages.append({"role": "assistant", "content": response.content})
-            tool_results = []
-            for block in response.content:
-                if block.type == "tool_use":
-                    result = execute_tool(block.name, dict(block.input))
-                    tool_results.append({
-                        "type": "tool_result",
-                        "tool_use_id": block.id,
-                        "content": str(result),
-                    })
-            messages.append({"role": "user", "content": tool_results})
+            blocks = [block for block in response.content if block.type == "tool_use"]
+            results = stats.time_tools(
+                len(blocks), execute_tools, [(b.name, dict(b.input)) for b in blocks]
+            )
+            messages.append({"role": "user", "content": [
+                {"type": "tool_result", "tool_use_id": b.id, "content": str(r)}
+                for b, r in zip(blocks, results)
+            ]})
         else:
             history.append({"role": "assistant", "content": final_text or "(stopped)"})
             return final_text, history
+
+
+async def stream_turn(
+    user_message: str,
+    history: list,
+    image_base64: str | None = None,
+    image_mime_type: str | None = "image/jpeg",
+    conversation_id: str | None = None,
+) -> AsyncIterator[dict]:
+    """
+    Async agent loop that yields events as they happen:
+      {"type": "text", "text": delta}
+      {"type": "tool_start", "id", "name", "input"}
+      {"type": "tool_result", "id", "name", "content"}
+      {"type": "done", "reply", "history"}   (always last)
+    Model calls never block a thread; only the sync tool functions run in one.
+    """
+    summary, context = await compact_history_async(history, conversation_id)
+    system = _system(summary)
+    # The memory lookup reads the index under a lock and may rebuild it; keep it off the loop
+    memory = await asyncio.to_thread(_memory_block, user_message)
+    history, messages = _build_messages(user_message, history, context, memory, image_base64, image_mime_type)
+
+    final_text = ""
+    stats = _TurnStats()
+
+    while True:
+        async with AsyncExitStack() as stack:
+            # The slot limits concurrent requests, not how long a client takes to read
+            async with llm.slot("claude-opus-4-6"):
+                stream = await stack.enter_async_context(_async_client.messages.stream(
+                    model="claude-opus-4-6",
+                    max_tokens=16000,
+                    thinking={"type": "adaptive"},
+                    system=system,
+                    tools=cached_tools(get_tools()),
+                    messages=with_history_breakpoint(messages, memory),
+                ))
+            async for event in stream:
+                if event.type == "text":
+                    yield {"type": "text", "text": event.text}
+            response = await stream.get_final_message()
+        stats.add_response(response)
+
+        turn_text = "".join(
+            block.text for block in response.content if hasattr(block, "text")
+        )
+        if turn_text:
+            final_text = turn_text
+
+        if response.stop_reason == "end_turn":
+            history.append({"role": "assistant", "content": final_text or "(no response)"})
+            print(f"[turn] {stats.summary()}")
+            yield {"type": "done", "reply": final_text, "history": history}
+            return
+
+        if response.stop_reason == "tool_use":
+            messages.append({"role": "assistant", "content": response.content})
+            blocks = [block for block in response.content if block.type == "tool_use"]
+            for block in blocks:
+                yield {"type": "tool_start", "id": block.id, "name": block.name, "input": dict(block.input)}
+            tools_start = time.perf_counter()
+            results = await execute_tools_async([(b.name, dict(b.input)) for b in blocks])
+            stats.add_tools(len(blocks), time.perf_counter() - tools_start)
+            for block, result in zip(blocks, results):
+                yield {"type": "tool_result", "id": block.id, "name": block.name, "content": str(result)}
+            messages.append({"role": "user", "content": [
+                {"type": "tool_result", "tool_use_id": b.id, "content": str(r)}
+                for b, r in zip(blocks, results)
+            ]})
+        else:
+            history.append({"role": "assistant", "content": final_text or "(stopped)"})
+            yield {"type": "done", "reply": final_text, "history": history}
+            return
+
+
+async def run_turn_async(
+    user_message: str,
+    history: list,
+    image_base64: str | None = None,
+    image_mime_type: str | None = "image/jpeg",
+    conversation_id: str | None = None,
+) -> tuple[str, list]:
+    """Async equivalent of run_turn_headless. Returns: (reply_text, updated_history)"""
+    async for event in stream_turn(user_message, history, image_base64, image_mime_type, conversation_id):
+        if event["type"] == "done":
+            return event["reply"], event["history"]
+    raise RuntimeError("agent loop ended without a final message")
+
+
+def _build_messages(
+    user_message: str,
+    history: list,
+    context: list,
+    memory: dict | None,
+    image_base64: str | None,
+    image_mime_type: str | None,
+) -> tuple[list, list]:
+    """Return (persistent text-only history, API messages for this turn).
+
+    `context` is the (possibly compacted) prior history actually sent to the
+    model; the returned history always keeps every turn. The memory block
+    from _memory_block (or None) ends the last message and belongs behind
+    the history breakpoint.
+    """
+    history = list(history)
+
+    # Build user content — multi-modal if image is present
+    if image_base64:
+        user_content = [
+            {
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": image_mime_type or "image/jpeg",
+                    "data": image_base64,
+                },
+            },
+            {"type": "text", "text": user_message},
+        ]
+    else:
+        user_content = user_message
+
+    # Store text-only in persistent history (images are one-turn only)
+    history.append({"role": "user", "content": user_message})
+
+    # For the actual API call, use multi-modal content on the last turn
+    messages = [{"role": m["role"], "content": m["content"]} for m in context]
+    messages.append({"role": "user", "content": _with_memory(user_content, memory)})
+    return history, messages
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Latency and reconnect check for the IMAP IDLE watcher against a local stand-in.
+
+Starts a minimal plain-TCP IMAP server (LOGIN / SELECT / UID SEARCH / IDLE /
+LOGOUT), points an IdleWatcher at it and measures:
+
+  * delivery latency — message appended on the server → watcher's handler
+    sees the new UID, while the connection sits in IDLE
+  * reconnect — the server drops every connection, a message arrives while
+    the watcher is offline, and the catch-up after reconnecting picks it up
+
+    python benchmarks/imap_idle_standin.py --messages 20
+"""
+
+import argparse
+import imaplib
+import os
+import socket
+import socketserver
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import imap_idle                     # noqa: E402
+from imap_idle import IdleWatcher   # noqa: E402
+
+
+class StandInIMAP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.uids: list[int] = []
+        self.lock = threading.Lock()
+        self.handlers: set["_Handler"] = set()
+
+    def deliver(self) -> int:
+        with self.lock:
+            uid = (self.uids[-1] if self.uids else 0) + 1
+            self.uids.append(uid)
+            idlers = [h for h in self.handlers if h.idling]
+        for h in idlers:
+            h.write(f"* {len(self.uids)} EXISTS")
+        return uid
+
+    def drop_all(self) -> None:
+        with self.lock:
+            handlers = list(self.handlers)
+        for h in handlers:
+            try:
+                h.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.idling = False
+        self.wlock = threading.Lock()
+        with self.server.lock:
+            self.server.handlers.add(self)
+
+    def finish(self):
+        with self.server.lock:
+            self.server.handlers.discard(self)
+        try:
+            super().finish()
+        except OSError:
+            pass
+
+    def write(self, line: str) -> None:
+        with self.wlock:
+            try:
+                self.wfile.write(line.encode() + b"\r\n")
+                self.wfile.flush()
+            except OSError:
+                pass
+
+    def handle(self):
+        self.write("* OK stand-in ready")
+        try:
+            for raw in self.rfile:
+                parts = raw.decode().strip().split()
+                if not parts:
+                    continue
+                tag, cmd = parts[0], parts[1].upper() if len(parts) > 1 else ""
+                if cmd == "CAPABILITY":
+                    self.write("* CAPABILITY IMAP4rev1 IDLE")
+                elif cmd == "SELECT":
+                    self.write(f"* {len(self.server.uids)} EXISTS")
+                    self.write("* OK [UIDVALIDITY 1] ok")
+                elif cmd == "UID" and parts[2].upper() == "SEARCH":
+                    start = int(parts[4].split(":")[0]) if len(parts) > 4 else 1
+                    with self.server.lock:
+                        uids = [u for u in self.server.uids if u >= start] or self.server.uids[-1:]
+                    self.write("* SEARCH " + " ".join(map(str, uids)))
+                elif cmd == "IDLE":
+                    self.idling = True
+                    self.write("+ idling")
+                    done = self.rfile.readline()
+                    self.idling = False
+                    if not done:
+                        return
+                elif cmd == "LOGOUT":
+                    self.write("* BYE")
+                    self.write(f"{tag} OK")
+                    return
+                self.write(f"{tag} OK {cmd} completed")
+        except OSError:
+            pass
+
+
+def main(messages: int) -> int:
+    server = StandInIMAP()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+
+    watermark = {"uid": 0}
+    seen: dict[int, float] = {}
+    arrived = threading.Condition()
+
+    def connect():
+        imap = imaplib.IMAP4(host, port)
+        imap.login("user", "pass")
+        imap.select("INBOX")
+        return imap
+
+    def on_new(imap):
+        _, data = imap.uid("search", None, f"UID {watermark['uid'] + 1}:*")
+        now = time.perf_counter()
+        with arrived:
+            for uid in map(int, data[0].split()):
+                if uid > watermark["uid"]:
+                    seen[uid] = now
+                    watermark["uid"] = uid
+            arrived.notify_all()
+
+    def wait_for(uid: int, timeout: float = 30) -> float | None:
+        with arrived:
+            arrived.wait_for(lambda: uid in seen, timeout)
+        return seen.get(uid)
+
+    imap_idle.BACKOFF_MIN = 0.5
+    watcher = IdleWatcher("standin", connect, on_new, refresh=60)
+    watcher.start()
+    while not watcher.connected:
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+    latencies = []
+    for _ in range(messages):
+        sent = time.perf_counter()
+        uid = server.deliver()
+        got = wait_for(uid)
+        if got is None:
+            print(f"uid {uid}: not seen within 30s")
+            return 1
+        latencies.append((got - sent) * 1000)
+        time.sleep(0.05)
+    print(f"IDLE delivery latency over {messages} messages: "
+          f"median {statistics.median(latencies):.1f} ms, max {max(latencies):.1f} ms")
+
+    sent = time.perf_counter()
+    server.drop_all()
+    uid = server.deliver()  # arrives while the watcher is offline
+    got = wait_for(uid)
+    if got is None:
+        print("message delivered during the outage was never picked up")
+        return 1
+    print(f"Reconnect + catch-up: {(got - sent):.2f} s "
+          f"({watcher.reconnects} reconnect(s), connected={watcher.connected})")
+
+    watcher.stop()
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20)
+    args = parser.parse_args()
+    sys.exit(main(args.messages))
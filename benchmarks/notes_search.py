@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Benchmark list_notes search: the old full scan vs. the notes index.
+
+Generates synthetic notes (Zipf-distributed vocabulary, a few tags each) in
+a throwaway data dir, builds the index, then times typical queries and
+incremental create/update/delete:
+
+    python benchmarks/notes_search.py --notes 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+SYLLABLES = [c + v for c in "bdfgklmnprstvz" for v in "aeiou"]
+
+
+def _corpus(n: int, rng: random.Random) -> tuple[list[dict], list[str]]:
+    """n notes over a Zipf-distributed vocabulary of pronounceable pseudo-words."""
+    vocab = list(dict.fromkeys(
+        "".join(rng.choices(SYLLABLES, k=rng.randint(1, 4))) for _ in range(30000)
+    ))[:20000]
+    weights = [1 / (i + 1) for i in range(len(vocab))]
+    tags = [f"tag{i}" for i in range(50)]
+    notes = []
+    for _ in range(n):
+        words = rng.choices(vocab, weights, k=rng.randint(40, 160))
+        notes.append({
+            "id": uuid.uuid4().hex[:8],
+            "title": " ".join(words[:5]),
+            "content": " ".join(words[5:]),
+            "tags": rng.sample(tags, k=rng.randint(0, 3)),
+            "created_at": "2026-01-01T00:00:00",
+            "updated_at": "2026-01-01T00:00:00",
+        })
+    return notes, vocab
+
+
+def _queries(vocab: list[str]) -> list[tuple[str, str | None, str | None]]:
+    return [
+        ("common word", vocab[2], None),
+        ("rare word", vocab[4000], None),
+        ("two words", f"{vocab[12]} {vocab[57]}", None),
+        ("prefix", vocab[99][:4], None),
+        ("1-char prefix", vocab[0][:1], None),
+        ("tag only", None, "tag7"),
+        ("word + tag", vocab[20], "tag3"),
+    ]
+
+
+def _scan(notes: list[dict], search: str | None, tag: str | None) -> list[dict]:
+    """list_notes' filter before the index."""
+    if tag:
+        notes = [n for n in notes if tag.lower() in [t.lower() for t in n.get("tags", [])]]
+    if search:
+        q = search.lower()
+        notes = [n for n in notes if q in n["title"].lower() or q in n["content"].lower()]
+    return notes
+
+
+def _time(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(n: int) -> None:
+    from tools import jsonstore, notes_index, notes_tool
+
+    rng = random.Random(n)
+    notes, vocab = _corpus(n, rng)
+    jsonstore.save(notes_tool.NOTES_FILE, {"notes": notes})
+    jsonstore.flush()
+
+    start = time.perf_counter()
+    notes_index.sync(notes, jsonstore.version(notes_tool.NOTES_FILE))
+    print(f"\n{n} notes — index built in {time.perf_counter() - start:.1f}s")
+
+    print(f"  {'query':<13} {'scan ms':>9} {'index ms':>9} {'list_notes ms':>14} {'hits':>6}")
+    for label, search, tag in _queries(vocab):
+        scan = _time(lambda: _scan(notes, search, tag))
+        index = _time(lambda: notes_index.search(search, tag))
+        tool = _time(lambda: notes_tool.list_notes(search=search, tag=tag))
+        hits = len(notes_index.search(search, tag))
+        print(f"  {label:<13} {scan:>9.1f} {index:>9.1f} {tool:>14.1f} {hits:>6}")
+
+    note = dict(notes[n // 2], content=" ".join(vocab[100:140]))
+    add = _time(lambda: notes_index.index_note(note))
+    remove = _time(lambda: (notes_index.remove_note(note["id"]), notes_index.index_note(note)))
+    print(f"  index update: re-index a note {add:.2f} ms, remove + add {remove:.2f} ms")
+    create = _time(lambda: notes_tool.create_note(vocab[1], " ".join(vocab[:60]), ["tag1"]), 3)
+    delete = _time(lambda: notes_tool.delete_note(notes[rng.randrange(n)]["id"]), 3)
+    print(f"  note tools (incl. the notes.json update): create {create:.0f} ms, delete {delete:.0f} ms")
+
+    start = time.perf_counter()
+    notes_index.snapshot()
+    saved = time.perf_counter() - start
+    start = time.perf_counter()
+    notes_index._Index.load(notes_index.SNAPSHOT_FILE.read_bytes())
+    print(f"  snapshot: {os.path.getsize(notes_index.SNAPSHOT_FILE) / 1e6:.0f} MB, "
+          f"saved in {saved:.1f}s, loaded in {time.perf_counter() - start:.1f}s")
+    jsonstore.flush()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATA_DIR"] = tmp  # before tools.config is imported
+        for n in args.notes:
+            run(n)  # each size replaces notes.json; the index rebuilds on sync
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
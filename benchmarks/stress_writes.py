@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Stress test for concurrent writers on the shared data files.
+
+Simulates a burst of webhook posts (Twilio/WhatsApp/Gmail poller/tool calls)
+hitting the same files from asyncio.to_thread workers, and checks that every
+record lands. Runs against a throwaway data dir:
+
+    python benchmarks/stress_writes.py --writers 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from store import Store          # noqa: E402
+from tools import jsonstore      # noqa: E402
+
+
+def _legacy_append(path: str, record: dict) -> None:
+    """The old unlocked read-modify-write, for comparison."""
+    records = []
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                records = json.load(f)
+        except ValueError:
+            records = []  # torn read of a half-written file
+    records.append(record)
+    with open(path, "w") as f:
+        json.dump(records, f, indent=2)
+
+
+def _jsonstore_append(path: str, record: dict) -> None:
+    with jsonstore.update(path, []) as records:
+        records.append(record)
+
+
+def _webhook(store: Store, record: dict) -> None:
+    store.add_pending_reply(record)
+    store.append_thread("sms", record["chat_id"], "user", record["original_message"])
+
+
+async def _burst(fn, n: int, *args) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        asyncio.to_thread(fn, *args, {"id": str(uuid.uuid4()), "chat_id": f"+1555{i % 7}",
+                                      "original_message": f"msg {i}", "status": "pending"})
+        for i in range(n)
+    ))
+    return time.perf_counter() - start
+
+
+async def main(n: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, "legacy.json")
+        elapsed = await _burst(_legacy_append, n, legacy)
+        try:
+            with open(legacy) as f:
+                kept = len(json.load(f))
+        except ValueError:
+            # The last unlocked writers can leave the file torn mid-dump
+            print(f"legacy open('w')   :     0/{n} records kept (file corrupted)  ({elapsed:.2f}s)")
+        else:
+            print(f"legacy open('w')   : {kept:>5}/{n} records kept, {n - kept} lost  ({elapsed:.2f}s)")
+
+        shared = os.path.join(tmp, "shared.json")
+        elapsed = await _burst(_jsonstore_append, n, shared)
+        jsonstore.flush()
+        with open(shared) as f:
+            kept_json = len(json.load(f))
+        print(f"jsonstore.update   : {kept_json:>5}/{n} records kept, {n - kept_json} lost  ({elapsed:.2f}s)")
+
+        store = Store(os.path.join(tmp, "assistant.db"))
+        elapsed = await _burst(_webhook, n, store)
+        kept_db = len(store.list_pending_replies())
+        print(f"sqlite Store       : {kept_db:>5}/{n} records kept, {n - kept_db} lost  ({elapsed:.2f}s)")
+
+    return 0 if kept_json == n and kept_db == n else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=500)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.writers)))
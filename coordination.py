@@ -0,0 +1,198 @@
+"""Leader election for scheduled jobs across uvicorn workers and replicas.
+
+Every process registers the same jobs (and long-running services such as
+the Gmail IDLE watchers), but each one runs only where its lease is held.
+Leases live in the shared SQLite store and are renewed by a heartbeat every
+COORD_HEARTBEAT seconds; a lease that isn't renewed within COORD_LEASE_TTL
+(crashed or stopped process) is taken over by another member. Members also
+heartbeat into a membership table, and each holds at most
+ceil(jobs / live members) leases, so adding workers spreads the job set
+across them rather than duplicating it.
+
+  scheduler.<job>.runtime / .lag   timings (lag: run start vs. first due time
+                                   since the previous run on any member)
+  scheduler.<job>.runs / .errors   counters
+  scheduler.<job>.missed           fire times that passed with no run at all
+  scheduler.members / .leases_held gauges
+"""
+
+import asyncio
+import hashlib
+import inspect
+import math
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Callable
+
+from store import Store
+from tools import metrics
+
+HEARTBEAT = float(os.environ.get("COORD_HEARTBEAT", "10"))
+LEASE_TTL = float(os.environ.get("COORD_LEASE_TTL", "30"))
+MAX_MISSED_SCAN = 1000  # fire times examined when counting missed runs
+
+
+async def _call(fn: Callable) -> None:
+    """Run a sync or async callable without blocking the loop on sync work."""
+    if inspect.iscoroutinefunction(fn):
+        await fn()
+    else:
+        result = await asyncio.to_thread(fn)
+        if inspect.isawaitable(result):
+            await result
+
+
+class Coordinator:
+    def __init__(self, store: Store, heartbeat: float = HEARTBEAT, ttl: float = LEASE_TTL):
+        self.store = store
+        self.heartbeat = heartbeat
+        self.ttl = ttl
+        self.member = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.members = 1
+        self._jobs: dict[str, tuple[Callable, str, dict]] = {}
+        self._services: dict[str, tuple[Callable, Callable]] = {}
+        self._held: dict[str, float] = {}   # lease name → expiry as last renewed
+        self._scheduler = None
+        self._task: asyncio.Task | None = None
+
+    # ── Registration ─────────────────────────────────────────────────────────
+
+    def job(self, name: str, fn: Callable, trigger: str, **trigger_args) -> None:
+        """Schedule `fn` like AsyncIOScheduler.add_job, but run it on one member only."""
+        self._jobs[name] = (fn, trigger, trigger_args)
+
+    def service(self, name: str, start: Callable, stop: Callable) -> None:
+        """Something that runs continuously on one member (start on lease win, stop on loss)."""
+        self._services[name] = (start, stop)
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    async def start(self, scheduler) -> None:
+        """Add the jobs to `scheduler`, take the first leases and start heartbeating."""
+        self._scheduler = scheduler
+        for name, (_, trigger, trigger_args) in self._jobs.items():
+            scheduler.add_job(self._runner(name), trigger, id=name, name=name, **trigger_args)
+        await self._rebalance()
+        self._task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self) -> None:
+        """Stop owned services and give up every lease so others take over at once."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        for name in list(self._held):
+            await self._lost(name)
+        await asyncio.to_thread(self.store.remove_member, self.member)
+
+    def status(self) -> dict:
+        return {
+            "member": self.member,
+            "members": self.members,
+            "held": sorted(self._held),
+            "leases": self.store.list_leases(),
+        }
+
+    # ── Leases ───────────────────────────────────────────────────────────────
+
+    def holds(self, name: str) -> bool:
+        return self._held.get(name, 0) > time.time()
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            try:
+                await self._rebalance()
+            except Exception as e:
+                print(f"[coord] Heartbeat failed: {e}")
+
+    async def _rebalance(self) -> None:
+        # Store calls go through worker threads: a busy database must not stall the loop
+        self.members = await asyncio.to_thread(self.store.heartbeat_member, self.member, self.ttl)
+        # Each member prefers a different order, so free leases spread out
+        names = sorted(
+            [*self._jobs, *self._services],
+            key=lambda n: hashlib.sha1(f"{self.member}:{n}".encode()).digest(),
+        )
+        share = math.ceil(len(names) / max(self.members, 1))
+
+        for name in [n for n in names if n in self._held]:
+            if await asyncio.to_thread(self.store.acquire_lease, name, self.member, self.ttl):
+                self._held[name] = time.time() + self.ttl
+            else:
+                await self._lost(name)
+
+        # A new member joined: hand back the least-preferred leases over our share
+        for name in [n for n in reversed(names) if n in self._held][:max(0, len(self._held) - share)]:
+            await asyncio.to_thread(self.store.release_lease, name, self.member)
+            await self._lost(name)
+
+        for name in names:
+            if len(self._held) >= share:
+                break
+            if name not in self._held and await asyncio.to_thread(
+                self.store.acquire_lease, name, self.member, self.ttl
+            ):
+                self._held[name] = time.time() + self.ttl
+                await self._won(name)
+
+        metrics.gauge("scheduler.members", self.members)
+        metrics.gauge("scheduler.leases_held", len(self._held))
+
+    async def _won(self, name: str) -> None:
+        print(f"[coord] {self.member} now runs {name}")
+        if name in self._services:
+            await _call(self._services[name][0])
+
+    async def _lost(self, name: str) -> None:
+        self._held.pop(name, None)
+        print(f"[coord] {self.member} gave up {name}")
+        if name in self._services:
+            try:
+                await _call(self._services[name][1])
+            except Exception as e:
+                print(f"[coord] Stopping {name} failed: {e}")
+
+    # ── Job runs ─────────────────────────────────────────────────────────────
+
+    def _runner(self, name: str):
+        async def run() -> None:
+            if not self.holds(name):
+                return
+            start = time.time()
+            await asyncio.to_thread(self._record_lag, name, start)
+            perf = time.perf_counter()
+            try:
+                await _call(self._jobs[name][0])
+                metrics.incr(f"scheduler.{name}.runs")
+            except Exception as e:
+                metrics.incr(f"scheduler.{name}.errors")
+                print(f"[coord] Job {name} failed: {e}")
+            finally:
+                metrics.observe(f"scheduler.{name}.runtime", time.perf_counter() - perf)
+                await asyncio.to_thread(self.store.set_value, f"job_last_run:{name}", start)
+        return run
+
+    def _record_lag(self, name: str, now: float) -> None:
+        """Compare this run with the fire times since the last run on any member."""
+        last = self.store.get_value(f"job_last_run:{name}")
+        job = self._scheduler.get_job(name) if self._scheduler else None
+        if last is None or job is None:
+            return
+        trigger = job.trigger
+        previous = datetime.fromtimestamp(last, trigger.timezone)
+        due = trigger.get_next_fire_time(previous, previous)
+        if due is None:
+            return
+        metrics.observe(f"scheduler.{name}.lag", max(0.0, now - due.timestamp()))
+        # This run serves the latest fire time; any earlier ones since `due` went unserved
+        passed, fire = 0, due
+        while fire is not None and fire.timestamp() <= now and passed < MAX_MISSED_SCAN:
+            passed += 1
+            fire = trigger.get_next_fire_time(fire, fire)
+        missed = max(0, passed - 1)
+        if missed:
+            metrics.incr(f"scheduler.{name}.missed", missed)
+            print(f"[coord] Job {name} missed {missed} run(s)")
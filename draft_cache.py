@@ -0,0 +1,93 @@
+"""Content-addressed cache for drafted replies.
+
+The same inbound message often gets drafted more than once: retried
+webhooks, the Mac companion re-reading messages after a restart,
+mailing-list duplicates. Drafts are keyed on a normalized hash of what the
+prompt is built from (kind, sender, subject, message, recent history), kept
+for DRAFT_CACHE_TTL seconds in a size-bounded LRU, and identical requests
+that arrive while one is still being drafted share its result instead of
+starting another model call.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from tools import metrics
+
+DRAFT_CACHE_TTL = float(os.environ.get("DRAFT_CACHE_TTL", "21600"))
+DRAFT_CACHE_SIZE = int(os.environ.get("DRAFT_CACHE_SIZE", "2000"))
+
+
+def _normalize(text: str | None) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def draft_key(kind: str, sender: str, message: str, subject: str | None = None,
+              history: list[dict] | None = None, source: str | None = None) -> str:
+    """Stable key for a draft request; whitespace and case don't matter."""
+    raw = json.dumps([
+        kind,
+        _normalize(source),
+        _normalize(sender),
+        _normalize(subject),
+        _normalize(message),
+        [[m["role"], _normalize(m["content"])] for m in history or []],
+    ])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class DraftCache:
+    def __init__(self, ttl: float = DRAFT_CACHE_TTL, max_entries: int = DRAFT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            metrics.incr("draft_cache.evictions")
+        metrics.gauge("draft_cache.size", len(self._entries))
+
+    async def get_or_create(self, key: str, create: Callable[[], Awaitable]):
+        """Cached value for `key`, else the result of `create()` (cached if truthy).
+
+        Concurrent callers with the same key await one shared `create()`.
+        """
+        value = self.get(key)
+        if value is not None:
+            metrics.incr("draft_cache.hits")
+            return value
+        task = self._inflight.get(key)
+        if task is not None:
+            metrics.incr("draft_cache.coalesced")
+        else:
+            metrics.incr("draft_cache.misses")
+            task = asyncio.ensure_future(create())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        # shield: a cancelled caller (e.g. a poll timeout) mustn't cancel the shared draft
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None and task.result():
+            self.put(key, task.result())
@@ -0,0 +1,182 @@
+"""Batched IMAP fetching: headers and text previews without downloading whole messages.
+
+`fetch()` issues one UID FETCH for a set of UIDs and parses the response
+(including literals) into per-UID dicts. `find_text_part()` walks a
+BODYSTRUCTURE to the first inline text/plain part (text/html for HTML-only
+mail), so only that part needs
+to be fetched (and only its first few KB, via a partial BODY.PEEK[n]<0.len>);
+attachments never cross the wire.
+"""
+
+import base64
+import binascii
+import html
+import imaplib
+import quopri
+import re
+from itertools import takewhile
+
+_TOKEN = re.compile(
+    rb'\s*(?:(?P<open>\()|(?P<close>\))|"(?P<quoted>(?:[^"\\]|\\.)*)"'
+    rb'|\{(?P<literal>\d+)\}'
+    rb'|(?P<atom>[^\s()"{}\[\]]+(?:\[[^\]]*\](?:<\d+>)?)?))'
+)
+
+
+def _lex(text: bytes):
+    pos = 0
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m or m.end() == pos:
+            break
+        pos = m.end()
+        if m.group("open"):
+            yield "("
+        elif m.group("close"):
+            yield ")"
+        elif m.group("quoted") is not None:
+            yield re.sub(rb"\\(.)", rb"\1", m.group("quoted"))
+        elif m.group("atom"):
+            atom = m.group("atom")
+            yield None if atom.upper() == b"NIL" else atom
+        # {n} markers are skipped: imaplib hands the literal over separately
+
+
+def _tokens(data: list):
+    for item in data:
+        if item is None:
+            continue
+        if isinstance(item, tuple):
+            text, literal = item
+            yield from _lex(text)
+            yield literal
+        else:
+            yield from _lex(item)
+
+
+def _parse(tokens) -> list:
+    stack: list[list] = [[]]
+    for token in tokens:
+        if token == "(":
+            stack.append([])
+        elif token == ")":
+            if len(stack) > 1:
+                done = stack.pop()
+                stack[-1].append(done)
+        else:
+            stack[-1].append(token)
+    return stack[0]
+
+
+def parse_fetch_response(data: list) -> dict[int, dict]:
+    """Map UID → {ITEM NAME: value} for an imaplib UID FETCH response."""
+    values = _parse(_tokens(data))
+    messages: dict[int, dict] = {}
+    for items in values:
+        if not isinstance(items, list):
+            continue  # the sequence number in front of each item list
+        fields = {
+            (key.decode(errors="replace").upper() if isinstance(key, bytes) else str(key)): value
+            for key, value in zip(items[::2], items[1::2])
+        }
+        if "UID" in fields:
+            messages[int(fields["UID"])] = fields
+    return messages
+
+
+def fetch(imap: imaplib.IMAP4, uids: list[int], items: str) -> dict[int, dict]:
+    """One UID FETCH for all of `uids`; raises on a non-OK response."""
+    if not uids:
+        return {}
+    status, data = imap.uid("fetch", ",".join(map(str, uids)), items)
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"UID FETCH failed: {data!r}")
+    return parse_fetch_response(data)
+
+
+def byte_batches(uids: list[int], size_of, budget: int):
+    """Split `uids` into runs whose summed size_of() stays within `budget` (min. one UID each)."""
+    batch, total = [], 0
+    for uid in uids:
+        size = size_of(uid)
+        if batch and total + size > budget:
+            yield batch
+            batch, total = [], 0
+        batch.append(uid)
+        total += size
+    if batch:
+        yield batch
+
+
+def body_item(fields: dict) -> bytes | None:
+    """The (first) BODY[...] value of a parsed message."""
+    for key, value in fields.items():
+        if key.startswith("BODY["):
+            return value if isinstance(value, bytes) else None
+    return None
+
+
+def _text(value) -> str:
+    return value.decode(errors="replace").lower() if isinstance(value, bytes) else ""
+
+
+def find_text_part(structure) -> dict | None:
+    """First non-attachment text/plain part of a BODYSTRUCTURE, else the first text/html one.
+
+    Returns {"section", "subtype", "encoding", "charset", "size"} or None.
+    """
+    return _find_part(structure, "plain") or _find_part(structure, "html")
+
+
+def _find_part(structure, subtype: str, section: str = "") -> dict | None:
+    if not isinstance(structure, list) or not structure:
+        return None
+    if isinstance(structure[0], list):  # multipart: child parts, then the subtype
+        for i, part in enumerate(takewhile(lambda p: isinstance(p, list), structure), 1):
+            found = _find_part(part, subtype, f"{section}.{i}" if section else str(i))
+            if found:
+                return found
+        return None
+    if (_text(structure[0]), _text(structure[1])) != ("text", subtype):
+        return None
+    disposition = structure[9] if len(structure) > 9 else None
+    if isinstance(disposition, list) and disposition and _text(disposition[0]) == "attachment":
+        return None
+    params = structure[2] if isinstance(structure[2], list) else []
+    charset = dict(zip(map(_text, params[::2]), map(_text, params[1::2]))).get("charset")
+    return {
+        "section": section or "1",
+        "subtype": subtype,
+        "encoding": _text(structure[5]),
+        "charset": charset or "utf-8",
+        "size": int(structure[6]) if structure[6] is not None else 0,
+    }
+
+
+def decode_part(raw: bytes, encoding: str, charset: str) -> str:
+    """Decode a (possibly truncated) transfer-encoded text part."""
+    if encoding == "base64":
+        compact = b"".join(raw.split())
+        try:
+            raw = base64.b64decode(compact[:len(compact) // 4 * 4])
+        except (binascii.Error, ValueError):
+            raw = b""
+    elif encoding == "quoted-printable":
+        raw = quopri.decodestring(raw)
+    try:
+        return raw.decode(charset, errors="replace")
+    except LookupError:
+        return raw.decode("utf-8", errors="replace")
+
+
+_HIDDEN = re.compile(r"<(script|style|head)\b.*?(?:</\1\s*>|$)", re.IGNORECASE | re.DOTALL)
+_BREAK = re.compile(r"<(?:br|/p|/div|/tr|/li|/h\d)\b[^>]*>", re.IGNORECASE)
+_TAG = re.compile(r"<[^>]*>?")
+
+
+def html_to_text(markup: str) -> str:
+    """Rough plain text of an HTML part (enough for a drafting preview)."""
+    text = _BREAK.sub("\n", _HIDDEN.sub("", markup))
+    text = html.unescape(_TAG.sub("", text)).replace("\xa0", " ")
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
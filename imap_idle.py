@@ -0,0 +1,183 @@
+"""Persistent IMAP IDLE watchers for the Gmail integration.
+
+Each account gets one daemon thread that keeps an authenticated connection
+open with INBOX selected and sits in IDLE (RFC 2177). When the server
+announces new mail (`* n EXISTS`) the thread leaves IDLE and hands the same
+connection to `on_new`, which fetches and queues the new messages, and then
+goes straight back to IDLE (after another `on_new` if more mail was
+announced while it ran). IDLE is re-issued every IDLE_REFRESH seconds
+(servers drop idle sessions after ~30 min, Gmail sooner). Dropped
+connections and login failures are retried with capped exponential backoff
+plus jitter; `on_new` also runs after every (re)connect to catch up on mail
+that arrived while disconnected.
+"""
+
+import imaplib
+import os
+import random
+import re
+import select
+import socket
+import threading
+import time
+from typing import Callable
+
+from tools import metrics
+
+IDLE_REFRESH = int(os.environ.get("IMAP_IDLE_REFRESH", "540"))
+BACKOFF_MIN = 1.0
+BACKOFF_MAX = float(os.environ.get("IMAP_BACKOFF_MAX", "300"))
+
+_EXISTS = re.compile(rb"^\* \d+ EXISTS", re.IGNORECASE)
+
+
+class _LineReader:
+    """Line reader straight off the socket, with a timeout and a stop check.
+
+    imaplib's own file object can't be used here: a socket timeout leaves it
+    permanently unreadable, so there would be no way to wake up to re-IDLE.
+    """
+
+    def __init__(self, sock, stopped: threading.Event):
+        self.sock = sock
+        self.stopped = stopped
+        self.buf = b""
+
+    def readline(self, timeout: float) -> bytes | None:
+        """Next line, or None on timeout / stop."""
+        deadline = time.monotonic() + timeout
+        while b"\n" not in self.buf:
+            # TLS may already hold decrypted bytes that select() can't see
+            if not (hasattr(self.sock, "pending") and self.sock.pending()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.stopped.is_set():
+                    return None
+                readable, _, _ = select.select([self.sock], [], [], min(remaining, 1.0))
+                if not readable:
+                    continue
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise imaplib.IMAP4.abort("connection closed by server")
+            self.buf += chunk
+        line, _, self.buf = self.buf.partition(b"\n")
+        return line + b"\n"
+
+
+class IdleWatcher:
+    """Keep one account in IDLE and call `on_new(imap)` whenever mail arrives.
+
+    `connect()` must return a logged-in IMAP4 connection with the mailbox
+    selected. `on_new` runs on the watcher thread with that connection.
+    """
+
+    def __init__(self, name: str, connect: Callable[[], imaplib.IMAP4],
+                 on_new: Callable[[imaplib.IMAP4], None], refresh: float = IDLE_REFRESH):
+        self.name = name
+        self.connect = connect
+        self.on_new = on_new
+        self.refresh = refresh
+        self.connected = False
+        self.reconnects = 0
+        self._stopped = threading.Event()
+        self._imap: imaplib.IMAP4 | None = None
+        self._thread = threading.Thread(target=self._run, name=f"imap-idle-{name}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        imap = self._imap
+        if imap is not None:
+            try:
+                imap.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._thread.join(timeout=5)
+
+    def _set_connected(self, connected: bool) -> None:
+        self.connected = connected
+        metrics.gauge(f"gmail.{self.name}.idle_connected", int(connected))
+
+    def _run(self) -> None:
+        backoff = BACKOFF_MIN
+        while not self._stopped.is_set():
+            try:
+                self._imap = self.connect()
+                # DONE and the follow-up FETCH are tiny writes; don't let Nagle hold them back
+                self._imap.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self._set_connected(True)
+                backoff = BACKOFF_MIN
+                print(f"[imap:{self.name}] Connected, entering IDLE")
+                new_mail = True  # catch up on anything missed while offline
+                while not self._stopped.is_set():
+                    if new_mail:
+                        self._imap.untagged_responses.pop("EXISTS", None)
+                        self.on_new(self._imap)
+                    # EXISTS announced while on_new's commands ran (or left over
+                    # from a refresh) is only seen by imaplib; fetch again first
+                    if self._imap.untagged_responses.pop("EXISTS", None):
+                        new_mail = True
+                        continue
+                    new_mail = self._idle(self._imap)
+            except (imaplib.IMAP4.error, OSError) as e:
+                if self._stopped.is_set():
+                    break
+                self.reconnects += 1
+                metrics.incr(f"gmail.{self.name}.idle_reconnects")
+                delay = random.uniform(backoff / 2, backoff)
+                print(f"[imap:{self.name}] {type(e).__name__}: {e} — reconnecting in {delay:.1f}s")
+                backoff = min(backoff * 2, BACKOFF_MAX)
+            except Exception as e:
+                # on_new failures shouldn't kill the watcher; back off and retry
+                delay = random.uniform(backoff / 2, backoff)
+                print(f"[imap:{self.name}] Handler error: {e} — retrying in {delay:.1f}s")
+                backoff = min(backoff * 2, BACKOFF_MAX)
+            else:
+                delay = 0
+            finally:
+                self._set_connected(False)
+                self._close()
+            self._stopped.wait(delay)
+
+    def _idle(self, imap: imaplib.IMAP4) -> bool:
+        """One IDLE cycle. True if new mail arrived, False on refresh/stop."""
+        reader = _LineReader(imap.sock, self._stopped)
+        tag = imap._new_tag()
+        imap.send(tag + b" IDLE\r\n")
+        line = reader.readline(30)
+        if line is None or not line.startswith(b"+"):
+            raise imaplib.IMAP4.abort(f"IDLE not accepted: {line!r}")
+
+        new_mail = False
+        deadline = time.monotonic() + self.refresh
+        while not self._stopped.is_set():
+            line = reader.readline(max(0.0, deadline - time.monotonic()))
+            if line is None:
+                break
+            if line.startswith(b"* BYE"):
+                raise imaplib.IMAP4.abort(line.decode(errors="replace").strip())
+            if _EXISTS.match(line):
+                new_mail = True
+                break
+
+        imap.send(b"DONE\r\n")
+        while True:
+            line = reader.readline(30)
+            if line is None:
+                raise imaplib.IMAP4.abort("no response to DONE")
+            if _EXISTS.match(line):
+                new_mail = True  # arrived while leaving IDLE for a refresh
+            elif line.startswith(tag):
+                if line.split()[1:2] != [b"OK"]:
+                    raise imaplib.IMAP4.abort(line.decode(errors="replace").strip())
+                return new_mail
+
+    def _close(self) -> None:
+        imap, self._imap = self._imap, None
+        if imap is None:
+            return
+        try:
+            imap.logout()
+        except Exception:
+            pass
@@ -0,0 +1,141 @@
+"""Durable background jobs for the API server.
+
+Webhooks and other request handlers `enqueue()` work into the SQLite job
+table and return straight away; a pool of JOB_WORKERS asyncio workers claims
+jobs, runs the registered handler and marks them done. A handler that raises
+is retried with capped exponential backoff plus jitter, up to JOB_MAX_ATTEMPTS,
+then left as `failed`. A job whose worker died mid-run (crash, deploy) is
+picked up again once its lease expires, so handlers must be safe to re-run.
+
+An idempotency key (e.g. Twilio's MessageSid) makes redelivered webhooks a
+no-op: the second enqueue with the same key is ignored. Store calls run in
+worker threads, so a busy database never blocks the event loop.
+
+  jobs.queued / jobs.running / jobs.failed   gauges (queue depth by status)
+  jobs.<kind>.wait / jobs.<kind>.runtime    timings
+  jobs.<kind>.done / .retries / .failed     counters
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import Awaitable, Callable
+
+from store import Store
+from tools import metrics
+
+WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "5"))
+LEASE = float(os.environ.get("JOB_LEASE", "300"))   # seconds a claimed job stays ours
+POLL_INTERVAL = 5.0       # idle workers re-check for retries and other replicas' jobs
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 300.0
+KEEP_FINISHED = 7 * 86400  # idempotency keys are remembered this long
+
+Handler = Callable[[dict, dict], Awaitable[None]]
+
+
+class JobQueue:
+    def __init__(self, store: Store, workers: int = WORKERS):
+        self.store = store
+        self.workers = workers
+        self._handlers: dict[str, Handler] = {}
+        self._wake: asyncio.Event | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def handler(self, kind: str):
+        """Decorator registering `async fn(payload, job)` for jobs of `kind`."""
+        def register(fn: Handler) -> Handler:
+            self._handlers[kind] = fn
+            return fn
+        return register
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; interrupted jobs are re-run after their lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ── Enqueue ──────────────────────────────────────────────────────────────
+
+    async def enqueue(self, kind: str, payload: dict, key: str | None = None,
+                      delay: float = 0) -> int | None:
+        """Persist a job and wake a worker. Returns the job id, or None for a duplicate key."""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind {kind!r}")
+        job_id = await asyncio.to_thread(
+            self.store.enqueue_job, kind, payload, key, time.time() + delay if delay else None
+        )
+        if job_id is None:
+            metrics.incr(f"jobs.{kind}.duplicates")
+            return None
+        await self._gauges()
+        if self._wake is not None:
+            self._wake.set()
+        return job_id
+
+    async def _gauges(self) -> None:
+        counts = await asyncio.to_thread(self.store.job_counts)
+        for status in ("queued", "running", "failed"):
+            metrics.gauge(f"jobs.{status}", counts.get(status, 0))
+
+    # ── Workers ──────────────────────────────────────────────────────────────
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim_job, LEASE)
+            except Exception as e:
+                print(f"[jobs] Worker {n} could not claim a job: {e}")
+                job = None
+            if job is None:
+                await self._idle()
+                continue
+            await self._run(job)
+
+    async def _idle(self) -> None:
+        next_at = await asyncio.to_thread(self.store.next_job_at)
+        timeout = POLL_INTERVAL if next_at is None else min(POLL_INTERVAL, max(0.0, next_at - time.time()))
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self, job: dict) -> None:
+        kind = job["kind"]
+        if job["attempts"] == 1:
+            metrics.observe(f"jobs.{kind}.wait", time.time() - job["created_at"])
+        await self._gauges()
+        start = time.perf_counter()
+        try:
+            await self._handlers[kind](job["payload"], job)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job["attempts"] < MAX_ATTEMPTS:
+                delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** job["attempts"]))
+                await asyncio.to_thread(self.store.finish_job, job["id"], error, time.time() + delay)
+                metrics.incr(f"jobs.{kind}.retries")
+                print(f"[jobs] {kind} #{job['id']} attempt {job['attempts']} failed ({error}); "
+                      f"retrying in {delay:.0f}s")
+            else:
+                await asyncio.to_thread(self.store.finish_job, job["id"], error)
+                metrics.incr(f"jobs.{kind}.failed")
+                print(f"[jobs] {kind} #{job['id']} failed after {job['attempts']} attempts: {error}")
+        else:
+            await asyncio.to_thread(self.store.finish_job, job["id"])
+            metrics.incr(f"jobs.{kind}.done")
+        metrics.observe(f"jobs.{kind}.runtime", time.perf_counter() - start)
+        await self._gauges()
+
+    async def purge(self) -> int:
+        """Forget jobs finished more than KEEP_FINISHED seconds ago."""
+        return await asyncio.to_thread(self.store.purge_jobs, time.time() - KEEP_FINISHED)
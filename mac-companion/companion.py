@@ -4,6 +4,7 @@ Email polling is handled by the backend (server.py Gmail IMAP poller).
 Email sending is done directly via smtplib using credentials from the backend."""
 
 import email as email_lib
+import json
 import os
 import re
 import smtplib
@@ -20,11 +21,14 @@ BACKEND_URL = os.environ.get("ROAR_BACKEND_URL", "http://localhost:8000")
 CHAT_DB = os.path.expanduser("~/Library/Messages/chat.db")
 POLL_MESSAGES_INTERVAL = 3    # seconds
 POLL_EMAIL_INTERVAL    = 30   # seconds
-POLL_APPROVED_INTERVAL = 5    # seconds
+POLL_APPROVED_INTERVAL = 5    # seconds, while the event stream is down
+POLL_APPROVED_FALLBACK = 60   # seconds, safety sweep while the stream is up
+STREAM_RETRY_INTERVAL  = 5    # seconds before reconnecting the event stream
 HISTORY_CONTEXT        = 10   # iMessage history to include
 
 sent_ids: set[str] = set()
 sent_lock = threading.Lock()
+stream_up = threading.Event()
 
 
 # ── SQLite helpers (iMessage) ──────────────────────────────────────────────────
@@ -296,11 +300,25 @@ def send_push(title: str, body: str, data: dict | None = None) -> None:
         print(f"[companion] /push-notify error: {e}")
 
 
-def get_pending_replies() -> list[dict]:
+_pending_cache: dict = {"etag": None, "records": []}
+
+
+def get_approved_replies() -> list[dict]:
+    """Approved replies awaiting dispatch, reusing the last body when the server answers 304."""
+    headers = {"If-None-Match": _pending_cache["etag"]} if _pending_cache["etag"] else {}
     try:
-        resp = requests.get(f"{BACKEND_URL}/pending-replies", timeout=10)
+        resp = requests.get(
+            f"{BACKEND_URL}/pending-replies",
+            params={"status": "approved", "limit": 200},
+            headers=headers,
+            timeout=10,
+        )
+        if resp.status_code == 304:
+            return _pending_cache["records"]
         resp.raise_for_status()
-        return resp.json()
+        _pending_cache["etag"] = resp.headers.get("ETag")
+        _pending_cache["records"] = resp.json()["items"]
+        return _pending_cache["records"]
     except Exception as e:
         print(f"[companion] /pending-replies error: {e}")
         return []
@@ -434,46 +452,100 @@ def email_watcher():
 
 # ── Thread 3 — Approved reply sender ─────────────────────────────────────────
 
-def approved_sender():
-    print("[companion] Approved reply sender started")
+def dispatch_approved(record: dict) -> None:
+    """Send one approved reply; safe to call from both the stream and the poller."""
+    reply_id = record["id"]
+    source   = record.get("source") or "imessage"
+    if source not in ("imessage", "email"):
+        return  # SMS and WhatsApp are sent by the server when approved
+
+    with sent_lock:
+        if reply_id in sent_ids:
+            return
+        sent_ids.add(reply_id)
+
+    approved_text = record.get("approved_text") or record.get("draft_reply", "")
+
+    if source == "email":
+        sender_email  = record.get("sender_email", "")
+        sender_name   = record.get("sender_name", "")
+        subject       = record.get("subject", "")
+        gmail_account = record.get("gmail_account", "")
+        print(f"[companion] Sending email reply to {sender_email}: {approved_text[:60]}")
+        ok = send_email_via_smtp(gmail_account, sender_email, sender_name, subject, approved_text)
+    else:
+        chat_id       = record.get("chat_id", "")
+        sender_handle = record.get("sender_handle", "")
+        print(f"[companion] Sending iMessage reply for {reply_id}: {approved_text[:60]}")
+        ok = send_imessage_via_applescript(chat_id, sender_handle, approved_text)
+
+    if ok:
+        dismiss_reply(reply_id)
+    else:
+        # Left approved on the server; the next poll retries it
+        with sent_lock:
+            sent_ids.discard(reply_id)
+
+
+def approved_stream():
+    """Dispatch approvals the moment they happen via /pending-replies/events.
+
+    Reconnects with Last-Event-ID so nothing approved while disconnected is
+    lost; the poller below covers the gaps when the stream can't be opened.
+    """
+    print("[companion] Approved reply stream started")
+    last_seq = None
     while True:
+        headers = {"Accept": "text/event-stream"}
+        if last_seq is not None:
+            headers["Last-Event-ID"] = str(last_seq)
         try:
-            records = get_pending_replies()
-            approved = [r for r in records if r.get("status") == "approved"]
-
-            for record in approved:
-                reply_id = record["id"]
-                with sent_lock:
-                    if reply_id in sent_ids:
+            with requests.get(
+                f"{BACKEND_URL}/pending-replies/events",
+                headers=headers,
+                stream=True,
+                timeout=(10, 60),  # read timeout > the server's 15s keepalive
+            ) as resp:
+                resp.raise_for_status()
+                event, data, event_id = None, [], None
+                for line in resp.iter_lines(decode_unicode=True):
+                    if line:
+                        field, _, value = line.partition(":")
+                        value = value[1:] if value.startswith(" ") else value
+                        if field == "event":
+                            event = value
+                        elif field == "data":
+                            data.append(value)
+                        elif field == "id":
+                            event_id = value
                         continue
-                    sent_ids.add(reply_id)
-
-                approved_text = record.get("approved_text") or record.get("draft_reply", "")
-                source        = record.get("source", "imessage")
-
-                if source == "email":
-                    sender_email  = record.get("sender_email", "")
-                    sender_name   = record.get("sender_name", "")
-                    subject       = record.get("subject", "")
-                    gmail_account = record.get("gmail_account", "")
-                    print(f"[companion] Sending email reply to {sender_email}: {approved_text[:60]}")
-                    ok = send_email_via_smtp(gmail_account, sender_email, sender_name, subject, approved_text)
-                else:
-                    chat_id       = record.get("chat_id", "")
-                    sender_handle = record.get("sender_handle", "")
-                    print(f"[companion] Sending iMessage reply for {reply_id}: {approved_text[:60]}")
-                    ok = send_imessage_via_applescript(chat_id, sender_handle, approved_text)
-
-                if ok:
-                    dismiss_reply(reply_id)
-                else:
-                    with sent_lock:
-                        sent_ids.discard(reply_id)
+                    # Blank line ends an event
+                    if event == "ready":
+                        last_seq = last_seq if last_seq is not None else json.loads("\n".join(data))["seq"]
+                        stream_up.set()
+                    elif event and data:
+                        record = json.loads("\n".join(data))
+                        if record.get("status") == "approved":
+                            dispatch_approved(record)
+                    if event_id is not None:
+                        last_seq = int(event_id)
+                    event, data, event_id = None, [], None
+        except Exception as e:
+            print(f"[companion] event stream error: {e}")
+        stream_up.clear()
+        time.sleep(STREAM_RETRY_INTERVAL)
 
+
+def approved_sender():
+    print("[companion] Approved reply sender started")
+    while True:
+        try:
+            for record in get_approved_replies():
+                dispatch_approved(record)
         except Exception as e:
             print(f"[companion] sender error: {e}")
 
-        time.sleep(POLL_APPROVED_INTERVAL)
+        time.sleep(POLL_APPROVED_FALLBACK if stream_up.is_set() else POLL_APPROVED_INTERVAL)
 
 
 # ── Main ───────────────────────────────────────────────────────────────────────
@@ -486,8 +558,10 @@ if __name__ == "__main__":
     # Companion only needs iMessage watching + approved-reply dispatch.
     t1 = threading.Thread(target=message_watcher, daemon=True)
     t3 = threading.Thread(target=approved_sender, daemon=True)
+    t4 = threading.Thread(target=approved_stream, daemon=True)
     t1.start()
     t3.start()
+    t4.start()
 
     try:
         while True:
@@ -16,7 +16,7 @@ import * as Linking from "expo-linking";
 import * as Notifications from "expo-notifications";
 
 import { Message, HistoryItem } from "./src/types";
-import { sendMessage, registerDevice } from "./src/api";
+import { sendSessionMessage, registerDevice } from "./src/api";
 import { updateWidgetLastMessage } from "./modules/shared-defaults";
 import { donateSarvisShortcut, addSarvisShortcutListener } from "./src/utils/shortcut";
 import { saveConversation, loadConversation } from "./src/utils/storage";
@@ -97,6 +97,8 @@ const typingStyles = StyleSheet.create({
 export default function App() {
   const [messages, setMessages] = useState<Message[]>([]);
   const [apiHistory, setApiHistory] = useState<HistoryItem[]>([]);
+  // Server-side session for the current conversation (history stays local too, for saving)
+  const [sessionId, setSessionId] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
   const [backendUrl, setBackendUrl] = useState("");
   const [showSettings, setShowSettings] = useState(false);
@@ -219,11 +221,10 @@ export default function App() {
     if (!backendUrl || showPendingReplies) return;
     const poll = async () => {
       try {
-        const resp = await fetch(`${backendUrl}/pending-replies`);
+        const resp = await fetch(`${backendUrl}/pending-replies?status=pending&limit=200`);
         if (resp.ok) {
           const data = await resp.json();
-          const count = data.filter((r: { status: string }) => r.status === "pending").length;
-          setPendingCount(count);
+          setPendingCount(data.items.length);
         }
       } catch (_) {}
     };
@@ -254,12 +255,13 @@ export default function App() {
     scrollToBottom();
 
     try {
-      const result = await sendMessage(
-        backendUrl, text, apiHistory,
+      const result = await sendSessionMessage(
+        backendUrl, sessionId, text, apiHistory,
         image?.base64, image?.mimeType
       );
       setMessages((prev) => [...prev, { id: newId(), role: "assistant", content: result.reply, timestamp: Date.now() }]);
       setApiHistory(result.history);
+      setSessionId(result.sessionId);
       // Keep iOS widget in sync with latest reply
       updateWidgetLastMessage(result.reply.slice(0, 140));
     } catch (err: unknown) {
@@ -271,7 +273,7 @@ export default function App() {
       setLoading(false);
       scrollToBottom();
     }
-  }, [backendUrl, apiHistory, scrollToBottom]);
+  }, [backendUrl, apiHistory, sessionId, scrollToBottom]);
 
   const handleClear = useCallback(async () => {
     // Auto-save current conversation before clearing (if there are user messages)
@@ -282,6 +284,7 @@ export default function App() {
     }
     setMessages([{ ...WELCOME_MESSAGE, id: newId(), timestamp: Date.now() }]);
     setApiHistory([]);
+    setSessionId(null);
   }, [messages, apiHistory]);
 
   const handleLoadConversation = useCallback(async (id: string) => {
@@ -289,6 +292,7 @@ export default function App() {
     if (data) {
       setMessages(data.messages);
       setApiHistory(data.apiHistory);
+      setSessionId(null);
     }
   }, []);
 
@@ -29,6 +29,70 @@ export async function sendMessage(
   return response.json();
 }
 
+/**
+ * Send one turn through a server-side session: only the new message goes up
+ * and only the messages it added come back. With no sessionId (new or
+ * restored conversation) a session is created first, seeded once with
+ * `history`; a session the server no longer knows is re-seeded the same way.
+ */
+export async function sendSessionMessage(
+  baseUrl: string,
+  sessionId: string | null,
+  message: string,
+  history: HistoryItem[],
+  imageBase64?: string,
+  imageMimeType?: string
+): Promise<{ reply: string; history: HistoryItem[]; sessionId: string }> {
+  const base = baseUrl.replace(/\/$/, "");
+
+  const createSession = async (): Promise<string> => {
+    const response = await fetch(`${base}/sessions`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ history }),
+    });
+    if (!response.ok) {
+      const text = await response.text();
+      throw new Error(`Server error ${response.status}: ${text}`);
+    }
+    return (await response.json()).session_id;
+  };
+
+  const body: Record<string, unknown> = { message };
+  if (imageBase64) {
+    body.image_base64 = imageBase64;
+    body.image_mime_type = imageMimeType ?? "image/jpeg";
+  }
+  const postTurn = (id: string) =>
+    fetch(`${base}/sessions/${id}/messages`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(body),
+    });
+
+  let id = sessionId ?? (await createSession());
+  let response = await postTurn(id);
+  if (response.status === 404 && sessionId) {
+    id = await createSession();
+    response = await postTurn(id);
+  }
+
+  if (!response.ok) {
+    const text = await response.text();
+    throw new Error(`Server error ${response.status}: ${text}`);
+  }
+
+  const result: { reply: string; messages: HistoryItem[] } = await response.json();
+  return {
+    reply: result.reply,
+    history: [
+      ...history,
+      ...result.messages.map((m) => ({ role: m.role, content: m.content })),
+    ],
+    sessionId: id,
+  };
+}
+
 export async function checkHealth(baseUrl: string): Promise<boolean> {
   try {
     const response = await fetch(
@@ -146,3 +210,60 @@ export async function registerDevice(
     // Non-fatal: device registration failure doesn't affect chat
   }
 }
+
+/**
+ * Follow /pending-replies/events (server-sent events) over XMLHttpRequest,
+ * which React Native delivers incrementally. `onChange` fires for every
+ * created/approved/dismissed event; `onStatus` reports whether the stream is
+ * open so callers can fall back to polling. Reconnects with Last-Event-ID.
+ * Returns a function that closes the stream.
+ */
+export function subscribePendingEvents(
+  baseUrl: string,
+  onChange: () => void,
+  onStatus: (connected: boolean) => void
+): () => void {
+  const url = `${baseUrl.replace(/\/$/, "")}/pending-replies/events`;
+  let lastId: string | null = null;
+  let xhr: XMLHttpRequest | null = null;
+  let retry: ReturnType<typeof setTimeout> | null = null;
+  let closed = false;
+
+  const connect = () => {
+    let offset = 0;
+    let buffer = "";
+    xhr = new XMLHttpRequest();
+    xhr.open("GET", url);
+    xhr.setRequestHeader("Accept", "text/event-stream");
+    if (lastId) xhr.setRequestHeader("Last-Event-ID", lastId);
+    xhr.onprogress = () => {
+      const text = xhr?.responseText ?? "";
+      buffer += text.slice(offset);
+      offset = text.length;
+      const blocks = buffer.split("\n\n");
+      buffer = blocks.pop() ?? "";
+      for (const block of blocks) {
+        let event = "";
+        for (const line of block.split("\n")) {
+          if (line.startsWith("event:")) event = line.slice(6).trim();
+          else if (line.startsWith("id:")) lastId = line.slice(3).trim();
+        }
+        if (event === "ready") onStatus(true);
+        else if (event) onChange();
+      }
+    };
+    xhr.onloadend = () => {
+      if (closed) return;
+      onStatus(false);
+      retry = setTimeout(connect, 5000);
+    };
+    xhr.send();
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    if (retry) clearTimeout(retry);
+    xhr?.abort();
+  };
+}
@@ -11,6 +11,10 @@ import {
   ActivityIndicator,
 } from "react-native";
 import { PendingReplyRecord } from "../types";
+import { subscribePendingEvents } from "../api";
+
+const POLL_INTERVAL = 5000;       // while the event stream is down
+const POLL_FALLBACK = 60000;      // safety refresh while it is up
 
 interface Props {
   visible: boolean;
@@ -40,14 +44,18 @@ export default function PendingRepliesModal({ visible, backendUrl, onClose, onCo
   const [loading, setLoading] = useState(false);
   const [sending, setSending] = useState<Record<string, boolean>>({});
   const intervalRef = useRef<ReturnType<typeof setInterval> | null>(null);
+  const etagRef = useRef<string | null>(null);
 
   const fetchRecords = async () => {
     if (!backendUrl) return;
     try {
-      const resp = await fetch(`${backendUrl}/pending-replies`);
-      if (!resp.ok) return;
-      const data: PendingReplyRecord[] = await resp.json();
-      const pending = data.filter((r) => r.status === "pending");
+      // Unchanged polls come back as a bodyless 304
+      const headers: Record<string, string> = etagRef.current ? { "If-None-Match": etagRef.current } : {};
+      const resp = await fetch(`${backendUrl}/pending-replies?status=pending&limit=200`, { headers });
+      if (resp.status === 304 || !resp.ok) return;
+      etagRef.current = resp.headers.get("ETag");
+      const data: { items: PendingReplyRecord[] } = await resp.json();
+      const pending = data.items;
       setRecords(pending);
       onCountChange(pending.length);
       // Seed draft texts for new records
@@ -68,21 +76,30 @@ export default function PendingRepliesModal({ visible, backendUrl, onClose, onCo
   };
 
   useEffect(() => {
-    if (visible) {
-      setLoading(true);
-      fetchRecords().finally(() => setLoading(false));
-      intervalRef.current = setInterval(fetchRecords, 5000);
-    } else {
+    const stopPolling = () => {
       if (intervalRef.current) {
         clearInterval(intervalRef.current);
         intervalRef.current = null;
       }
+    };
+    const poll = (ms: number) => {
+      stopPolling();
+      intervalRef.current = setInterval(fetchRecords, ms);
+    };
+    if (!visible || !backendUrl) {
+      stopPolling();
+      return;
     }
+    setLoading(true);
+    fetchRecords().finally(() => setLoading(false));
+    poll(POLL_INTERVAL);
+    // Refresh as soon as a reply is created, approved or dismissed anywhere
+    const unsubscribe = subscribePendingEvents(backendUrl, fetchRecords, (connected) =>
+      poll(connected ? POLL_FALLBACK : POLL_INTERVAL)
+    );
     return () => {
-      if (intervalRef.current) {
-        clearInterval(intervalRef.current);
-        intervalRef.current = null;
-      }
+      unsubscribe();
+      stopPolling();
     };
   }, [visible, backendUrl]);
 
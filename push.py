@@ -0,0 +1,178 @@
+"""Expo push delivery for the API server.
+
+Callers enqueue a notification with `await notify()`, which only looks up
+the device tokens (in a worker thread) before returning. A background
+worker fans it out to every registered device: messages are
+packed into batches of up to 100 (Expo's limit per request), sent
+concurrently over one long-lived HTTP/2 client, and the returned tickets
+are checked. Tokens Expo reports as DeviceNotRegistered, either in a ticket
+or in a later receipt, are pruned from the device table.
+"""
+
+import asyncio
+import os
+import time
+
+import httpx
+
+from store import Store
+from tools import metrics
+
+SEND_URL = "https://exp.host/--/api/v2/push/send"
+RECEIPTS_URL = "https://exp.host/--/api/v2/push/getReceipts"
+
+BATCH_SIZE = 100        # Expo: max messages per send request
+RECEIPT_BATCH = 1000    # Expo: max ids per getReceipts request
+CONCURRENCY = int(os.environ.get("PUSH_CONCURRENCY", "4"))
+RECEIPT_DELAY = int(os.environ.get("PUSH_RECEIPT_DELAY", "900"))  # Expo suggests ~15 min
+EXPO_ACCESS_TOKEN = os.environ.get("EXPO_ACCESS_TOKEN", "")
+STOP_TIMEOUT = 10.0     # seconds stop() waits for the queue to drain
+
+
+class PushService:
+    def __init__(self, store: Store):
+        self.store = store
+        self._queue: asyncio.Queue | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._tasks: list[asyncio.Task] = []
+        # ticket id → (token, ticket time), awaiting a receipt check
+        self._tickets: dict[str, tuple[str, float]] = {}
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        """Open the HTTP/2 client and start the send and receipt loops (call on startup)."""
+        headers = {"Accept-Encoding": "gzip, deflate"}
+        if EXPO_ACCESS_TOKEN:
+            headers["Authorization"] = f"Bearer {EXPO_ACCESS_TOKEN}"
+        self._client = httpx.AsyncClient(
+            http2=True,
+            timeout=20,
+            headers=headers,
+            limits=httpx.Limits(max_connections=CONCURRENCY, keepalive_expiry=120),
+        )
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._send_loop()),
+            asyncio.create_task(self._receipt_loop()),
+        ]
+
+    async def stop(self) -> None:
+        """Deliver what is already queued (for up to STOP_TIMEOUT), then shut down."""
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), STOP_TIMEOUT)
+            except asyncio.TimeoutError:
+                print(f"[push] Shutting down with {self._queue.qsize()} notification(s) undelivered")
+        for task in self._tasks:
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+
+    # ── Enqueue ──────────────────────────────────────────────────────────────
+
+    async def notify(self, title: str, body: str, data: dict | None = None, **extra) -> int:
+        """Queue a notification for every registered device. Returns the device count.
+
+        `extra` is merged into each Expo message (e.g. categoryId).
+        """
+        if self._queue is None:
+            print(f"[push] Not started; dropping notification {title!r}")
+            return 0
+        tokens = await asyncio.to_thread(self.store.device_tokens)
+        if not tokens:
+            return 0
+        message = {"title": title, "body": body, "sound": "default", "data": data or {}, **extra}
+        self._queue.put_nowait([{**message, "to": token} for token in tokens])
+        metrics.gauge("push.queued", self._queue.qsize())
+        return len(tokens)
+
+    # ── Sending ──────────────────────────────────────────────────────────────
+
+    async def _send_loop(self) -> None:
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+        while True:
+            messages = await self._queue.get()
+            drained = 1
+            # Fold whatever else is already waiting into the same batches
+            while not self._queue.empty() and len(messages) < BATCH_SIZE * CONCURRENCY:
+                messages += self._queue.get_nowait()
+                drained += 1
+            metrics.gauge("push.queued", self._queue.qsize())
+            batches = [messages[i:i + BATCH_SIZE] for i in range(0, len(messages), BATCH_SIZE)]
+            try:
+                outcomes = await asyncio.gather(
+                    *(self._send_batch(b, semaphore) for b in batches), return_exceptions=True
+                )
+                for batch, outcome in zip(batches, outcomes):
+                    if isinstance(outcome, Exception):
+                        metrics.incr("push.errors", len(batch))
+                        print(f"[push] Batch of {len(batch)} failed: {outcome}")
+            finally:
+                for _ in range(drained):
+                    self._queue.task_done()
+
+    async def _send_batch(self, batch: list[dict], semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                resp = await self._client.post(SEND_URL, json=batch)
+                resp.raise_for_status()
+                tickets = resp.json().get("data", [])
+            except Exception as e:
+                metrics.incr("push.errors", len(batch))
+                print(f"[push] Batch of {len(batch)} failed: {e}")
+                return
+            metrics.observe("push.batch", time.perf_counter() - start)
+
+        dead = []
+        now = time.time()
+        for message, ticket in zip(batch, tickets):
+            if ticket.get("status") == "ok":
+                metrics.incr("push.sent")
+                self._tickets[ticket["id"]] = (message["to"], now)
+            else:
+                metrics.incr("push.errors")
+                if (ticket.get("details") or {}).get("error") == "DeviceNotRegistered":
+                    dead.append(message["to"])
+                else:
+                    print(f"[push] Ticket error for ...{message['to'][-10:]}: {ticket.get('message')}")
+        await self._prune(dead)
+
+    # ── Receipts ─────────────────────────────────────────────────────────────
+
+    async def _receipt_loop(self) -> None:
+        while True:
+            await asyncio.sleep(min(RECEIPT_DELAY, 60))
+            try:
+                await self.check_receipts()
+            except Exception as e:
+                print(f"[push] Receipt check failed: {e}")
+
+    async def check_receipts(self) -> None:
+        """Fetch receipts for tickets older than RECEIPT_DELAY and prune dead tokens."""
+        cutoff = time.time() - RECEIPT_DELAY
+        ready = [tid for tid, (_, ts) in self._tickets.items() if ts <= cutoff]
+        for i in range(0, len(ready), RECEIPT_BATCH):
+            ids = ready[i:i + RECEIPT_BATCH]
+            resp = await self._client.post(RECEIPTS_URL, json={"ids": ids})
+            resp.raise_for_status()
+            receipts = resp.json().get("data", {})
+            dead = []
+            for tid in ids:
+                token, _ = self._tickets.pop(tid)
+                receipt = receipts.get(tid)
+                if receipt and receipt.get("status") == "error":
+                    metrics.incr("push.receipt_errors")
+                    if (receipt.get("details") or {}).get("error") == "DeviceNotRegistered":
+                        dead.append(token)
+            await self._prune(dead)
+        metrics.gauge("push.awaiting_receipts", len(self._tickets))
+
+    async def _prune(self, tokens: list[str]) -> None:
+        if not tokens:
+            return
+        removed = await asyncio.to_thread(self.store.remove_devices, sorted(set(tokens)))
+        if removed:
+            metrics.incr("push.pruned", removed)
+            print(f"[push] Pruned {removed} unregistered device token(s)")
@@ -0,0 +1,122 @@
+"""In-memory min-heap of upcoming reminders, fired at their exact due time.
+
+One asyncio task sleeps until the earliest due time instead of a cron job
+scanning every reminder each minute. `schedule()` and `cancel()` keep the
+heap in step with creates, edits and deletes; moved or cancelled entries are
+left in the heap and skipped when they surface (lazy deletion), so every
+update is O(log n). Both are safe to call from worker threads.
+
+Sleeps are capped at MAX_SLEEP so a wall-clock jump (NTP, suspend/resume)
+delays a reminder by at most that much.
+"""
+
+import asyncio
+import heapq
+import time
+from typing import Awaitable, Callable, Iterable
+
+from tools import metrics
+
+MAX_SLEEP = 60.0
+
+
+class ReminderScheduler:
+    def __init__(self, fire: Callable[[str], Awaitable[None]]):
+        self.fire = fire
+        self._heap: list[tuple[float, str]] = []
+        self._due: dict[str, float] = {}   # reminder id → live due_ts
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self, reminders: Iterable[tuple[str, float]] = ()) -> None:
+        """Seed the heap with (id, due_ts) pairs and start the timer task."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self.replace(reminders)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def schedule(self, reminder_id: str, due_ts: float) -> None:
+        """Add a reminder, or move it to a new due time."""
+        self._call(self._schedule, reminder_id, due_ts)
+
+    def cancel(self, reminder_id: str) -> None:
+        self._call(self._cancel, reminder_id)
+
+    def replace(self, reminders: Iterable[tuple[str, float]]) -> None:
+        """Rebuild the heap from scratch, e.g. after the store was changed elsewhere."""
+        self._call(self._replace, list(reminders))
+
+    # ── Loop-side state changes ──────────────────────────────────────────────
+
+    def _call(self, fn, *args) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed() or _running_loop() is loop:
+            fn(*args)
+        else:
+            loop.call_soon_threadsafe(fn, *args)
+
+    def _schedule(self, reminder_id: str, due_ts: float) -> None:
+        self._due[reminder_id] = due_ts
+        heapq.heappush(self._heap, (due_ts, reminder_id))
+        self._changed(earliest=self._heap[0][1] == reminder_id)
+
+    def _cancel(self, reminder_id: str) -> None:
+        if self._due.pop(reminder_id, None) is not None:
+            self._changed(earliest=False)
+
+    def _replace(self, reminders: list[tuple[str, float]]) -> None:
+        self._due = dict(reminders)
+        self._heap = [(due_ts, rid) for rid, due_ts in self._due.items()]
+        heapq.heapify(self._heap)
+        self._changed(earliest=True)
+
+    def _changed(self, earliest: bool) -> None:
+        metrics.gauge("reminders.scheduled", len(self._due))
+        # Only a new head can make the current sleep too long
+        if earliest and self._wake is not None:
+            self._wake.set()
+
+    def _pop_stale(self) -> None:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    # ── Timer task ───────────────────────────────────────────────────────────
+
+    async def _run(self) -> None:
+        while True:
+            self._pop_stale()
+            timeout = MAX_SLEEP
+            if self._heap:
+                timeout = min(self._heap[0][0] - time.time(), MAX_SLEEP)
+                if timeout <= 0:
+                    due_ts, reminder_id = heapq.heappop(self._heap)
+                    del self._due[reminder_id]
+                    metrics.gauge("reminders.scheduled", len(self._due))
+                    metrics.observe("reminders.lateness", time.time() - due_ts)
+                    try:
+                        await self.fire(reminder_id)
+                    except Exception as e:
+                        print(f"[reminders] Failed to fire {reminder_id}: {e}")
+                    continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
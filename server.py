@@ -1,14 +1,20 @@
 """FastAPI server — exposes the personal assistant as a REST API."""
 
 import asyncio
+import base64
+import concurrent.futures
 import email as email_lib
+import hashlib
 import imaplib
 import json
 import os
 import re
 import smtplib
+import threading
+import time
 import uuid
-from datetime import datetime
+import weakref
+from datetime import datetime, timedelta
 from email.header import decode_header
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -19,9 +25,23 @@ import uvicorn
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from assistant import run_turn_headless
+# The server has always kept its data in ./data; tools.config reads DATA_DIR
+# when first imported (by assistant below), so set the default before that
+os.environ.setdefault("DATA_DIR", "./data")
+
+import imap_fetch
+from assistant import run_turn_async, stream_turn
+from coordination import Coordinator
+from draft_cache import DraftCache, draft_key
+from imap_idle import IdleWatcher
+from jobs import JobQueue
+from push import PushService
+from reminder_scheduler import ReminderScheduler
+from store import AsyncStore, Store
+from tools import config, jsonstore, llm, metrics, reminder_engine, semantic_index
 
 app = FastAPI(title="Personal Assistant API", version="1.0.0")
 
@@ -32,15 +52,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-DATA_DIR = os.environ.get("DATA_DIR", "./data")
-DEVICES_FILE = os.path.join(DATA_DIR, "devices.json")
-REMINDERS_FILE = os.path.join(DATA_DIR, "reminders.json")
-PENDING_REPLIES_FILE = os.path.join(DATA_DIR, "pending_replies.json")
+DATA_DIR = str(config.DATA_DIR)  # ./data unless DATA_DIR is set; shared with the tool layer
 AI_FEED_FILE = os.path.join(DATA_DIR, "ai_feed.json")
 SUGGESTIONS_FILE = os.path.join(DATA_DIR, "suggestions.json")
 TRENDING_FILE = os.path.join(DATA_DIR, "trending_articles.json")
-GMAIL_WATERMARK_FILE = os.path.join(DATA_DIR, "gmail_watermark.json")
-SMS_HISTORY_FILE = os.path.join(DATA_DIR, "sms_history.json")
+STORE_FILE = os.path.join(DATA_DIR, "assistant.db")
+
+# Pending replies, devices, SMS/WhatsApp threads, chat sessions and Gmail watermarks
+store = Store(STORE_FILE)
+# The same store for async code: calls run in worker threads, off the event loop
+db = AsyncStore(store)
+
+# Batched Expo delivery; notify() enqueues and returns immediately
+push = PushService(store)
+
+# Durable background work (webhook drafting, SMS forwarding); handlers registered below
+jobs = JobQueue(store)
+
+# Elects one runner per scheduled job across workers/replicas sharing DATA_DIR
+coordinator = Coordinator(store)
+
+# Drafts keyed on normalized content, shared by /draft-reply and the channel pollers
+draft_cache = DraftCache()
 
 TWILIO_ACCOUNT_SID  = os.environ.get("TWILIO_ACCOUNT_SID", "")
 TWILIO_AUTH_TOKEN   = os.environ.get("TWILIO_AUTH_TOKEN", "")
@@ -71,6 +104,29 @@ class ChatResponse(BaseModel):
     history: List[HistoryMessage]
 
 
+class SessionCreateRequest(BaseModel):
+    history: List[HistoryMessage] = []   # optional: seed with an existing conversation
+
+
+class SessionMessage(BaseModel):
+    seq: int
+    role: str
+    content: str
+
+
+class SessionTurnRequest(BaseModel):
+    message: str
+    image_base64: Optional[str] = None
+    image_mime_type: Optional[str] = "image/jpeg"
+
+
+class SessionTurnResponse(BaseModel):
+    session_id: str
+    reply: str
+    seq: int                        # last seq in the session
+    messages: List[SessionMessage]  # only the messages added by this turn
+
+
 class DeviceRegistration(BaseModel):
     token: str
     platform: str  # "ios" | "android"
@@ -105,6 +161,12 @@ class PushNotifyRequest(BaseModel):
     data: Optional[dict] = None
 
 
+class ReminderRequest(BaseModel):
+    title: str
+    due_ts: float        # unix seconds
+    description: str = ""
+
+
 class AiFeedItem(BaseModel):
     id: str
     title: str
@@ -126,17 +188,39 @@ class PlaygroundRequest(BaseModel):
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
 def _load_json(path: str, default):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    if not os.path.exists(path):
-        return default
-    with open(path) as f:
-        return json.load(f)
+    """Read-only snapshot of a JSON data file — use _update_json to modify."""
+    return jsonstore.load(path, default)
 
 
 def _save_json(path: str, data) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+    jsonstore.save(path, data)
+
+
+def _update_json(path: str, default):
+    """Locked read-modify-write of a JSON data file (context manager)."""
+    return jsonstore.update(path, default)
+
+
+# Pre-serialized bodies for hot polled GETs: key → (version, body bytes, etag)
+_response_cache: dict[str, tuple[object, bytes, str]] = {}
+
+
+async def _cached_json_response(request: Request, key: str, version, build) -> Response:
+    """Serve `build()` as JSON, re-encoding only when `version` changes.
+
+    `build` runs in a worker thread (it may query the store). Clients that
+    send back the ETag get a bodyless 304 while nothing changed.
+    """
+    cached = _response_cache.get(key)
+    if cached is None or cached[0] != version:
+        body = await asyncio.to_thread(lambda: json.dumps(build()).encode())
+        etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        cached = _response_cache[key] = (version, body, etag)
+    _, body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 # ── Routes ────────────────────────────────────────────────────────────────────
@@ -146,12 +230,17 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def get_metrics():
+    """Process-wide counters, gauges and timings (token/cache usage, latencies)."""
+    return metrics.snapshot()
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(req: ChatRequest):
     history = [{"role": m.role, "content": m.content} for m in req.history]
     try:
-        reply, updated_history = await asyncio.to_thread(
-            run_turn_headless,
+        reply, updated_history = await run_turn_async(
             req.message,
             history,
             req.image_base64,
@@ -166,10 +255,156 @@ async def chat(req: ChatRequest):
     )
 
 
+def _sse(event: str, data, event_id=None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """Server-sent events version of /chat.
+
+    Events: `text` (reply delta), `tool_start`, `tool_result`, then `done`
+    with the final reply and history — or `error` if the turn fails.
+    """
+    history = [{"role": m.role, "content": m.content} for m in req.history]
+
+    async def events():
+        try:
+            async for event in stream_turn(req.message, history, req.image_base64, req.image_mime_type):
+                kind = event.pop("type")
+                if kind == "tool_result":
+                    event["content"] = event["content"][:500]
+                yield _sse(kind, event)
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ── Chat sessions ─────────────────────────────────────────────────────────────
+# History lives server-side, so clients send only the new message per turn
+# and get back only the messages it added. The session id doubles as the
+# compaction key, and the server-built history keeps the prompt-cache prefix
+# byte-identical between turns. Sessions idle for SESSION_TTL_DAYS are purged.
+
+_session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+# Sessions untouched this long are deleted by the nightly purge
+SESSION_TTL_DAYS = int(os.environ.get("SESSION_TTL_DAYS", "30"))
+
+
+def _session_lock(session_id: str) -> asyncio.Lock:
+    """One turn at a time per session, so appended seqs follow turn order."""
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _session_locks[session_id] = lock
+    return lock
+
+
+async def _session_history(session_id: str) -> tuple[list, int]:
+    """(history, last seq) of a session; 404 if there is no such session."""
+    messages = await db.session_messages(session_id)
+    if messages is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    seq = messages[-1]["seq"] if messages else 0
+    return [{"role": m["role"], "content": m["content"]} for m in messages], seq
+
+
+async def _purge_sessions() -> None:
+    cutoff = (datetime.utcnow() - timedelta(days=SESSION_TTL_DAYS)).isoformat() + "Z"
+    purged = await db.purge_sessions(cutoff)
+    if purged:
+        print(f"[sessions] Purged {purged} sessions idle for {SESSION_TTL_DAYS}+ days")
+
+
+@app.post("/sessions")
+def create_session(req: SessionCreateRequest):
+    session_id = str(uuid.uuid4())
+    seq = store.create_session(
+        session_id, [{"role": m.role, "content": m.content} for m in req.history]
+    )
+    return {"session_id": session_id, "seq": seq}
+
+
+@app.get("/sessions/{session_id}/messages")
+def get_session_messages(session_id: str, since: int = 0):
+    """Messages with seq > since (all of them by default)."""
+    messages = store.session_messages(session_id, since)
+    if messages is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    seq = messages[-1]["seq"] if messages else since
+    return {"session_id": session_id, "seq": seq, "messages": messages}
+
+
+@app.post("/sessions/{session_id}/messages", response_model=SessionTurnResponse)
+async def session_turn(session_id: str, req: SessionTurnRequest):
+    async with _session_lock(session_id):
+        history, seq = await _session_history(session_id)
+        try:
+            reply, updated_history = await run_turn_async(
+                req.message,
+                history,
+                req.image_base64,
+                req.image_mime_type,
+                conversation_id=f"session:{session_id}",
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        added = await db.append_session_messages(session_id, updated_history[len(history):])
+        if added is None:
+            raise HTTPException(status_code=404, detail="Session expired during the turn")
+
+    return SessionTurnResponse(
+        session_id=session_id,
+        reply=reply,
+        seq=added[-1]["seq"] if added else seq,
+        messages=[SessionMessage(**m) for m in added],
+    )
+
+
+@app.post("/sessions/{session_id}/messages/stream")
+async def session_turn_stream(session_id: str, req: SessionTurnRequest):
+    """SSE version of a session turn — same events as /chat/stream, except
+    `done` carries `seq` and the added `messages` instead of the full history."""
+    await _session_history(session_id)  # 404 before the stream starts
+
+    async def events():
+        async with _session_lock(session_id):
+            history, seq = await _session_history(session_id)
+            try:
+                async for event in stream_turn(
+                    req.message, history, req.image_base64, req.image_mime_type,
+                    conversation_id=f"session:{session_id}",
+                ):
+                    kind = event.pop("type")
+                    if kind == "tool_result":
+                        event["content"] = event["content"][:500]
+                    if kind == "done":
+                        added = await db.append_session_messages(session_id, event.pop("history")[len(history):])
+                        if added is None:
+                            raise RuntimeError("Session expired during the turn")
+                        event.update(session_id=session_id, seq=added[-1]["seq"] if added else seq,
+                                     messages=added)
+                    yield _sse(kind, event)
+            except Exception as e:
+                yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/draft-reply")
 async def draft_reply_endpoint(req: DraftReplyRequest):
     """Draft a short, natural reply to an iMessage or email — no tool use."""
-    import anthropic as _anthropic
     anthropic_key = os.environ.get("ANTHROPIC_API_KEY")
     if not anthropic_key:
         raise HTTPException(status_code=503, detail="ANTHROPIC_API_KEY not set")
@@ -189,40 +424,39 @@ async def draft_reply_endpoint(req: DraftReplyRequest):
         "content": f"From: {req.sender_name}{subject_line}\n\n{req.message}\n\nDraft a brief reply:",
     })
 
+    key = draft_key(
+        "reply", req.sender_name, req.message, req.subject,
+        [{"role": h.role, "content": h.content} for h in req.history[-6:]], req.source,
+    )
     try:
-        ac = _anthropic.Anthropic(api_key=anthropic_key)
-        msg = await asyncio.to_thread(
-            lambda: ac.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=300,
-                system=system,
-                messages=messages,
-            )
-        )
-        return {"reply": msg.content[0].text.strip()}
+        reply = await draft_cache.get_or_create(key, lambda: llm.text(
+            model="claude-haiku-4-5-20251001",
+            max_tokens=300,
+            system=system,
+            messages=messages,
+        ))
+        return {"reply": reply}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/register-device")
 async def register_device(reg: DeviceRegistration):
-    devices = _load_json(DEVICES_FILE, [])
-    # Deduplicate by token
-    devices = [d for d in devices if d.get("token") != reg.token]
-    devices.append({"token": reg.token, "platform": reg.platform})
-    _save_json(DEVICES_FILE, devices)
+    await db.upsert_device(reg.token, reg.platform)
+    await _dispatch_due_reminders()  # anything that came due while no device was registered
     return {"status": "registered"}
 
 
 @app.get("/devices")
-async def list_devices():
-    devices = _load_json(DEVICES_FILE, [])
-    return {"count": len(devices), "devices": [{"platform": d.get("platform"), "token_prefix": d.get("token", "")[:30]} for d in devices]}
+async def list_devices(request: Request):
+    def build():
+        devices = store.list_devices()
+        return {"count": len(devices), "devices": [{"platform": d.get("platform"), "token_prefix": d.get("token", "")[:30]} for d in devices]}
+    return await _cached_json_response(request, "devices", await db.version("devices"), build)
 
 
 @app.post("/pending-reply")
 async def create_pending_reply(req: PendingReply):
-    records = _load_json(PENDING_REPLIES_FILE, [])
     record = {
         "id": str(uuid.uuid4()),
         "sender_name": req.sender_name,
@@ -237,131 +471,297 @@ async def create_pending_reply(req: PendingReply):
         "approved_text": None,
         "created_at": datetime.utcnow().isoformat() + "Z",
     }
-    records.append(record)
-    _save_json(PENDING_REPLIES_FILE, records)
-    return record
+    return await db.add_pending_reply(record)
+
+
+PENDING_PAGE_SIZE = 50
+PENDING_PAGE_MAX = 200
+# Approved replies nobody dispatched within this many days are archived
+PENDING_ARCHIVE_DAYS = int(os.environ.get("PENDING_ARCHIVE_DAYS", "7"))
+
+
+def _encode_cursor(record: dict) -> str:
+    raw = json.dumps([record.get("created_at") or "", record["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        created_at, reply_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(created_at), str(reply_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 @app.get("/pending-replies")
-async def get_pending_replies():
-    records = _load_json(PENDING_REPLIES_FILE, [])
-    return [r for r in records if r.get("status") != "dismissed"]
+async def get_pending_replies(request: Request, status: Optional[str] = None,
+                              source: Optional[str] = None, account: Optional[str] = None,
+                              since: Optional[int] = None, cursor: Optional[str] = None,
+                              limit: int = PENDING_PAGE_SIZE, archived: bool = False):
+    """Pending replies, filtered by status (comma-separated), source and Gmail account.
+
+    Without parameters: the whole live (non-dismissed) list, as before.
+    With filters/limit/cursor: {"items", "next_cursor", "seq"} pages in creation order.
+    With since=<seq>: {"items", "seq", "has_more"} — only records (live or archived)
+    changed after that seq; poll again with the returned seq. `status` is
+    ignored here: every change is returned, so a record that left the status
+    the client shows still arrives (with its new status) and can be dropped.
+    """
+    if not request.query_params:
+        return await _cached_json_response(
+            request, "pending-replies", await db.version("pending_replies"),
+            lambda: store.list_pending_replies(exclude_status="dismissed"),
+        )
+
+    statuses = [s for s in (status or "").split(",") if s]
+    limit = max(1, min(limit, PENDING_PAGE_MAX))
+
+    if since is not None:
+        seq = await db.pending_seq()  # read first so nothing committed meanwhile is skipped
+        items = await db.pending_changes(since, source, account, limit + 1)
+        has_more = len(items) > limit
+        items = items[:limit]
+        next_seq = items[-1]["seq"] if has_more else max([seq, since] + [r["seq"] for r in items])
+        return {"items": items, "seq": next_seq, "has_more": has_more}
+
+    def build():
+        seq = store.pending_seq()
+        after = _decode_cursor(cursor) if cursor else None
+        items = store.query_pending_replies(statuses, source, account, after, limit + 1, archived)
+        next_cursor = _encode_cursor(items[limit - 1]) if len(items) > limit else None
+        return {"items": items[:limit], "next_cursor": next_cursor, "seq": seq}
+
+    if cursor:
+        return await asyncio.to_thread(build)
+    # First pages of a filter are what clients poll; serve those with ETags
+    return await _cached_json_response(
+        request, f"pending-replies?{request.url.query}", await db.version("pending_replies"), build,
+    )
+
+
+# ── Pending reply change feed ─────────────────────────────────────────────────
+# Clients hold one SSE connection instead of polling. Every pending-reply
+# write (approve, dismiss, webhooks, Gmail, the companion's POST) stamps a
+# seq; the feed replays changes after the client's last seen seq, then
+# streams new ones as they commit.
+
+PENDING_FEED_RECHECK = 2.0     # seconds; also catches writes made by other workers
+PENDING_FEED_KEEPALIVE = 15.0
+PENDING_EVENTS = {"pending": "created", "approved": "approved", "dismissed": "dismissed"}
+
+
+class _Broadcast:
+    """Wake every waiter at once; must be notified on the event loop."""
+
+    def __init__(self):
+        self._event = asyncio.Event()
+
+    def notify(self) -> None:
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+_pending_changed = _Broadcast()
+
+
+@app.get("/pending-replies/events")
+async def pending_reply_events(request: Request, since: Optional[int] = None,
+                               source: Optional[str] = None, account: Optional[str] = None):
+    """Server-sent events for pending-reply changes.
+
+    Events `created` / `approved` / `dismissed` / `updated` carry the record;
+    the SSE id is its seq. Reconnect with Last-Event-ID (or ?since=) to resume
+    without gaps; with neither, only changes from now on are sent. A `ready`
+    event with the starting seq comes first. Every status change is sent;
+    clients filter by the event type.
+    """
+    last_id = request.headers.get("last-event-id", "")
+    if last_id.isdigit():
+        cursor = int(last_id)
+    else:
+        cursor = since if since is not None else await db.pending_seq()
+
+    async def events():
+        nonlocal cursor
+        yield _sse("ready", {"seq": cursor})
+        last_write = time.monotonic()
+        while not await request.is_disconnected():
+            seq = await db.pending_seq()  # before the query, so nothing committed meanwhile is skipped
+            changes = await db.pending_changes(cursor, source, account, PENDING_PAGE_MAX)
+            for record in changes:
+                yield _sse(PENDING_EVENTS.get(record.get("status"), "updated"), record, record["seq"])
+            if len(changes) == PENDING_PAGE_MAX:
+                cursor = changes[-1]["seq"]
+                continue
+            cursor = max([cursor, seq] + [r["seq"] for r in changes])
+            if changes:
+                last_write = time.monotonic()
+            elif time.monotonic() - last_write > PENDING_FEED_KEEPALIVE:
+                yield ": keepalive\n\n"
+                last_write = time.monotonic()
+            await _pending_changed.wait(PENDING_FEED_RECHECK)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _archive_pending_replies() -> None:
+    cutoff = (datetime.utcnow() - timedelta(days=PENDING_ARCHIVE_DAYS)).isoformat()
+    moved = await db.archive_pending_replies(approved_before=cutoff)
+    if moved:
+        print(f"[pending] Archived {moved} dismissed/stale replies")
+    backlog = await db.count_companion_backlog(approved_before=cutoff)
+    metrics.gauge("pending.companion_backlog", backlog)
+    if backlog:
+        print(f"[pending] {backlog} approved iMessage/email replies older than "
+              f"{PENDING_ARCHIVE_DAYS} days still unsent — is the Mac companion running?")
 
 
 @app.patch("/pending-reply/{reply_id}/approve")
 async def approve_pending_reply(reply_id: str, req: ApproveRequest):
     print(f"[approve] id={reply_id} text_len={len(req.approved_text or '')}")
-    records = _load_json(PENDING_REPLIES_FILE, [])
-    for r in records:
-        if r["id"] == reply_id:
-            r["status"] = "approved"
-            r["approved_text"] = req.approved_text
-            _save_json(PENDING_REPLIES_FILE, records)
-
-            source = r.get("source", "imessage")
-            print(f"[approve] source={source}")
-
-            if source == "sms":
-                to_number = r.get("sender_handle", "")
-                ok = await asyncio.to_thread(_twilio_send_sms, to_number, req.approved_text)
-                if ok:
-                    _sms_append_history(to_number, "assistant", req.approved_text)
-                    r["status"] = "dismissed"
-                    _save_json(PENDING_REPLIES_FILE, records)
-            elif source == "whatsapp":
-                wa_id = r.get("sender_handle", "")
-                ok = await _whatsapp_send(wa_id, req.approved_text)
-                if ok:
-                    _whatsapp_append_history(wa_id, "assistant", req.approved_text)
-                    r["status"] = "dismissed"
-                    _save_json(PENDING_REPLIES_FILE, records)
-            else:
-                # iMessage and email: dispatched by Mac companion
-                print(f"[approve] queued for companion dispatch: source={source}")
-
-            return r
-    raise HTTPException(status_code=404, detail="Reply not found")
+    r = await db.get_pending_reply(reply_id)
+    if r is None:
+        raise HTTPException(status_code=404, detail="Reply not found")
+
+    source = r.get("source", "imessage")
+    print(f"[approve] source={source}")
+
+    # SMS and WhatsApp are sent from here, before the record says "approved":
+    # only the companion acts on approved records, and only once
+    ok = False
+    if source == "sms":
+        to_number = r.get("sender_handle", "")
+        ok = await asyncio.to_thread(_twilio_send_sms, to_number, req.approved_text)
+        if ok:
+            await _sms_append_history(to_number, "assistant", req.approved_text)
+    elif source == "whatsapp":
+        wa_id = r.get("sender_handle", "")
+        ok = await _whatsapp_send(wa_id, req.approved_text)
+        if ok:
+            await _whatsapp_append_history(wa_id, "assistant", req.approved_text)
+    else:
+        # iMessage and email: dispatched by Mac companion
+        print(f"[approve] queued for companion dispatch: source={source}")
+
+    # A failed SMS/WhatsApp send stays approved, so it can be approved again
+    r = await db.update_pending_reply(
+        reply_id, status="dismissed" if ok else "approved", approved_text=req.approved_text,
+    )
+    if r is None:
+        raise HTTPException(status_code=404, detail="Reply not found")
+    return r
 
 
 @app.patch("/pending-reply/{reply_id}/dismiss")
 async def dismiss_pending_reply(reply_id: str):
-    records = _load_json(PENDING_REPLIES_FILE, [])
-    for r in records:
-        if r["id"] == reply_id:
-            r["status"] = "dismissed"
-            _save_json(PENDING_REPLIES_FILE, records)
-            return r
-    raise HTTPException(status_code=404, detail="Reply not found")
+    r = await db.update_pending_reply(reply_id, status="dismissed")
+    if r is None:
+        raise HTTPException(status_code=404, detail="Reply not found")
+    return r
 
 
 @app.post("/push-notify")
 async def push_notify(req: PushNotifyRequest):
-    devices = _load_json(DEVICES_FILE, [])
-    tokens = [d["token"] for d in devices if d.get("token")]
-    if not tokens:
-        return {"sent": 0}
-    sent = 0
-    async with httpx.AsyncClient() as client:
-        for token in tokens:
-            payload = {
-                "to": token,
-                "title": req.title,
-                "body": req.body,
-                "sound": "default",
-                "data": req.data or {},
-            }
-            try:
-                await client.post("https://exp.host/--/api/v2/push/send", json=payload)
-                sent += 1
-            except Exception:
-                pass
-    return {"sent": sent}
+    """Queue a push to every registered device; delivery happens in the background."""
+    return {"queued": await push.notify(req.title, req.body, req.data)}
 
 
 @app.get("/send-due-reminders")
 async def send_due_reminders_endpoint():
-    """Manual trigger — normally called by the scheduler."""
+    """Manual trigger — sends anything overdue that the scheduler hasn't fired."""
     count = await _dispatch_due_reminders()
-    return {"sent": count}
+    return {"queued": count}
 
 
-# ── Push notification dispatcher ──────────────────────────────────────────────
+# ── Reminders ─────────────────────────────────────────────────────────────────
+# Stored by tools.reminder_engine, shared with the set_reminder tool, so
+# reminders created through /chat are pushed the same way.
 
-async def _dispatch_due_reminders():
-    """Check reminders.json for due items and push via Expo Push API."""
-    from datetime import datetime
+REMINDER_RETRY_SECONDS = 300  # no device registered yet: try again after this long
 
-    reminders = _load_json(REMINDERS_FILE, [])
-    devices = _load_json(DEVICES_FILE, [])
-    tokens = [d["token"] for d in devices if d.get("token")]
 
-    if not tokens:
+async def _fire_reminder(reminder_id: str) -> int:
+    """Claim one reminder (a single-row update) and queue its push."""
+    if not await db.device_tokens():
+        # Left unsent and back on the heap; registering a device also dispatches it
+        reminder_scheduler.schedule(reminder_id, time.time() + REMINDER_RETRY_SECONDS)
         return 0
+    reminder = await asyncio.to_thread(reminder_engine.claim, reminder_id)
+    if reminder is None:
+        return 0  # deleted, completed, or already sent by an overlapping dispatch
+    return await push.notify("⏰ Reminder", reminder["title"])
 
-    now = datetime.utcnow().timestamp()
-    due = [r for r in reminders if not r.get("sent") and r.get("due_ts", float("inf")) <= now]
-
-    sent = 0
-    async with httpx.AsyncClient() as client:
-        for reminder in due:
-            for token in tokens:
-                payload = {
-                    "to": token,
-                    "title": "⏰ Reminder",
-                    "body": reminder.get("text", "You have a reminder"),
-                    "sound": "default",
-                }
-                try:
-                    await client.post("https://exp.host/--/api/v2/push/send", json=payload)
-                    sent += 1
-                except Exception:
-                    pass
-            reminder["sent"] = True
 
-    if due:
-        _save_json(REMINDERS_FILE, reminders)
+# Min-heap of unsent reminders; each fires at its due_ts
+reminder_scheduler = ReminderScheduler(_fire_reminder)
+
+
+def _on_reminder_change(reminder_id: str, due_ts: float | None) -> None:
+    if due_ts is None:
+        reminder_scheduler.cancel(reminder_id)
+    else:
+        reminder_scheduler.schedule(reminder_id, due_ts)
+
+
+_reminders_version = None
+
+
+async def _resync_reminders() -> None:
+    """Rebuild the heap if the reminder database changed since the last check (e.g. the CLI wrote it)."""
+    global _reminders_version
+    version = await asyncio.to_thread(reminder_engine.data_version)
+    if _reminders_version is not None and version != _reminders_version:
+        reminder_scheduler.replace(await asyncio.to_thread(reminder_engine.unsent))
+    _reminders_version = version
+
+
+async def _dispatch_due_reminders() -> int:
+    """Send every overdue, unsent reminder now."""
+    queued = 0
+    for reminder_id, _ in await asyncio.to_thread(reminder_engine.unsent, time.time()):
+        reminder_scheduler.cancel(reminder_id)
+        queued += await _fire_reminder(reminder_id)
+    return queued
+
+
+@app.get("/reminders")
+async def list_reminders():
+    return await asyncio.to_thread(reminder_engine.all_reminders)
+
+
+@app.post("/reminders")
+async def create_reminder(req: ReminderRequest):
+    return await asyncio.to_thread(
+        reminder_engine.add, req.title, due_ts=req.due_ts, description=req.description
+    )
+
+
+@app.put("/reminders/{reminder_id}")
+async def update_reminder(reminder_id: str, req: ReminderRequest):
+    """Change the title or due time; a sent reminder is re-armed."""
+    reminder = await asyncio.to_thread(
+        reminder_engine.update, reminder_id, title=req.title, due_ts=req.due_ts, description=req.description
+    )
+    if reminder is None:
+        raise HTTPException(status_code=404, detail="Reminder not found")
+    return reminder
 
-    return sent
+
+@app.delete("/reminders/{reminder_id}")
+async def delete_reminder(reminder_id: str):
+    if not await asyncio.to_thread(reminder_engine.delete, reminder_id):
+        raise HTTPException(status_code=404, detail="Reminder not found")
+    return {"ok": True}
 
 
 # ── AI Feed ───────────────────────────────────────────────────────────────────
@@ -375,7 +775,6 @@ FEED_SEARCH_QUERIES = [
 
 async def _fetch_ai_feed() -> list[dict]:
     """Search for AI news + summarize into structured feed items using Claude."""
-    import anthropic as _anthropic
 
     tavily_key = os.environ.get("TAVILY_API_KEY")
     anthropic_key = os.environ.get("ANTHROPIC_API_KEY")
@@ -437,15 +836,11 @@ Return a JSON array only, no markdown, no explanation.
 {raw_text}"""
 
     try:
-        ac = _anthropic.Anthropic(api_key=anthropic_key)
-        msg = await asyncio.to_thread(
-            lambda: ac.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=2000,
-                messages=[{"role": "user", "content": prompt}],
-            )
+        raw_response = await llm.text(
+            model="claude-haiku-4-5-20251001",
+            max_tokens=2000,
+            messages=[{"role": "user", "content": prompt}],
         )
-        raw_response = msg.content[0].text.strip()
         raw_response = raw_response.removeprefix("```json").removeprefix("```").removesuffix("```").strip()
         items = json.loads(raw_response)
     except Exception as e:
@@ -490,7 +885,6 @@ async def refresh_suggestions():
 
 
 async def _fetch_suggestions() -> list[dict]:
-    import anthropic as _anthropic
 
     tavily_key = os.environ.get("TAVILY_API_KEY")
     anthropic_key = os.environ.get("ANTHROPIC_API_KEY")
@@ -534,15 +928,11 @@ News snippets:
 Return a JSON array only (no markdown), each item: {{"text": "...", "category": "..."}}"""
 
     try:
-        ac = _anthropic.Anthropic(api_key=anthropic_key)
-        msg = await asyncio.to_thread(
-            lambda: ac.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=800,
-                messages=[{"role": "user", "content": prompt}],
-            )
+        raw_text = await llm.text(
+            model="claude-haiku-4-5-20251001",
+            max_tokens=800,
+            messages=[{"role": "user", "content": prompt}],
         )
-        raw_text = msg.content[0].text.strip()
         raw_text = raw_text.removeprefix("```json").removeprefix("```").removesuffix("```").strip()
         items = json.loads(raw_text)
     except Exception as e:
@@ -558,7 +948,6 @@ Return a JSON array only (no markdown), each item: {{"text": "...", "category":
 @app.post("/playground/explore")
 async def playground_explore(req: PlaygroundRequest):
     """Generate an integration guide for a given AI tool using Claude."""
-    import anthropic as _anthropic
 
     anthropic_key = os.environ.get("ANTHROPIC_API_KEY")
     if not anthropic_key:
@@ -611,20 +1000,13 @@ Generate a practical integration guide as a JSON object with these exact fields:
 Return JSON only, no markdown fences, no explanation outside the JSON."""
 
     try:
-        ac = _anthropic.Anthropic(api_key=anthropic_key)
-        msg = await asyncio.to_thread(
-            lambda: ac.messages.create(
-                model="claude-sonnet-4-6",
-                max_tokens=4000,
-                messages=[{"role": "user", "content": prompt}],
-            )
+        raw = await llm.text(
+            model="claude-sonnet-4-6",
+            max_tokens=4000,
+            messages=[{"role": "user", "content": prompt}],
         )
-        guide = json.loads(msg.content[0].text)
-    except json.JSONDecodeError:
-        # Claude returned markdown fences — strip them
-        raw = msg.content[0].text
-        raw = raw.strip().removeprefix("```json").removeprefix("```").removesuffix("```").strip()
-        guide = json.loads(raw)
+        # Claude sometimes wraps the JSON in markdown fences — strip them
+        guide = json.loads(raw.removeprefix("```json").removeprefix("```").removesuffix("```").strip())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Guide generation failed: {e}")
 
@@ -634,22 +1016,17 @@ Return JSON only, no markdown fences, no explanation outside the JSON."""
 @app.get("/ai-feed/debug")
 async def debug_ai_feed():
     """Returns raw error info for debugging feed generation."""
-    import anthropic as _anthropic
     anthropic_key = os.environ.get("ANTHROPIC_API_KEY")
     tavily_key = os.environ.get("TAVILY_API_KEY")
     result = {"anthropic_key": bool(anthropic_key), "tavily_key": bool(tavily_key)}
     if not anthropic_key:
         return {**result, "error": "no anthropic key"}
     try:
-        ac = _anthropic.Anthropic(api_key=anthropic_key)
-        msg = await asyncio.to_thread(
-            lambda: ac.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=200,
-                messages=[{"role": "user", "content": "Reply with valid JSON array: [{\"test\": true}]"}],
-            )
+        raw = await llm.text(
+            model="claude-haiku-4-5-20251001",
+            max_tokens=200,
+            messages=[{"role": "user", "content": "Reply with valid JSON array: [{\"test\": true}]"}],
         )
-        raw = msg.content[0].text.strip()
         result["raw_response"] = raw
         result["parsed"] = json.loads(raw.removeprefix("```json").removeprefix("```").removesuffix("```").strip())
         result["status"] = "ok"
@@ -659,9 +1036,12 @@ async def debug_ai_feed():
 
 
 @app.get("/ai-feed")
-async def get_ai_feed():
+async def get_ai_feed(request: Request):
     """Return the latest cached AI feed."""
-    return _load_json(AI_FEED_FILE, [])
+    return await _cached_json_response(
+        request, "ai-feed", jsonstore.version(AI_FEED_FILE),
+        lambda: _load_json(AI_FEED_FILE, []),
+    )
 
 
 @app.post("/ai-feed/refresh")
@@ -669,21 +1049,7 @@ async def refresh_ai_feed():
     """Manually trigger a feed refresh and push-notify devices."""
     feed = await _fetch_ai_feed()
     if feed:
-        devices = _load_json(DEVICES_FILE, [])
-        tokens = [d["token"] for d in devices if d.get("token")]
-        if tokens:
-            async with httpx.AsyncClient() as client:
-                for token in tokens:
-                    await client.post(
-                        "https://exp.host/--/api/v2/push/send",
-                        json={
-                            "to": token,
-                            "title": "🤖 AI Feed Updated",
-                            "body": f"{len(feed)} new AI tools & models for you",
-                            "sound": "default",
-                            "data": {"type": "ai_feed"},
-                        },
-                    )
+        await push.notify("🤖 AI Feed Updated", f"{len(feed)} new AI tools & models for you", {"type": "ai_feed"})
     return {"count": len(feed)}
 
 
@@ -697,7 +1063,6 @@ TRENDING_QUERIES = [
 
 async def _fetch_trending_articles() -> list[dict]:
     """Fetch and summarize top trending news articles using Tavily + Claude."""
-    import anthropic as _anthropic
 
     tavily_key = os.environ.get("TAVILY_API_KEY")
     anthropic_key = os.environ.get("ANTHROPIC_API_KEY")
@@ -756,15 +1121,11 @@ Return a JSON array only, no markdown, no explanation.
 {raw_text}"""
 
     try:
-        ac = _anthropic.Anthropic(api_key=anthropic_key)
-        msg = await asyncio.to_thread(
-            lambda: ac.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=2000,
-                messages=[{"role": "user", "content": prompt}],
-            )
+        raw_response = await llm.text(
+            model="claude-haiku-4-5-20251001",
+            max_tokens=2000,
+            messages=[{"role": "user", "content": prompt}],
         )
-        raw_response = msg.content[0].text.strip()
         raw_response = raw_response.removeprefix("```json").removeprefix("```").removesuffix("```").strip()
         items = json.loads(raw_response)
     except Exception as e:
@@ -791,12 +1152,13 @@ Return a JSON array only, no markdown, no explanation.
 
 
 @app.get("/trending-articles")
-async def get_trending_articles():
+async def get_trending_articles(request: Request):
     """Return today's cached trending articles, refreshing if stale."""
+    version = jsonstore.version(TRENDING_FILE)
     cached = _load_json(TRENDING_FILE, [])
     today = datetime.utcnow().strftime("%Y-%m-%d")
     if cached and cached[0].get("fetched_at", "").startswith(today):
-        return cached
+        return await _cached_json_response(request, "trending-articles", version, lambda: cached)
     return await _fetch_trending_articles()
 
 
@@ -844,24 +1206,8 @@ def _extract_email_address(from_header: str) -> tuple[str, str]:
     return addr, name
 
 
-def _get_plain_text(msg) -> str:
-    """Extract plain-text body from an email.message.Message object."""
-    body = ""
-    if msg.is_multipart():
-        for part in msg.walk():
-            ct = part.get_content_type()
-            cd = str(part.get("Content-Disposition", ""))
-            if ct == "text/plain" and "attachment" not in cd:
-                payload = part.get_payload(decode=True)
-                charset = part.get_content_charset() or "utf-8"
-                body = payload.decode(charset, errors="replace")
-                break
-    else:
-        payload = msg.get_payload(decode=True)
-        charset = msg.get_content_charset() or "utf-8"
-        if payload:
-            body = payload.decode(charset, errors="replace")
-
+def _clean_body(body: str) -> str:
+    """Plain-text preview of an email body for drafting."""
     # Strip quoted reply lines ("> ...")
     clean = "\n".join(
         ln for ln in body.splitlines()
@@ -870,64 +1216,138 @@ def _get_plain_text(msg) -> str:
     return clean.strip()[:1200]
 
 
-def _gmail_fetch_new(gmail_user: str, gmail_pass: str) -> list[dict]:
-    """Fetch emails newer than the stored UID watermark. Does not rely on SEEN flag."""
-    try:
-        watermarks = _load_json(GMAIL_WATERMARK_FILE, {})
-        last_uid = watermarks.get(gmail_user, 0)
+# Serializes watermark read → fetch → advance per account within this process
+# (IDLE thread vs poll); across processes the watermark swap decides
+_gmail_locks: dict[str, threading.Lock] = {}
 
-        imap = imaplib.IMAP4_SSL("imap.gmail.com")
-        imap.login(gmail_user, gmail_pass)
-        imap.select("INBOX")
 
-        # Fetch by UID greater than watermark
-        search_criterion = f"UID {last_uid + 1}:*"
-        status, data = imap.uid("search", None, search_criterion)
-        if status != "OK" or not data[0]:
-            imap.logout()
-            return []
+def _gmail_connect(gmail_user: str, gmail_pass: str) -> imaplib.IMAP4:
+    imap = imaplib.IMAP4_SSL("imap.gmail.com", timeout=GMAIL_IMAP_TIMEOUT)
+    imap.login(gmail_user, gmail_pass)
+    imap.select("INBOX")
+    return imap
 
-        all_uids = data[0].split()
-        if not all_uids:
-            imap.logout()
-            return []
 
-        # Only process the 10 most recent to avoid timeouts
-        uids_to_fetch = all_uids[-10:]
-        new_watermark = int(uids_to_fetch[-1])
+def _gmail_fetch_new(gmail_user: str, gmail_pass: str, imap: imaplib.IMAP4 | None = None) -> list[dict]:
+    """Fetch emails newer than the stored UID watermark. Does not rely on SEEN flag.
 
-        results = []
-        for uid in uids_to_fetch:
-            status, raw = imap.uid("fetch", uid, "(RFC822)")
-            if status != "OK" or not raw or raw[0] is None:
-                continue
+    Uses `imap` (e.g. the IDLE watcher's connection) when given, otherwise
+    opens and closes a connection of its own. IMAP errors propagate so the
+    poller can back off / the IDLE watcher can reconnect.
+    """
+    own = imap is None
+    with _gmail_locks.setdefault(gmail_user, threading.Lock()):
+        if own:
+            imap = _gmail_connect(gmail_user, gmail_pass)
+        try:
+            return _gmail_fetch_since_watermark(imap, gmail_user)
+        finally:
+            if own:
+                try:
+                    imap.logout()
+                except Exception:
+                    pass
 
-            msg = email_lib.message_from_bytes(raw[0][1])
-            message_id = msg.get("Message-ID", "").strip() or f"uid:{uid.decode()}"
-            subject    = _decode_str(msg.get("Subject", "(no subject)"))
-            from_raw   = _decode_str(msg.get("From", ""))
-            sender_email, sender_name = _extract_email_address(from_raw)
-            body = _get_plain_text(msg)
 
-            results.append({
-                "message_id": message_id,
-                "subject": subject,
-                "sender_email": sender_email,
-                "sender_name": sender_name,
-                "body": body,
-            })
+GMAIL_HEADER_FIELDS = "MESSAGE-ID SUBJECT FROM"
+GMAIL_PAGE_SIZE = 100          # UIDs per header/BODYSTRUCTURE FETCH
+GMAIL_TEXT_BYTES = 8192        # partial fetch of each text part (we keep ~1200 chars)
+GMAIL_HTML_BYTES = 32768       # HTML-only mail: markup and styles come before the text
+GMAIL_FETCH_BYTE_BUDGET = int(os.environ.get("GMAIL_FETCH_BYTE_BUDGET", "524288"))  # per text FETCH
+GMAIL_INITIAL_BACKLOG = 10     # first run for an account: only the newest few
 
-        imap.logout()
 
-        # Update watermark
-        watermarks[gmail_user] = new_watermark
-        _save_json(GMAIL_WATERMARK_FILE, watermarks)
+def _gmail_fetch_since_watermark(imap: imaplib.IMAP4, gmail_user: str) -> list[dict]:
+    """Fetch everything above the watermark, page by page.
 
-        return results
-    except Exception as e:
-        print(f"[gmail] IMAP error: {e}")
+    The watermark moves after each page, and only past UIDs that page
+    actually fetched and parsed, so a failure mid-backlog resumes there.
+    Each move is a compare-and-swap: if another fetcher (the IDLE watcher or
+    a poll in another process) moved it first, that fetcher owns those UIDs
+    and this page is dropped.
+    """
+    key = f"gmail_watermark:{gmail_user}"
+    watermark = store.get_value(key)
+    last_uid = watermark or 0
+
+    # Fetch by UID greater than watermark
+    status, data = imap.uid("search", None, f"UID {last_uid + 1}:*")
+    if status != "OK" or not data[0]:
         return []
 
+    # "n:*" always matches the newest message, even when it is <= the watermark
+    uids = sorted(int(u) for u in data[0].split() if int(u) > last_uid)
+    if not last_uid:
+        uids = uids[-GMAIL_INITIAL_BACKLOG:]
+
+    results = []
+    for i in range(0, len(uids), GMAIL_PAGE_SIZE):
+        page = uids[i:i + GMAIL_PAGE_SIZE]
+        try:
+            fetched = _gmail_fetch_page(imap, page)
+        except (imaplib.IMAP4.error, OSError) as e:
+            # Hand back the pages already past the watermark; the rest is retried next time
+            print(f"[gmail] Fetch stopped at UID {page[0]} for {gmail_user}: {e}")
+            break
+        if not store.swap_value(key, watermark, page[-1]):
+            print(f"[gmail] Watermark for {gmail_user} moved by another fetcher; stopping at UID {page[0]}")
+            break
+        watermark = page[-1]
+        results += fetched
+    if uids:
+        print(f"[gmail] Fetched {len(results)} of {len(uids)} new UIDs for {gmail_user}")
+    return results
+
+
+def _gmail_fetch_page(imap: imaplib.IMAP4, uids: list[int]) -> list[dict]:
+    """Headers + BODYSTRUCTURE in one FETCH, then only the text parts, in byte-budgeted FETCHes."""
+    meta = imap_fetch.fetch(
+        imap, uids, f"(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({GMAIL_HEADER_FIELDS})])"
+    )
+    parts = {uid: imap_fetch.find_text_part(m.get("BODYSTRUCTURE")) for uid, m in meta.items()}
+
+    # Text parts live at different sections (1, 1.1, ...): one FETCH per section
+    # (and partial length), split so the bytes requested by a single FETCH stay
+    # within the budget
+    by_section: dict[tuple[str, int], list[int]] = {}
+    for uid, part in parts.items():
+        if part:
+            limit = GMAIL_HTML_BYTES if part["subtype"] == "html" else GMAIL_TEXT_BYTES
+            by_section.setdefault((part["section"], limit), []).append(uid)
+    texts: dict[int, bytes] = {}
+    for (section, limit), group in by_section.items():
+        size_of = lambda uid: min(parts[uid]["size"], limit)  # noqa: E731
+        for batch in imap_fetch.byte_batches(group, size_of, GMAIL_FETCH_BYTE_BUDGET):
+            fetched = imap_fetch.fetch(imap, batch, f"(UID BODY.PEEK[{section}]<0.{limit}>)")
+            for uid, fields in fetched.items():
+                texts[uid] = imap_fetch.body_item(fields) or b""
+                metrics.incr("gmail.fetch.text_bytes", len(texts[uid]))
+
+    results = []
+    for uid in sorted(meta):
+        msg = email_lib.message_from_bytes(imap_fetch.body_item(meta[uid]) or b"")
+        part = parts[uid]
+        body = ""
+        if part and uid in texts:
+            body = imap_fetch.decode_part(texts[uid], part["encoding"], part["charset"])
+            if part["subtype"] == "html":
+                body = imap_fetch.html_to_text(body)
+            body = _clean_body(body)
+        message_id = msg.get("Message-ID", "").strip() or f"uid:{uid}"
+        subject    = _decode_str(msg.get("Subject", "(no subject)"))
+        from_raw   = _decode_str(msg.get("From", ""))
+        sender_email, sender_name = _extract_email_address(from_raw)
+
+        results.append({
+            "message_id": message_id,
+            "subject": subject,
+            "sender_email": sender_email,
+            "sender_name": sender_name,
+            "body": body,
+        })
+    metrics.incr("gmail.fetch.messages", len(results))
+    return results
+
 
 def _gmail_send(gmail_user: str, gmail_pass: str,
                 to_addr: str, to_name: str,
@@ -973,37 +1393,24 @@ def _twilio_send_sms(to_number: str, body: str) -> bool:
         return False
 
 
-def _sms_get_history(phone_number: str) -> list[dict]:
+async def _sms_get_history(phone_number: str) -> list[dict]:
     """Return last 10 SMS exchanges with a given number."""
-    history = _load_json(SMS_HISTORY_FILE, {})
-    return history.get(phone_number, [])[-10:]
+    return await db.get_thread("sms", phone_number, limit=10)
 
 
-def _sms_append_history(phone_number: str, role: str, content: str) -> None:
+async def _sms_append_history(phone_number: str, role: str, content: str) -> None:
     """Append a message to the SMS conversation history."""
-    history = _load_json(SMS_HISTORY_FILE, {})
-    thread = history.get(phone_number, [])
-    thread.append({"role": role, "content": content})
-    history[phone_number] = thread[-50:]  # keep last 50 per contact
-    _save_json(SMS_HISTORY_FILE, history)
+    await db.append_thread("sms", phone_number, role, content, keep=50)  # keep last 50 per contact
 
 
 # ── WhatsApp Cloud API ─────────────────────────────────────────────────────────
 
-WHATSAPP_HISTORY_FILE = os.path.join(DATA_DIR, "whatsapp_history.json")
+async def _whatsapp_get_history(wa_id: str) -> list[dict]:
+    return await db.get_thread("whatsapp", wa_id, limit=10)
 
 
-def _whatsapp_get_history(wa_id: str) -> list[dict]:
-    history = _load_json(WHATSAPP_HISTORY_FILE, {})
-    return history.get(wa_id, [])[-10:]
-
-
-def _whatsapp_append_history(wa_id: str, role: str, content: str) -> None:
-    history = _load_json(WHATSAPP_HISTORY_FILE, {})
-    thread = history.get(wa_id, [])
-    thread.append({"role": role, "content": content})
-    history[wa_id] = thread[-50:]
-    _save_json(WHATSAPP_HISTORY_FILE, history)
+async def _whatsapp_append_history(wa_id: str, role: str, content: str) -> None:
+    await db.append_thread("whatsapp", wa_id, role, content, keep=50)
 
 
 async def _whatsapp_send(to_wa_id: str, text: str) -> bool:
@@ -1034,8 +1441,16 @@ async def _whatsapp_send(to_wa_id: str, text: str) -> bool:
 
 async def _draft_reply_options(sender_name: str, message: str,
                                subject: str | None = None) -> list[str]:
+    """3 reply options (brief, friendly, formal), from the draft cache when possible."""
+    return await draft_cache.get_or_create(
+        draft_key("options", sender_name, message, subject),
+        lambda: _generate_reply_options(sender_name, message, subject),
+    )
+
+
+async def _generate_reply_options(sender_name: str, message: str,
+                                  subject: str | None = None) -> list[str]:
     """Call Claude Haiku to generate 3 reply options (brief, friendly, formal). Returns list."""
-    import anthropic as _anthropic
     anthropic_key = os.environ.get("ANTHROPIC_API_KEY")
     if not anthropic_key:
         return []
@@ -1055,16 +1470,12 @@ async def _draft_reply_options(sender_name: str, message: str,
         "content": f"From: {sender_name}{subject_line}\n\n{message}\n\nGenerate 3 reply options:",
     }]
     try:
-        ac = _anthropic.Anthropic(api_key=anthropic_key)
-        msg = await asyncio.to_thread(
-            lambda: ac.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=500,
-                system=system,
-                messages=messages,
-            )
+        raw = await llm.text(
+            model="claude-haiku-4-5-20251001",
+            max_tokens=500,
+            system=system,
+            messages=messages,
         )
-        raw = msg.content[0].text.strip()
         # Strip markdown code fences if present
         if raw.startswith("```"):
             raw = re.sub(r"^```[a-z]*\n?", "", raw)
@@ -1110,53 +1521,106 @@ def _get_gmail_accounts() -> list[dict]:
     return []
 
 
+# Accounts are polled concurrently, each with its own failure backoff;
+# drafting for all accounts shares one concurrency limit so a burst on one
+# inbox can't monopolise the model or starve the others. A hung IMAP server
+# is cut off by the socket timeout inside the fetch thread, never by
+# cancelling the poll: by then the watermark may already have moved past
+# mail that still needs drafting.
+GMAIL_IMAP_TIMEOUT = float(os.environ.get("GMAIL_IMAP_TIMEOUT", "60"))  # per socket operation
+GMAIL_DRAFT_CONCURRENCY = int(os.environ.get("GMAIL_DRAFT_CONCURRENCY", "4"))
+GMAIL_BACKOFF_BASE = 60      # seconds after the first failure, doubling
+GMAIL_BACKOFF_MAX = 3600
+
+_gmail_draft_slots = asyncio.Semaphore(GMAIL_DRAFT_CONCURRENCY)
+_gmail_account_state: dict[str, dict] = {}  # user → {"failures", "retry_at", "last_error"}
+
+
 async def _poll_gmail_account(account: dict) -> int:
     """Poll a single Gmail account. Returns count of new items."""
     nickname = account.get("nickname", "Gmail")
-    gmail_user = account["user"]
-    gmail_pass = account["password"]
-
     print(f"[gmail:{nickname}] Polling inbox…")
-    emails = await asyncio.to_thread(_gmail_fetch_new, gmail_user, gmail_pass)
-    if not emails:
+    start = time.perf_counter()
+    emails = await asyncio.to_thread(_gmail_fetch_new, account["user"], account["password"])
+    count = await _process_gmail_emails(account, emails)
+    elapsed = time.perf_counter() - start
+    metrics.observe(f"gmail.{nickname}.poll", elapsed)
+    if emails:
+        metrics.gauge(f"gmail.{nickname}.emails_per_s", len(emails) / elapsed)
+    return count
+
+
+async def _poll_gmail_account_guarded(account: dict) -> int:
+    """_poll_gmail_account with the account's failure backoff applied."""
+    nickname = account.get("nickname", "Gmail")
+    state = _gmail_account_state.setdefault(account["user"], {"failures": 0, "retry_at": 0.0, "last_error": None})
+    if time.time() < state["retry_at"]:
+        return 0
+    try:
+        count = await _poll_gmail_account(account)
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        state["failures"] += 1
+        delay = min(GMAIL_BACKOFF_BASE * 2 ** (state["failures"] - 1), GMAIL_BACKOFF_MAX)
+        state["retry_at"] = time.time() + delay
+        state["last_error"] = error
+        metrics.incr(f"gmail.{nickname}.failures")
+        print(f"[gmail:{nickname}] Poll failed ({error}); next attempt in {delay}s")
         return 0
+    state.update(failures=0, retry_at=0.0, last_error=None)
+    return count
 
-    # Load existing records to skip already-processed message IDs
-    existing = _load_json(PENDING_REPLIES_FILE, [])
-    existing_chat_ids = {r.get("chat_id", "") for r in existing}
 
-    new_count = 0
+async def _draft_email(nickname: str, em: dict) -> list[str]:
+    async with _gmail_draft_slots:
+        start = time.perf_counter()
+        options = await _draft_reply_options(em["sender_name"], em["body"], em["subject"])
+    elapsed = time.perf_counter() - start
+    metrics.observe("gmail.draft", elapsed)
+    metrics.observe(f"gmail.{nickname}.draft", elapsed)
+    return options
+
+
+async def _process_gmail_emails(account: dict, emails: list[dict]) -> int:
+    """Draft replies for fetched emails (in parallel) and queue them as pending replies."""
+    if not emails:
+        return 0
+    nickname = account.get("nickname", "Gmail")
+    gmail_user = account["user"]
+    metrics.incr(f"gmail.{nickname}.emails", len(emails))
+
+    todo = []
     for em in emails:
-        chat_id = f"email:{em['message_id']}"
-        if chat_id in existing_chat_ids:
+        # Skip already-processed message IDs (indexed lookup on chat_id)
+        if await db.has_chat_id(f"email:{em['message_id']}"):
             continue
 
-        sender_email = em["sender_email"]
-        sender_name  = em["sender_name"]
-        subject      = em["subject"]
-        body         = em["body"]
-
         # Skip automated/noreply senders
-        if any(p in sender_email.lower() for p in NOREPLY_PATTERNS):
-            print(f"[gmail:{nickname}] Skipping automated sender: {sender_email}")
+        if any(p in em["sender_email"].lower() for p in NOREPLY_PATTERNS):
+            print(f"[gmail:{nickname}] Skipping automated sender: {em['sender_email']}")
             continue
 
-        if not body.strip():
+        if not em["body"].strip():
             continue
 
-        print(f"[gmail:{nickname}] New email from {sender_name} <{sender_email}>: {subject[:50]}")
+        print(f"[gmail:{nickname}] New email from {em['sender_name']} <{em['sender_email']}>: {em['subject'][:50]}")
+        todo.append(em)
 
-        options = await _draft_reply_options(sender_name, body, subject)
+    async def handle(em: dict) -> bool:
+        options = await _draft_email(nickname, em)
         if not options:
-            continue
+            return False
         draft = options[0]  # first option as default
+        sender_email = em["sender_email"]
+        sender_name  = em["sender_name"]
+        subject      = em["subject"]
 
         record = {
             "id": str(uuid.uuid4()),
             "sender_name": sender_name,
             "sender_handle": sender_email,
-            "chat_id": chat_id,
-            "original_message": body,
+            "chat_id": f"email:{em['message_id']}",
+            "original_message": em["body"],
             "draft_reply": draft,
             "draft_options": options,
             "source": "email",
@@ -1168,47 +1632,80 @@ async def _poll_gmail_account(account: dict) -> int:
             "approved_text": None,
             "created_at": datetime.utcnow().isoformat() + "Z",
         }
-        records = _load_json(PENDING_REPLIES_FILE, [])
-        records.append(record)
-        _save_json(PENDING_REPLIES_FILE, records)
-        existing_chat_ids.add(chat_id)
-        new_count += 1
-
-        # Push notify
-        devices = _load_json(DEVICES_FILE, [])
-        tokens = [d["token"] for d in devices if d.get("token")]
-        if tokens:
-            async with httpx.AsyncClient() as client:
-                for token in tokens:
-                    try:
-                        resp = await client.post(
-                            "https://exp.host/--/api/v2/push/send",
-                            json={
-                                "to": token,
-                                "title": f"✉️ [{nickname}] Email from {sender_name}",
-                                "body": subject,
-                                "sound": "default",
-                                "data": {"type": "pending_reply", "id": record["id"], "draft": draft},
-                                "categoryId": "PENDING_REPLY",
-                            },
-                        )
-                        print(f"[push] token={token[:20]}... status={resp.status_code} body={resp.text[:200]}")
-                    except Exception as e:
-                        print(f"[push] error: {e}")
+        await db.add_pending_reply(record)
+
+        await push.notify(
+            f"✉️ [{nickname}] Email from {sender_name}",
+            subject,
+            {"type": "pending_reply", "id": record["id"], "draft": draft},
+            categoryId="PENDING_REPLY",
+        )
+        return True
 
+    new_count = sum(await asyncio.gather(*(handle(em) for em in todo)))
     print(f"[gmail:{nickname}] {new_count} new emails queued")
     return new_count
 
 
 async def _poll_gmail() -> int:
-    """Poll all configured Gmail accounts. Returns total count of new items."""
+    """Poll all configured Gmail accounts concurrently. Returns total count of new items."""
     accounts = _get_gmail_accounts()
     if not accounts:
         return 0
-    total = 0
-    for account in accounts:
-        total += await _poll_gmail_account(account)
-    return total
+    counts = await asyncio.gather(*(_poll_gmail_account_guarded(a) for a in accounts))
+    return sum(counts)
+
+
+# ── Gmail IMAP IDLE ───────────────────────────────────────────────────────────
+# One persistent IDLE connection per account delivers new mail within
+# seconds; the scheduled poll drops to a slow safety net while it runs.
+
+GMAIL_IDLE = os.environ.get("GMAIL_IDLE", "1") != "0"
+GMAIL_POLL_MINUTES = 5          # without IDLE
+GMAIL_SAFETY_POLL_MINUTES = 30  # with IDLE
+
+_gmail_watchers: dict[str, IdleWatcher] = {}
+
+
+def _log_gmail_failure(account: dict, fut: concurrent.futures.Future) -> None:
+    """Report a failed IDLE-triggered processing run, which nothing else awaits."""
+    if fut.cancelled() or fut.exception() is None:
+        return
+    nickname = account.get("nickname", "Gmail")
+    error = fut.exception()
+    metrics.incr(f"gmail.{nickname}.failures")
+    print(f"[gmail:{nickname}] Processing new mail failed ({str(error) or type(error).__name__})")
+
+
+def _start_gmail_idle(loop: asyncio.AbstractEventLoop) -> None:
+    for account in _get_gmail_accounts():
+        user, pwd = account["user"], account["password"]
+
+        def on_new(imap, account=account, user=user, pwd=pwd):
+            emails = _gmail_fetch_new(user, pwd, imap)
+            if emails:
+                # Drafting runs on the event loop; the watcher goes straight back to IDLE
+                fut = asyncio.run_coroutine_threadsafe(_process_gmail_emails(account, emails), loop)
+                fut.add_done_callback(lambda f, account=account: _log_gmail_failure(account, f))
+
+        watcher = IdleWatcher(
+            account.get("nickname", "Gmail"),
+            lambda user=user, pwd=pwd: _gmail_connect(user, pwd),
+            on_new,
+        )
+        _gmail_watchers[user] = watcher
+        watcher.start()
+
+
+async def _start_gmail_service() -> None:
+    _start_gmail_idle(asyncio.get_running_loop())
+
+
+async def _stop_gmail_idle() -> None:
+    watchers = list(_gmail_watchers.values())
+    _gmail_watchers.clear()
+    for watcher in watchers:
+        await asyncio.to_thread(watcher.stop)
 
 
 @app.get("/gmail/status")
@@ -1217,7 +1714,16 @@ async def gmail_status():
     accounts = _get_gmail_accounts()
     return {
         "configured": len(accounts) > 0,
-        "accounts": [{"nickname": a.get("nickname", "Gmail"), "user": a["user"]} for a in accounts],
+        "accounts": [
+            {
+                "nickname": a.get("nickname", "Gmail"),
+                "user": a["user"],
+                "idle_connected": a["user"] in _gmail_watchers and _gmail_watchers[a["user"]].connected,
+                "failures": _gmail_account_state.get(a["user"], {}).get("failures", 0),
+                "last_error": _gmail_account_state.get(a["user"], {}).get("last_error"),
+            }
+            for a in accounts
+        ],
     }
 
 
@@ -1253,8 +1759,7 @@ async def gmail_debug():
             imap.select("INBOX")
             _, data = imap.uid("search", None, "ALL")
             all_ids = data[0].split() if data[0] else []
-            watermarks = _load_json(GMAIL_WATERMARK_FILE, {})
-            last_uid = watermarks.get(acct["user"], 0)
+            last_uid = await db.get_value(f"gmail_watermark:{acct['user']}", 0)
             imap.logout()
             results.append({
                 "nickname": acct.get("nickname", "Gmail"),
@@ -1277,7 +1782,10 @@ async def gmail_debug():
 
 @app.post("/twilio/incoming")
 async def twilio_incoming(request: Request):
-    """Twilio webhook — called when an SMS arrives on our Twilio number."""
+    """Twilio webhook — called when an SMS arrives on our Twilio number.
+
+    Only enqueues; drafting, forwarding and the push happen in the job worker.
+    """
     form = await request.form()
     from_number = form.get("From", "")
     body        = (form.get("Body") or "").strip()
@@ -1286,10 +1794,26 @@ async def twilio_incoming(request: Request):
         return Response(content="<Response/>", media_type="application/xml")
 
     print(f"[twilio] SMS from {from_number}: {body[:80]}")
+    sid = form.get("MessageSid")
+    await jobs.enqueue(
+        "sms_incoming",
+        {"from": from_number, "body": body, "record_id": str(uuid.uuid4())},
+        key=f"sms:{sid}" if sid else None,  # Twilio retries reuse the MessageSid
+    )
+
+    # Return empty TwiML — we never auto-reply; human approves first
+    return Response(content="<Response/>", media_type="application/xml")
+
 
-    # Build conversation history for context
-    history = _sms_get_history(from_number)
-    _sms_append_history(from_number, "user", body)
+@jobs.handler("sms_incoming")
+async def _handle_incoming_sms(payload: dict, job: dict) -> None:
+    """Draft reply options, store the pending reply, forward the SMS and push."""
+    from_number, body, record_id = payload["from"], payload["body"], payload["record_id"]
+    if await db.get_pending_reply(record_id) is not None:
+        return  # a previous attempt got this far; the forward job is keyed
+
+    if job["attempts"] == 1:
+        await _sms_append_history(from_number, "user", body)
 
     # Use display name from history metadata if we have one; fall back to number
     sender_name = from_number
@@ -1298,7 +1822,6 @@ async def twilio_incoming(request: Request):
     options = await _draft_reply_options(sender_name=sender_name, message=body, subject=None)
     draft_reply = options[0] if options else ""
 
-    record_id = str(uuid.uuid4())
     record = {
         "id": record_id,
         "sender_name": sender_name,
@@ -1311,42 +1834,32 @@ async def twilio_incoming(request: Request):
         "status": "pending",
         "created_at": datetime.utcnow().isoformat(),
     }
-    records = _load_json(PENDING_REPLIES_FILE, [])
-    records.append(record)
-    _save_json(PENDING_REPLIES_FILE, records)
+    await db.add_pending_reply(record)
 
     # Forward to personal number via SMS
     if MY_PHONE_NUMBER:
-        fwd = f"SMS from {from_number}:\n{body}"
-        await asyncio.to_thread(_twilio_send_sms, MY_PHONE_NUMBER, fwd)
+        await jobs.enqueue(
+            "sms_forward",
+            {"to": MY_PHONE_NUMBER, "body": f"SMS from {from_number}:\n{body}"},
+            key=f"sms_forward:{record_id}",
+        )
 
     # Push notification
     if draft_reply:
-        devices = _load_json(DEVICES_FILE, [])
-        tokens = [d["token"] for d in devices if d.get("token")]
-        if tokens:
-            async with httpx.AsyncClient() as client:
-                for token in tokens:
-                    payload = {
-                        "to": token,
-                        "title": f"💬 SMS from {sender_name}",
-                        "body": body,
-                        "sound": "default",
-                        "data": {
-                            "type": "pending_reply",
-                            "id": record_id,
-                            "draft": draft_reply,
-                            "categoryId": "PENDING_REPLY",
-                        },
-                    }
-                    try:
-                        await client.post("https://exp.host/--/api/v2/push/send", json=payload)
-                        print(f"[push] SMS notification sent to token ...{token[-10:]}")
-                    except Exception:
-                        pass
+        await push.notify(
+            f"💬 SMS from {sender_name}",
+            body,
+            {"type": "pending_reply", "id": record_id, "draft": draft_reply, "categoryId": "PENDING_REPLY"},
+        )
 
-    # Return empty TwiML — we never auto-reply; human approves first
-    return Response(content="<Response/>", media_type="application/xml")
+
+@jobs.handler("sms_forward")
+async def _handle_sms_forward(payload: dict, job: dict) -> None:
+    if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_PHONE_NUMBER):
+        print("[twilio] SMS not configured; not forwarding")
+        return
+    if not await asyncio.to_thread(_twilio_send_sms, payload["to"], payload["body"]):
+        raise RuntimeError("Twilio send failed")
 
 
 @app.get("/twilio/status")
@@ -1370,7 +1883,7 @@ async def whatsapp_verify(request: Request):
 
 @app.post("/whatsapp/incoming")
 async def whatsapp_incoming(request: Request):
-    """Meta WhatsApp Cloud API webhook — handles incoming messages."""
+    """Meta WhatsApp Cloud API webhook — enqueues incoming text messages."""
     try:
         data = await request.json()
     except Exception:
@@ -1382,67 +1895,63 @@ async def whatsapp_incoming(request: Request):
         if not messages:
             return {"ok": True}  # status update, not a message
 
-        msg = messages[0]
-        if msg.get("type") != "text":
-            return {"ok": True}  # ignore media/reactions for now
-
-        wa_id      = msg["from"]          # sender's WhatsApp ID (phone number)
-        body       = msg["text"]["body"].strip()
         contact    = entry.get("contacts", [{}])[0]
-        sender_name = contact.get("profile", {}).get("name") or wa_id
+        for msg in messages:
+            if msg.get("type") != "text":
+                continue  # ignore media/reactions for now
+
+            wa_id      = msg["from"]          # sender's WhatsApp ID (phone number)
+            body       = msg["text"]["body"].strip()
+            sender_name = contact.get("profile", {}).get("name") or wa_id
+
+            print(f"[whatsapp] Message from {sender_name} ({wa_id}): {body[:80]}")
+            await jobs.enqueue(
+                "whatsapp_incoming",
+                {"wa_id": wa_id, "sender_name": sender_name, "body": body,
+                 "record_id": str(uuid.uuid4())},
+                key=f"whatsapp:{msg['id']}" if msg.get("id") else None,  # Meta redelivers by id
+            )
 
-        print(f"[whatsapp] Message from {sender_name} ({wa_id}): {body[:80]}")
+    except Exception as e:
+        print(f"[whatsapp] Webhook parse error: {e}")
 
-        _whatsapp_append_history(wa_id, "user", body)
-        history = _whatsapp_get_history(wa_id)
+    return {"ok": True}
 
-        options = await _draft_reply_options(sender_name=sender_name, message=body, subject=None)
-        draft_reply = options[0] if options else ""
 
-        record_id = str(uuid.uuid4())
-        record = {
-            "id": record_id,
-            "sender_name": sender_name,
-            "sender_handle": wa_id,
-            "chat_id": wa_id,
-            "original_message": body,
-            "draft_reply": draft_reply,
-            "draft_options": options,
-            "source": "whatsapp",
-            "status": "pending",
-            "created_at": datetime.utcnow().isoformat(),
-        }
-        records = _load_json(PENDING_REPLIES_FILE, [])
-        records.append(record)
-        _save_json(PENDING_REPLIES_FILE, records)
-
-        # Push notification
-        devices = _load_json(DEVICES_FILE, [])
-        tokens = [d["token"] for d in devices if d.get("token")]
-        if tokens:
-            async with httpx.AsyncClient() as client:
-                for token in tokens:
-                    payload = {
-                        "to": token,
-                        "title": f"💬 WhatsApp from {sender_name}",
-                        "body": body,
-                        "sound": "default",
-                        "data": {
-                            "type": "pending_reply",
-                            "id": record_id,
-                            "draft": draft_reply,
-                            "categoryId": "PENDING_REPLY",
-                        },
-                    }
-                    try:
-                        await client.post("https://exp.host/--/api/v2/push/send", json=payload)
-                    except Exception:
-                        pass
+@jobs.handler("whatsapp_incoming")
+async def _handle_incoming_whatsapp(payload: dict, job: dict) -> None:
+    """Draft reply options, store the pending reply and push."""
+    wa_id, sender_name, body = payload["wa_id"], payload["sender_name"], payload["body"]
+    record_id = payload["record_id"]
+    if await db.get_pending_reply(record_id) is not None:
+        return  # a previous attempt already stored and pushed it
 
-    except Exception as e:
-        print(f"[whatsapp] Webhook parse error: {e}")
+    if job["attempts"] == 1:
+        await _whatsapp_append_history(wa_id, "user", body)
 
-    return {"ok": True}
+    options = await _draft_reply_options(sender_name=sender_name, message=body, subject=None)
+    draft_reply = options[0] if options else ""
+
+    record = {
+        "id": record_id,
+        "sender_name": sender_name,
+        "sender_handle": wa_id,
+        "chat_id": wa_id,
+        "original_message": body,
+        "draft_reply": draft_reply,
+        "draft_options": options,
+        "source": "whatsapp",
+        "status": "pending",
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    await db.add_pending_reply(record)
+
+    # Push notification
+    await push.notify(
+        f"💬 WhatsApp from {sender_name}",
+        body,
+        {"type": "pending_reply", "id": record_id, "draft": draft_reply, "categoryId": "PENDING_REPLY"},
+    )
 
 
 @app.get("/whatsapp/status")
@@ -1457,15 +1966,49 @@ async def whatsapp_status():
 
 @app.on_event("startup")
 async def start_scheduler():
+    await db.import_legacy_json(DATA_DIR)
+    loop = asyncio.get_running_loop()
+    store.subscribe("pending_replies", lambda: loop.call_soon_threadsafe(_pending_changed.notify))
+    push.start()
+    jobs.start()
+    reminder_engine.subscribe(_on_reminder_change)
+    reminder_scheduler.start(await asyncio.to_thread(reminder_engine.unsent))
+    await _resync_reminders()
+    # Embed notes/memories/files off the loop so the first semantic_search is fast
+    loop.run_in_executor(None, semantic_index.build)
     scheduler = AsyncIOScheduler()
-    scheduler.add_job(_dispatch_due_reminders, "interval", minutes=1)
-    scheduler.add_job(_fetch_ai_feed, "cron", hour=8, minute=0)
-    scheduler.add_job(_fetch_suggestions, "cron", hour=7, minute=0)
-    scheduler.add_job(_fetch_trending_articles, "cron", hour=7, minute=30)
-    scheduler.add_job(_poll_gmail, "interval", minutes=5)
+    # Per process: every worker keeps its own reminder heap (sends are claimed)
+    scheduler.add_job(_resync_reminders, "interval", minutes=1)
+    # One runner each, wherever the coordinator holds the lease
+    coordinator.job("jobs_purge", jobs.purge, "cron", hour=4, minute=0)
+    coordinator.job("pending_archive", _archive_pending_replies, "cron", hour=3, minute=30)
+    coordinator.job("sessions_purge", _purge_sessions, "cron", hour=3, minute=45)
+    coordinator.job("ai_feed", _fetch_ai_feed, "cron", hour=8, minute=0)
+    coordinator.job("suggestions", _fetch_suggestions, "cron", hour=7, minute=0)
+    coordinator.job("trending", _fetch_trending_articles, "cron", hour=7, minute=30)
+    gmail_idle = GMAIL_IDLE and bool(_get_gmail_accounts())
+    if gmail_idle:
+        coordinator.service("gmail_idle", _start_gmail_service, _stop_gmail_idle)
+    gmail_minutes = GMAIL_SAFETY_POLL_MINUTES if gmail_idle else GMAIL_POLL_MINUTES
+    coordinator.job("gmail_poll", _poll_gmail, "interval", minutes=gmail_minutes)
+    await coordinator.start(scheduler)
     scheduler.start()
 
 
+@app.get("/scheduler/status")
+async def scheduler_status():
+    """Which member runs which scheduled job."""
+    return await asyncio.to_thread(coordinator.status)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await coordinator.stop()  # stops the Gmail IDLE watchers if this member ran them
+    await reminder_scheduler.stop()
+    await jobs.stop()
+    await push.stop()
+
+
 # ── Entry point ───────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
@@ -0,0 +1,706 @@
+"""SQLite-backed state store for the API server.
+
+Pending replies, registered devices, SMS/WhatsApp threads, chat sessions,
+the background job queue, scheduler leases and small key/value state (Gmail
+watermarks) live in one WAL-mode database so an approve, dismiss or webhook
+is an indexed point update instead of a whole-file JSON rewrite.
+Legacy JSON files in the data directory are imported once on first start.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_replies (
+    id         TEXT PRIMARY KEY,
+    chat_id    TEXT NOT NULL DEFAULT '',
+    status     TEXT NOT NULL DEFAULT 'pending',
+    source     TEXT NOT NULL DEFAULT '',
+    account    TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL DEFAULT '',
+    seq        INTEGER NOT NULL DEFAULT 0,
+    data       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pending_replies_chat_id ON pending_replies(chat_id);
+CREATE INDEX IF NOT EXISTS idx_pending_replies_status  ON pending_replies(status);
+CREATE INDEX IF NOT EXISTS idx_pending_replies_created ON pending_replies(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_pending_replies_seq     ON pending_replies(seq);
+
+-- Dismissed (and long-approved) replies, out of the live working set
+CREATE TABLE IF NOT EXISTS pending_replies_archive (
+    id         TEXT PRIMARY KEY,
+    chat_id    TEXT NOT NULL DEFAULT '',
+    status     TEXT NOT NULL DEFAULT 'pending',
+    source     TEXT NOT NULL DEFAULT '',
+    account    TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL DEFAULT '',
+    seq        INTEGER NOT NULL DEFAULT 0,
+    data       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pending_archive_chat_id ON pending_replies_archive(chat_id);
+CREATE INDEX IF NOT EXISTS idx_pending_archive_created ON pending_replies_archive(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_pending_archive_seq     ON pending_replies_archive(seq);
+
+CREATE TABLE IF NOT EXISTS devices (
+    token    TEXT PRIMARY KEY,
+    platform TEXT NOT NULL DEFAULT ''
+);
+
+CREATE TABLE IF NOT EXISTS threads (
+    seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    handle  TEXT NOT NULL,
+    role    TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_threads_handle ON threads(channel, handle, seq);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id         TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    last_seq   INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at);
+
+CREATE TABLE IF NOT EXISTS session_messages (
+    session_id TEXT NOT NULL,
+    seq        INTEGER NOT NULL,
+    role       TEXT NOT NULL,
+    content    TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind            TEXT NOT NULL,
+    idempotency_key TEXT UNIQUE,
+    payload         TEXT NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'queued',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    run_at          REAL NOT NULL,
+    lease_until     REAL,
+    last_error      TEXT,
+    created_at      REAL NOT NULL,
+    finished_at     REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, run_at);
+
+CREATE TABLE IF NOT EXISTS leases (
+    name       TEXT PRIMARY KEY,
+    holder     TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS members (
+    id           TEXT PRIMARY KEY,
+    heartbeat_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS kv (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+-- Bumped in the same transaction as every write to a table, for every process
+CREATE TABLE IF NOT EXISTS table_versions (
+    name    TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+# Pending-reply sources the Mac companion sends ('' is an old iMessage record)
+COMPANION_SOURCES = "('', 'imessage', 'email')"
+
+# Legacy JSON files imported on first start (file name → import routine name)
+LEGACY_FILES = {
+    "pending_replies.json": "_import_pending_replies",
+    "devices.json": "_import_devices",
+    "sms_history.json": "_import_sms_history",
+    "whatsapp_history.json": "_import_whatsapp_history",
+    "gmail_watermark.json": "_import_gmail_watermarks",
+}
+
+
+class Store:
+    """Small repository API over a WAL-mode SQLite database.
+
+    One connection per thread; every write runs in its own IMMEDIATE
+    transaction so concurrent webhooks, the Gmail poller and tool threads
+    never interleave partial updates.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._listeners: dict[str, list] = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._migrate()
+        self._conn().executescript(SCHEMA)
+
+    def _migrate(self) -> None:
+        """Bring databases created by earlier versions up to SCHEMA."""
+        conn = self._conn()
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(pending_replies)")}
+        if columns and "seq" not in columns:
+            with self._tx() as conn:
+                conn.execute("ALTER TABLE pending_replies ADD COLUMN account TEXT NOT NULL DEFAULT ''")
+                conn.execute("ALTER TABLE pending_replies ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+                conn.execute(
+                    "UPDATE pending_replies SET seq = rowid, "
+                    "account = COALESCE(json_extract(data, '$.gmail_account'), '')"
+                )
+
+    # ── Connection handling ──────────────────────────────────────────────────
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self, table: str | None = None):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            if table:
+                conn.execute(
+                    "INSERT INTO table_versions (name, version) VALUES (?, 1) "
+                    "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+                    (table,),
+                )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        if table:
+            for callback in self._listeners.get(table, ()):
+                callback()
+
+    def subscribe(self, table: str, callback) -> None:
+        """Call `callback()` after every committed write to `table` (on the writing thread)."""
+        self._listeners.setdefault(table, []).append(callback)
+
+    def version(self, table: str) -> int:
+        """Changes whenever `table` is written, by any process; the same on every thread."""
+        row = self._conn().execute(
+            "SELECT version FROM table_versions WHERE name = ?", (table,)
+        ).fetchone()
+        return row["version"] if row else 0
+
+    # ── Pending replies ──────────────────────────────────────────────────────
+
+    @staticmethod
+    def _pending_row(record: dict) -> tuple:
+        return (
+            record["id"],
+            record.get("chat_id") or "",
+            record.get("status") or "pending",
+            record.get("source") or "",
+            record.get("gmail_account") or "",
+            record.get("created_at") or "",
+            json.dumps(record),
+        )
+
+    @staticmethod
+    def _pending_record(row) -> dict:
+        return {**json.loads(row["data"]), "seq": row["seq"]}
+
+    @staticmethod
+    def _next_pending_seq(conn) -> int:
+        return conn.execute(
+            "SELECT MAX(m) FROM (SELECT MAX(seq) AS m FROM pending_replies "
+            "UNION ALL SELECT MAX(seq) FROM pending_replies_archive)"
+        ).fetchone()[0] or 0
+
+    def _write_pending(self, conn, record: dict, archived: bool) -> int:
+        """Insert/replace `record` in the live table or the archive with a fresh seq."""
+        seq = self._next_pending_seq(conn) + 1
+        conn.execute("DELETE FROM pending_replies WHERE id = ?", (record["id"],))
+        conn.execute("DELETE FROM pending_replies_archive WHERE id = ?", (record["id"],))
+        table = "pending_replies_archive" if archived else "pending_replies"
+        conn.execute(
+            f"INSERT INTO {table} (id, chat_id, status, source, account, created_at, data, seq) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            self._pending_row(record) + (seq,),
+        )
+        return seq
+
+    def pending_seq(self) -> int:
+        """The latest change sequence number; pass it back as `since`."""
+        return self._next_pending_seq(self._conn())
+
+    def add_pending_reply(self, record: dict) -> dict:
+        with self._tx("pending_replies") as conn:
+            seq = self._write_pending(conn, record, archived=False)
+        return {**record, "seq": seq}
+
+    def _find_pending(self, conn, reply_id: str):
+        for table in ("pending_replies", "pending_replies_archive"):
+            row = conn.execute(f"SELECT data, seq FROM {table} WHERE id = ?", (reply_id,)).fetchone()
+            if row:
+                return row
+        return None
+
+    def get_pending_reply(self, reply_id: str) -> dict | None:
+        row = self._find_pending(self._conn(), reply_id)
+        return self._pending_record(row) if row else None
+
+    def update_pending_reply(self, reply_id: str, **fields) -> dict | None:
+        """Merge fields into one record. Returns the updated record, or None if missing.
+
+        Dismissed records move to the archive; anything else lives in the live table.
+        """
+        with self._tx("pending_replies") as conn:
+            row = self._find_pending(conn, reply_id)
+            if not row:
+                return None
+            record = json.loads(row["data"])
+            record.update(fields)
+            seq = self._write_pending(conn, record, archived=record.get("status") == "dismissed")
+        return {**record, "seq": seq}
+
+    def list_pending_replies(self, exclude_status: str | None = None) -> list[dict]:
+        """The whole live working set (the archive is not included)."""
+        if exclude_status:
+            rows = self._conn().execute(
+                "SELECT data, seq FROM pending_replies WHERE status != ? ORDER BY created_at, id",
+                (exclude_status,),
+            ).fetchall()
+        else:
+            rows = self._conn().execute(
+                "SELECT data, seq FROM pending_replies ORDER BY created_at, id"
+            ).fetchall()
+        return [self._pending_record(r) for r in rows]
+
+    @staticmethod
+    def _pending_filters(statuses, source, account) -> tuple[str, list]:
+        clauses, args = [], []
+        if statuses:
+            clauses.append(f"status IN ({','.join('?' * len(statuses))})")
+            args += list(statuses)
+        if source:
+            clauses.append("source = ?")
+            args.append(source)
+        if account:
+            clauses.append("account = ?")
+            args.append(account)
+        return " AND ".join(clauses) or "1", args
+
+    def query_pending_replies(self, statuses: list[str] | None = None, source: str | None = None,
+                              account: str | None = None, after: tuple[str, str] | None = None,
+                              limit: int = 50, archived: bool = False) -> list[dict]:
+        """One page in (created_at, id) order, starting after the `after` key."""
+        where, args = self._pending_filters(statuses, source, account)
+        if after:
+            where += " AND (created_at, id) > (?, ?)"
+            args += list(after)
+        table = "pending_replies_archive" if archived else "pending_replies"
+        rows = self._conn().execute(
+            f"SELECT data, seq FROM {table} WHERE {where} ORDER BY created_at, id LIMIT ?",
+            args + [limit],
+        ).fetchall()
+        return [self._pending_record(r) for r in rows]
+
+    def pending_changes(self, since: int, source: str | None = None, account: str | None = None,
+                        limit: int = 200) -> list[dict]:
+        """Records (live or archived) changed after `since`, in seq order.
+
+        There is no status filter: a record whose status changed must reach
+        clients whatever it changed to, or they'd never drop it from a view.
+        """
+        where, args = self._pending_filters(None, source, account)
+        rows = self._conn().execute(
+            f"SELECT data, seq FROM pending_replies WHERE seq > ? AND {where} "
+            f"UNION ALL SELECT data, seq FROM pending_replies_archive WHERE seq > ? AND {where} "
+            "ORDER BY seq LIMIT ?",
+            [since, *args, since, *args, limit],
+        ).fetchall()
+        return [self._pending_record(r) for r in rows]
+
+    def archive_pending_replies(self, approved_before: str) -> int:
+        """Move dismissed replies, and approved SMS/WhatsApp ones created before
+        `approved_before` (never sent), out of the live table. Seq numbers are kept.
+
+        Approved iMessage and email replies stay: they are the companion's
+        outbox, which it reads from the live table.
+        """
+        with self._tx("pending_replies") as conn:
+            where = (
+                "status = 'dismissed' OR (status = 'approved' AND created_at < ? "
+                f"AND source NOT IN {COMPANION_SOURCES})"
+            )
+            conn.execute(
+                f"INSERT OR REPLACE INTO pending_replies_archive "
+                f"(id, chat_id, status, source, account, created_at, seq, data) "
+                f"SELECT id, chat_id, status, source, account, created_at, seq, data "
+                f"FROM pending_replies WHERE {where}",
+                (approved_before,),
+            )
+            return conn.execute(f"DELETE FROM pending_replies WHERE {where}", (approved_before,)).rowcount
+
+    def count_companion_backlog(self, approved_before: str) -> int:
+        """Approved iMessage/email replies created before `approved_before` the companion hasn't sent."""
+        return self._conn().execute(
+            f"SELECT COUNT(*) FROM pending_replies WHERE status = 'approved' AND created_at < ? "
+            f"AND source IN {COMPANION_SOURCES}",
+            (approved_before,),
+        ).fetchone()[0]
+
+    def has_chat_id(self, chat_id: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM pending_replies WHERE chat_id = ? "
+            "UNION ALL SELECT 1 FROM pending_replies_archive WHERE chat_id = ? LIMIT 1",
+            (chat_id, chat_id),
+        ).fetchone()
+        return row is not None
+
+    # ── Devices ──────────────────────────────────────────────────────────────
+
+    def upsert_device(self, token: str, platform: str) -> None:
+        with self._tx("devices") as conn:
+            conn.execute(
+                "INSERT INTO devices (token, platform) VALUES (?, ?) "
+                "ON CONFLICT(token) DO UPDATE SET platform = excluded.platform",
+                (token, platform),
+            )
+
+    def list_devices(self) -> list[dict]:
+        rows = self._conn().execute(
+            "SELECT token, platform FROM devices ORDER BY rowid"
+        ).fetchall()
+        return [{"token": r["token"], "platform": r["platform"]} for r in rows]
+
+    def device_tokens(self) -> list[str]:
+        rows = self._conn().execute(
+            "SELECT token FROM devices WHERE token != '' ORDER BY rowid"
+        ).fetchall()
+        return [r["token"] for r in rows]
+
+    def remove_devices(self, tokens: list[str]) -> int:
+        """Drop tokens the push service reported as unregistered."""
+        with self._tx("devices") as conn:
+            return conn.executemany(
+                "DELETE FROM devices WHERE token = ?", [(t,) for t in tokens]
+            ).rowcount
+
+    # ── Conversation threads (SMS / WhatsApp) ────────────────────────────────
+
+    def get_thread(self, channel: str, handle: str, limit: int = 10) -> list[dict]:
+        rows = self._conn().execute(
+            "SELECT role, content FROM threads WHERE channel = ? AND handle = ? "
+            "ORDER BY seq DESC LIMIT ?",
+            (channel, handle, limit),
+        ).fetchall()
+        return [{"role": r["role"], "content": r["content"]} for r in reversed(rows)]
+
+    def append_thread(self, channel: str, handle: str, role: str, content: str,
+                      keep: int = 50) -> None:
+        """Append one message and trim the thread to its last `keep` entries."""
+        with self._tx("threads") as conn:
+            conn.execute(
+                "INSERT INTO threads (channel, handle, role, content) VALUES (?, ?, ?, ?)",
+                (channel, handle, role, content),
+            )
+            conn.execute(
+                "DELETE FROM threads WHERE channel = ? AND handle = ? AND seq <= ("
+                "  SELECT seq FROM threads WHERE channel = ? AND handle = ? "
+                "  ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+                (channel, handle, channel, handle, keep),
+            )
+
+    # ── Chat sessions ────────────────────────────────────────────────────────
+
+    def create_session(self, session_id: str, messages: list[dict] | None = None) -> int:
+        """Create a session, optionally seeded with prior messages. Returns its last seq."""
+        now = datetime.utcnow().isoformat() + "Z"
+        with self._tx("sessions") as conn:
+            conn.execute(
+                "INSERT INTO sessions (id, created_at, updated_at) VALUES (?, ?, ?)",
+                (session_id, now, now),
+            )
+            appended = self._append_session(conn, session_id, messages or [])
+        return appended[-1]["seq"] if appended else 0
+
+    def append_session_messages(self, session_id: str, messages: list[dict]) -> list[dict] | None:
+        """Append messages; returns them with their seq numbers, or None if no such session."""
+        with self._tx("sessions") as conn:
+            if not conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone():
+                return None
+            return self._append_session(conn, session_id, messages)
+
+    def _append_session(self, conn, session_id: str, messages: list[dict]) -> list[dict]:
+        last_seq = conn.execute(
+            "SELECT last_seq FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()["last_seq"]
+        appended = [
+            {"seq": last_seq + i, "role": m["role"], "content": m["content"]}
+            for i, m in enumerate(messages, 1)
+        ]
+        conn.executemany(
+            "INSERT INTO session_messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+            [(session_id, m["seq"], m["role"], m["content"]) for m in appended],
+        )
+        conn.execute(
+            "UPDATE sessions SET last_seq = ?, updated_at = ? WHERE id = ?",
+            (last_seq + len(appended), datetime.utcnow().isoformat() + "Z", session_id),
+        )
+        return appended
+
+    def session_messages(self, session_id: str, since: int = 0) -> list[dict] | None:
+        """Messages with seq > since, oldest first; None if no such session."""
+        conn = self._conn()
+        if not conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone():
+            return None
+        rows = conn.execute(
+            "SELECT seq, role, content FROM session_messages "
+            "WHERE session_id = ? AND seq > ? ORDER BY seq",
+            (session_id, since),
+        ).fetchall()
+        return [{"seq": r["seq"], "role": r["role"], "content": r["content"]} for r in rows]
+
+    def purge_sessions(self, updated_before: str) -> int:
+        """Delete sessions (and their messages) not used since `updated_before`."""
+        with self._tx("sessions") as conn:
+            conn.execute(
+                "DELETE FROM session_messages WHERE session_id IN "
+                "(SELECT id FROM sessions WHERE updated_at < ?)",
+                (updated_before,),
+            )
+            return conn.execute("DELETE FROM sessions WHERE updated_at < ?", (updated_before,)).rowcount
+
+    # ── Background jobs ──────────────────────────────────────────────────────
+
+    def enqueue_job(self, kind: str, payload: dict, key: str | None = None,
+                    run_at: float | None = None) -> int | None:
+        """Queue a job. Returns its id, or None if `key` was already enqueued."""
+        now = time.time()
+        with self._tx("jobs") as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO jobs (kind, idempotency_key, payload, run_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (kind, key, json.dumps(payload), run_at or now, now),
+            )
+        return cur.lastrowid if cur.rowcount else None
+
+    def claim_job(self, lease: float) -> dict | None:
+        """Lease the next runnable job: queued and due, or running with an expired lease."""
+        now = time.time()
+        with self._tx("jobs") as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status = 'queued' AND run_at <= ?) "
+                "OR (status = 'running' AND lease_until < ?) ORDER BY run_at LIMIT 1",
+                (now, now),
+            ).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ? "
+                "WHERE id = ?",
+                (now + lease, row["id"]),
+            )
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["attempts"] += 1
+        return job
+
+    def finish_job(self, job_id: int, error: str | None = None,
+                   retry_at: float | None = None) -> None:
+        """Mark a job done, schedule a retry (`retry_at`), or mark it failed."""
+        if error is None:
+            status = "done"
+        else:
+            status = "queued" if retry_at is not None else "failed"
+        with self._tx("jobs") as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, last_error = ?, run_at = COALESCE(?, run_at), "
+                "lease_until = NULL, finished_at = ? WHERE id = ?",
+                (status, error, retry_at, None if status == "queued" else time.time(), job_id),
+            )
+
+    def job_counts(self) -> dict[str, int]:
+        rows = self._conn().execute(
+            "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+        ).fetchall()
+        return {r["status"]: r["n"] for r in rows}
+
+    def next_job_at(self) -> float | None:
+        row = self._conn().execute(
+            "SELECT MIN(run_at) AS t FROM jobs WHERE status = 'queued'"
+        ).fetchone()
+        return row["t"]
+
+    def purge_jobs(self, finished_before: float) -> int:
+        """Drop finished jobs (their idempotency keys stop deduplicating)."""
+        with self._tx("jobs") as conn:
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (finished_before,),
+            ).rowcount
+
+    # ── Scheduler leases ─────────────────────────────────────────────────────
+
+    def acquire_lease(self, name: str, holder: str, ttl: float) -> bool:
+        """Take or renew a lease. False while another holder's lease is unexpired."""
+        now = time.time()
+        with self._tx() as conn:
+            return conn.execute(
+                "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, "
+                "expires_at = excluded.expires_at "
+                "WHERE leases.holder = excluded.holder OR leases.expires_at < ?",
+                (name, holder, now + ttl, now),
+            ).rowcount == 1
+
+    def release_lease(self, name: str, holder: str) -> None:
+        with self._tx() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+    def list_leases(self) -> list[dict]:
+        rows = self._conn().execute("SELECT name, holder, expires_at FROM leases ORDER BY name")
+        return [dict(r) for r in rows]
+
+    def heartbeat_member(self, member: str, ttl: float) -> int:
+        """Record that `member` is alive; returns how many members are."""
+        now = time.time()
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT INTO members (id, heartbeat_at) VALUES (?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                (member, now),
+            )
+            conn.execute("DELETE FROM members WHERE heartbeat_at < ?", (now - ttl,))
+            return conn.execute("SELECT COUNT(*) FROM members").fetchone()[0]
+
+    def remove_member(self, member: str) -> None:
+        with self._tx() as conn:
+            conn.execute("DELETE FROM members WHERE id = ?", (member,))
+            conn.execute("DELETE FROM leases WHERE holder = ?", (member,))
+
+    # ── Key/value state ──────────────────────────────────────────────────────
+
+    def get_value(self, key: str, default=None):
+        row = self._conn().execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row else default
+
+    def set_value(self, key: str, value) -> None:
+        with self._tx("kv") as conn:
+            conn.execute(
+                "INSERT INTO kv (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, json.dumps(value)),
+            )
+
+    def swap_value(self, key: str, expected, value) -> bool:
+        """Set `key` to `value` only if it still holds `expected` (None: unset). True if it did."""
+        with self._tx("kv") as conn:
+            if expected is None:
+                cursor = conn.execute(
+                    "INSERT INTO kv (key, value) VALUES (?, ?) ON CONFLICT(key) DO NOTHING",
+                    (key, json.dumps(value)),
+                )
+            else:
+                cursor = conn.execute(
+                    "UPDATE kv SET value = ? WHERE key = ? AND value = ?",
+                    (json.dumps(value), key, json.dumps(expected)),
+                )
+            return cursor.rowcount == 1
+
+    # ── Legacy JSON import ───────────────────────────────────────────────────
+
+    def import_legacy_json(self, data_dir: str) -> None:
+        """Import pre-SQLite JSON files once. The original files are left in place."""
+        for filename, importer in LEGACY_FILES.items():
+            path = os.path.join(data_dir, filename)
+            marker = f"imported:{filename}"
+            if not os.path.exists(path) or self.get_value(marker):
+                continue
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[store] Could not read {filename}: {e}")
+                continue
+            with self._tx() as conn:
+                count = getattr(self, importer)(conn, data)
+                conn.execute(
+                    "INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)",
+                    (marker, json.dumps(True)),
+                )
+            print(f"[store] Imported {count} records from {filename}")
+
+    def _import_pending_replies(self, conn, data) -> int:
+        records = [r for r in data if isinstance(r, dict) and r.get("id")]
+        first_seq = self._next_pending_seq(conn) + 1
+        conn.executemany(
+            "INSERT OR IGNORE INTO pending_replies "
+            "(id, chat_id, status, source, account, created_at, data, seq) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [self._pending_row(r) + (first_seq + i,) for i, r in enumerate(records)],
+        )
+        return len(records)
+
+    def _import_devices(self, conn, data) -> int:
+        devices = [d for d in data if isinstance(d, dict) and d.get("token")]
+        conn.executemany(
+            "INSERT OR IGNORE INTO devices (token, platform) VALUES (?, ?)",
+            [(d["token"], d.get("platform") or "") for d in devices],
+        )
+        return len(devices)
+
+    def _import_threads(self, conn, channel: str, data) -> int:
+        rows = [
+            (channel, handle, m.get("role", "user"), m.get("content", ""))
+            for handle, thread in data.items()
+            for m in thread
+            if isinstance(m, dict)
+        ]
+        conn.executemany(
+            "INSERT INTO threads (channel, handle, role, content) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        return len(rows)
+
+    def _import_sms_history(self, conn, data) -> int:
+        return self._import_threads(conn, "sms", data)
+
+    def _import_whatsapp_history(self, conn, data) -> int:
+        return self._import_threads(conn, "whatsapp", data)
+
+    def _import_gmail_watermarks(self, conn, data) -> int:
+        conn.executemany(
+            "INSERT OR IGNORE INTO kv (key, value) VALUES (?, ?)",
+            [(f"gmail_watermark:{user}", json.dumps(int(uid))) for user, uid in data.items()],
+        )
+        return len(data)
+
+
+class AsyncStore:
+    """Awaitable view of a Store for async code: `await db.method(...)`.
+
+    Every call runs in a worker thread, so a write waiting out the busy
+    timeout behind another process's transaction stalls that thread rather
+    than the event loop.
+    """
+
+    def __init__(self, store: Store):
+        self.store = store
+
+    def __getattr__(self, name: str):
+        method = getattr(self.store, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+        return call
@@ -0,0 +1,38 @@
+"""Shared test setup: the app modules read DATA_DIR and WORKSPACE_DIR on import,
+so both point at a throwaway directory before any test imports them."""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_scratch = tempfile.mkdtemp(prefix="assistant-tests-")
+os.environ["DATA_DIR"] = os.path.join(_scratch, "data")
+os.environ["WORKSPACE_DIR"] = os.path.join(_scratch, "workspace")
+os.environ.setdefault("ANTHROPIC_API_KEY", "test")
+os.makedirs(os.environ["DATA_DIR"], exist_ok=True)
+
+
+@pytest.fixture
+def store(tmp_path):
+    from store import Store
+    return Store(str(tmp_path / "assistant.db"))
+
+
+@pytest.fixture(scope="session")
+def server_app():
+    """The API app with its startup run once (scheduler, coordinator, push)."""
+    from fastapi.testclient import TestClient
+
+    import server
+    with TestClient(server.app) as client:
+        yield server, client
+
+
+@pytest.fixture
+def client(server_app):
+    return server_app[1]
@@ -0,0 +1,86 @@
+import importlib.util
+import os
+import uuid
+
+import pytest
+
+COMPANION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         "mac-companion", "companion.py")
+
+
+def _post(client, source) -> dict:
+    body = {"sender_name": "Ana", "sender_handle": "+15550100", "chat_id": f"{source}:{uuid.uuid4()}",
+            "original_message": "running late?", "draft_reply": "10 min", "source": source}
+    return client.post("/pending-reply", json=body).json()
+
+
+@pytest.fixture
+def sent(server_app, monkeypatch):
+    """Outgoing SMS/WhatsApp messages; set sent.ok = False to fail the sends."""
+    server = server_app[0]
+
+    class Sent(list):
+        ok = True
+
+    messages = Sent()
+
+    def sms(to, text):
+        messages.append(("sms", to, text))
+        return messages.ok
+
+    async def whatsapp(to, text):
+        messages.append(("whatsapp", to, text))
+        return messages.ok
+
+    monkeypatch.setattr(server, "_twilio_send_sms", sms)
+    monkeypatch.setattr(server, "_whatsapp_send", whatsapp)
+    return messages
+
+
+@pytest.mark.parametrize("source", ["sms", "whatsapp"])
+def test_sent_replies_never_show_up_as_approved(client, sent, source):
+    start = client.get("/pending-replies", params={"status": "pending", "limit": 1}).json()["seq"]
+    reply = _post(client, source)
+
+    result = client.patch(f"/pending-reply/{reply['id']}/approve", json={"approved_text": "on my way"}).json()
+    assert sent == [(source, "+15550100", "on my way")]
+    assert result["status"] == "dismissed" and result["approved_text"] == "on my way"
+
+    changes = client.get("/pending-replies", params={"since": start}).json()["items"]
+    assert [r["status"] for r in changes if r["id"] == reply["id"]] == ["dismissed"]
+
+
+def test_failed_sms_stays_approved_for_a_retry(client, sent):
+    reply = _post(client, "sms")
+    sent.ok = False
+    result = client.patch(f"/pending-reply/{reply['id']}/approve", json={"approved_text": "ok"}).json()
+    assert result["status"] == "approved"
+
+    sent.ok = True
+    result = client.patch(f"/pending-reply/{reply['id']}/approve", json={"approved_text": "ok"}).json()
+    assert result["status"] == "dismissed" and len(sent) == 2
+
+
+def test_imessage_waits_for_the_companion(client, sent):
+    reply = _post(client, "imessage")
+    result = client.patch(f"/pending-reply/{reply['id']}/approve", json={"approved_text": "yes"}).json()
+    assert result["status"] == "approved" and sent == []
+
+
+def test_unknown_reply_is_404(client, sent):
+    assert client.patch("/pending-reply/nope/approve", json={"approved_text": "x"}).status_code == 404
+    assert sent == []
+
+
+def test_companion_only_dispatches_imessage_and_email(monkeypatch):
+    spec = importlib.util.spec_from_file_location("companion", COMPANION)
+    companion = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(companion)
+    dispatched = []
+    monkeypatch.setattr(companion, "send_imessage_via_applescript", lambda *a: dispatched.append("imessage") or True)
+    monkeypatch.setattr(companion, "send_email_via_smtp", lambda *a: dispatched.append("email") or True)
+    monkeypatch.setattr(companion, "dismiss_reply", lambda reply_id: None)
+
+    for source in ("sms", "whatsapp", "imessage", "email", None):
+        companion.dispatch_approved({"id": f"r-{source}", "source": source, "approved_text": "hi"})
+    assert dispatched == ["imessage", "email", "imessage"]
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+import pytest
+
+from tools import calendar_engine, calendar_tool, jsonstore
+
+
+@pytest.fixture(autouse=True)
+def empty_calendar():
+    jsonstore.save(calendar_engine.CALENDAR_FILE, {"events": []})
+
+
+def _titles(occurrences) -> list[tuple[str, str]]:
+    return [(o.start.isoformat(timespec="minutes"), o.event["title"]) for o in occurrences]
+
+
+def test_between_returns_one_off_events_in_start_order():
+    calendar_engine.add("Late", "2026-03-02", "15:00")
+    calendar_engine.add("Early", "2026-03-02", "09:00")
+    calendar_engine.add("Outside", "2026-03-05")
+    found = calendar_engine.between(datetime(2026, 3, 1), datetime(2026, 3, 3))
+    assert _titles(found) == [("2026-03-02T09:00", "Early"), ("2026-03-02T15:00", "Late")]
+
+
+def test_recurring_events_expand_only_inside_the_window():
+    calendar_engine.add("Standup", "2026-03-02", "10:00", recurrence="FREQ=WEEKLY;BYDAY=MO")
+    found = calendar_engine.between(datetime(2026, 3, 1), datetime(2026, 3, 20))
+    assert _titles(found) == [("2026-03-02T10:00", "Standup"), ("2026-03-09T10:00", "Standup"),
+                              ("2026-03-16T10:00", "Standup")]
+
+
+def test_overlapping_includes_events_that_started_earlier():
+    calendar_engine.add("Long", "2026-03-02", "09:00", duration_minutes=180)
+    assert calendar_engine.between(datetime(2026, 3, 2, 10), datetime(2026, 3, 2, 11)) == []
+    assert _titles(calendar_engine.overlapping(datetime(2026, 3, 2, 10), datetime(2026, 3, 2, 11))) == [
+        ("2026-03-02T09:00", "Long"),
+    ]
+
+
+def test_updates_and_deletes_move_events_in_the_index():
+    event = calendar_engine.add("Call", "2026-03-02", "09:00")
+    calendar_engine.update(event["id"], date="2026-03-04")
+    assert _titles(calendar_engine.between(datetime(2026, 3, 1), datetime(2026, 3, 5))) == [
+        ("2026-03-04T09:00", "Call"),
+    ]
+    assert calendar_engine.delete(event["id"])
+    assert calendar_engine.between(datetime(2026, 3, 1), datetime(2026, 3, 5)) == []
+
+
+def test_busy_merges_timed_events_and_skips_all_day_ones():
+    calendar_engine.add("A", "2026-03-02", "09:00", duration_minutes=60)
+    calendar_engine.add("B", "2026-03-02", "09:30", duration_minutes=60)
+    calendar_engine.add("Birthday", "2026-03-02")
+    assert calendar_engine.busy(datetime(2026, 3, 2), datetime(2026, 3, 3)) == [
+        (datetime(2026, 3, 2, 9), datetime(2026, 3, 2, 10, 30)),
+    ]
+
+
+@pytest.mark.parametrize("rule", ["FREQ=MINUTELY", "FREQ=HOURLY;INTERVAL=2", "FREQ=SECONDLY", "FREQ=BOGUS"])
+def test_sub_daily_and_invalid_rules_are_rejected(rule):
+    with pytest.raises(ValueError):
+        calendar_engine.add("Spam", "2026-03-02", "09:00", recurrence=rule)
+    assert calendar_tool.add_event("Spam", "2026-03-02", "09:00", recurrence=rule).startswith("Could not add event")
+
+
+def test_long_ranges_are_capped_and_say_so():
+    event = calendar_engine.add("Pills", "2026-01-01", "08:00", recurrence="FREQ=DAILY")
+    found = calendar_engine.between(datetime(2026, 1, 1), datetime(2030, 1, 1))
+    assert len(found) == calendar_engine.MAX_OCCURRENCES
+
+    listing = calendar_tool.list_events("2026-01-01", "2029-12-31")
+    assert f"Only the first {calendar_engine.MAX_OCCURRENCES} occurrences of {event['id']}" in listing
+    assert "Only the first" not in calendar_tool.list_events("2026-01-01", "2026-01-31")
+
+
+def test_open_ended_listing_shows_each_repeating_event_once():
+    calendar_engine.add("Pills", "2026-01-01", "08:00", recurrence="FREQ=DAILY")
+    calendar_engine.add("Standup", "2026-03-02", "10:00", recurrence="FREQ=WEEKLY;BYDAY=MO")
+    calendar_engine.add("Trip", "2027-06-01")
+    found = calendar_engine.next_repeats(datetime(2026, 3, 4))
+    assert sorted(_titles(found)) == [("2026-03-04T08:00", "Pills"), ("2026-03-09T10:00", "Standup")]
+
+    listing = calendar_tool.list_events("2026-03-04")
+    assert listing.count("Pills") == 1 and listing.count("Standup") == 1
+    assert "2027-06-01 — Trip" in listing
+    assert "listed once" in listing
+    assert calendar_tool.list_events("2026-03-04", "2026-03-10").count("Pills") == 7
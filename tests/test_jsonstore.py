@@ -0,0 +1,69 @@
+import json
+import os
+import threading
+
+import pytest
+
+from tools import jsonstore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "data.json"
+
+
+def test_load_returns_the_default_for_a_missing_file(path):
+    assert jsonstore.load(path, {"items": []}) == {"items": []}
+    assert not path.exists()
+
+
+def test_update_is_visible_before_and_after_the_flush(path):
+    with jsonstore.update(path, {"items": []}) as data:
+        data["items"].append(1)
+    assert jsonstore.load(path, {})["items"] == [1]
+
+    jsonstore.flush(path)
+    assert json.loads(path.read_text()) == {"items": [1]}
+
+
+def test_failed_update_changes_nothing(path):
+    jsonstore.save(path, {"n": 1})
+    version = jsonstore.version(path)
+    with pytest.raises(RuntimeError):
+        with jsonstore.update(path, {}) as data:
+            data["n"] = 2
+            raise RuntimeError("abort")
+    assert jsonstore.load(path, {}) == {"n": 1}
+    assert jsonstore.version(path) == version
+
+
+def test_concurrent_updates_are_not_lost(path):
+    def bump():
+        for _ in range(200):
+            with jsonstore.update(path, {"n": 0}) as data:
+                data["n"] += 1
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    jsonstore.flush(path)
+    assert json.loads(path.read_text()) == {"n": 800}
+
+
+def test_outside_edits_are_picked_up(path):
+    jsonstore.save(path, {"n": 1})
+    jsonstore.flush(path)
+    version = jsonstore.version(path)
+
+    path.write_text(json.dumps({"n": 2, "edited": True}))
+    os.utime(path, ns=(0, 1))  # distinct mtime even on coarse clocks
+    assert jsonstore.load(path, {}) == {"n": 2, "edited": True}
+    assert jsonstore.version(path) != version
+
+
+def test_flush_leaves_no_temp_files(path):
+    jsonstore.save(path, {"n": 1})
+    jsonstore.flush(path)
+    assert sorted(os.listdir(path.parent)) == [path.name]
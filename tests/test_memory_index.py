@@ -0,0 +1,62 @@
+import pytest
+
+from tools import jsonstore, memory_index, memory_tool
+from tools.prompt_cache import with_history_breakpoint
+
+
+@pytest.fixture(autouse=True)
+def empty_memory():
+    jsonstore.save(memory_tool.MEMORY_FILE, {"memories": {}})
+
+
+def test_recall_by_key_uses_every_category():
+    memory_tool.remember("birthday", "March 3", "family")
+    memory_tool.remember("birthday", "June 9", "friends")
+    assert sorted(c for c, _ in memory_index.lookup("birthday")) == ["family", "friends"]
+    assert memory_tool.recall(key="birthday").splitlines() == [
+        "[family] birthday: March 3", "[friends] birthday: June 9",
+    ]
+
+    memory_tool.forget("birthday", "family")
+    assert memory_tool.recall(key="birthday") == "[friends] birthday: June 9"
+
+
+def test_relevant_ranks_matches_first_and_keys_count_double():
+    memory_tool.remember("coffee", "oat flat white", "food")
+    memory_tool.remember("breakfast", "usually coffee and toast", "food")
+    memory_tool.remember("gym", "tuesdays and thursdays", "routine")
+    lines = memory_index.relevant("where should I get coffee")
+    assert lines[:2] == ["[food] coffee: oat flat white", "[food] breakfast: usually coffee and toast"]
+    # A store that fits the budget is attached whole, matches first
+    assert lines[2] == "[routine] gym: tuesdays and thursdays"
+
+
+def test_relevant_respects_the_budget_and_limit():
+    for i in range(20):
+        memory_tool.remember(f"project_{i}", f"project note number {i}", "work")
+    assert len(memory_index.relevant("project", limit=5)) == 5
+    lines = memory_index.relevant("project", budget=20)
+    assert lines and sum(len(line) // 4 + 1 for line in lines) <= 20
+    assert memory_index.relevant("unrelated words", limit=5) == []
+
+
+def test_outside_edits_are_picked_up():
+    memory_tool.remember("city", "Lisbon", "home")
+    jsonstore.save(memory_tool.MEMORY_FILE, {"memories": {"home": {"city": {"value": "Porto"}}}})
+    assert memory_index.relevant("city") == ["[home] city: Porto"]
+
+
+def test_memories_stay_behind_the_history_breakpoint():
+    import assistant
+
+    memory_tool.remember("coffee", "oat flat white", "food")
+    context = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+    memory = assistant._memory_block("coffee order?")
+    history, messages = assistant._build_messages("coffee order?", context, context, memory, None, None)
+
+    assert history[-1] == {"role": "user", "content": "coffee order?"}
+    assert "oat flat white" in memory["text"]
+    text, attached = with_history_breakpoint(messages, memory)[-1]["content"]
+    # The cached prefix ends with the message exactly as history stores it
+    assert text == {"type": "text", "text": "coffee order?", "cache_control": {"type": "ephemeral"}}
+    assert attached is memory
@@ -0,0 +1,61 @@
+import re
+
+import pytest
+
+from tools import jsonstore, notes_index, notes_tool
+
+
+@pytest.fixture(autouse=True)
+def empty_notes():
+    jsonstore.save(notes_tool.NOTES_FILE, {"notes": []})
+
+
+def _create(title, content, tags=None) -> str:
+    return re.search(r"ID: (\w+)", notes_tool.create_note(title, content, tags)).group(1)
+
+
+def _ids(text: str) -> list[str]:
+    return re.findall(r"^\[(\w+)\]", text, re.MULTILINE)
+
+
+def test_search_matches_every_word_best_first():
+    a = _create("Groceries", "milk eggs bread")
+    b = _create("Milk run", "milk milk and more milk for the milk tea")
+    _create("Trip", "pack passport")
+
+    assert _ids(notes_tool.list_notes(search="milk")) == [b, a]
+    assert _ids(notes_tool.list_notes(search="milk eggs")) == [a]
+    assert notes_tool.list_notes(search="passport milk") == "No notes found."
+
+
+def test_tag_filter():
+    a = _create("One", "alpha", tags=["work"])
+    _create("Two", "alpha", tags=["home"])
+    assert _ids(notes_tool.list_notes(tag="work")) == [a]
+    assert _ids(notes_tool.list_notes(search="alpha", tag="work")) == [a]
+
+
+def test_updates_and_deletes_keep_the_index_in_step():
+    a = _create("Plan", "old wording")
+    notes_tool.update_note(a, content="new wording")
+    assert notes_tool.list_notes(search="old") == "No notes found."
+    assert _ids(notes_tool.list_notes(search="new")) == [a]
+
+    notes_tool.delete_note(a)
+    assert notes_tool.list_notes(search="wording") == "No notes found."
+
+
+def test_outside_writes_are_picked_up():
+    _create("Before", "zebra")
+    jsonstore.save(notes_tool.NOTES_FILE, {"notes": [{
+        "id": "ext1", "title": "Edited elsewhere", "content": "giraffe", "tags": [],
+        "created_at": "2026-01-01T00:00:00", "updated_at": "2026-01-01T00:00:00",
+    }]})
+    assert _ids(notes_tool.list_notes(search="giraffe")) == ["ext1"]
+    assert notes_tool.list_notes(search="zebra") == "No notes found."
+
+
+def test_queries_without_words_fall_back_to_a_substring_scan():
+    a = _create("Symbols", "price is $$$")
+    assert notes_index.search("$$") is None
+    assert _ids(notes_tool.list_notes(search="$$")) == [a]
@@ -0,0 +1,65 @@
+import uuid
+
+
+def _post(client, source="imessage", **fields) -> dict:
+    body = {"sender_name": "Ana", "sender_handle": "+15550100", "chat_id": f"chat:{uuid.uuid4()}",
+            "original_message": "are we still on?", "draft_reply": "yes!", "source": source, **fields}
+    response = client.post("/pending-reply", json=body)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_unfiltered_list_hides_dismissed(client):
+    kept, gone = _post(client), _post(client)
+    client.patch(f"/pending-reply/{gone['id']}/dismiss")
+    ids = {r["id"] for r in client.get("/pending-replies").json()}
+    assert kept["id"] in ids and gone["id"] not in ids
+
+
+def test_cursor_pages_cover_every_match_once(client):
+    created = [_post(client)["id"] for _ in range(5)]
+    seen, cursor = [], None
+    while True:
+        params = {"status": "pending", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/pending-replies", params=params).json()
+        seen += [r["id"] for r in page["items"] if r["id"] in created]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == created
+
+
+def test_since_sync_reports_records_leaving_the_status_filter(client):
+    seq = client.get("/pending-replies", params={"status": "pending", "limit": 1}).json()["seq"]
+    approved, dismissed = _post(client), _post(client)
+    client.patch(f"/pending-reply/{approved['id']}/approve", json={"approved_text": "see you"})
+    client.patch(f"/pending-reply/{dismissed['id']}/dismiss")
+
+    sync = client.get("/pending-replies", params={"status": "pending", "since": seq}).json()
+    latest = {r["id"]: r["status"] for r in sync["items"]}
+    assert latest[approved["id"]] == "approved"
+    assert latest[dismissed["id"]] == "dismissed"
+    assert not sync["has_more"]
+
+    again = client.get("/pending-replies", params={"status": "pending", "since": sync["seq"]}).json()
+    assert again["items"] == [] and again["seq"] == sync["seq"]
+
+
+def test_since_sync_pages_with_has_more(client):
+    start = client.get("/pending-replies", params={"status": "pending", "limit": 1}).json()["seq"]
+    for _ in range(3):
+        _post(client)
+    first = client.get("/pending-replies", params={"since": start, "limit": 2}).json()
+    assert len(first["items"]) == 2 and first["has_more"]
+    rest = client.get("/pending-replies", params={"since": first["seq"], "limit": 2}).json()
+    assert len(rest["items"]) == 1 and not rest["has_more"]
+    assert start < first["seq"] < rest["seq"]
+
+
+def test_filtered_first_page_supports_etags(client):
+    _post(client)
+    first = client.get("/pending-replies", params={"status": "pending"})
+    etag = first.headers.get("etag")
+    assert etag
+    assert client.get("/pending-replies", params={"status": "pending"},
+                      headers={"If-None-Match": etag}).status_code == 304
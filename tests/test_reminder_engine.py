@@ -0,0 +1,28 @@
+import threading
+
+from tools import reminder_engine
+
+
+def _on_other_thread(fn):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_every_write_bumps_the_version():
+    before = reminder_engine.data_version()
+    reminder = reminder_engine.add("Water plants", due_at="2030-01-01T09:00")
+    added = reminder_engine.data_version()
+    reminder_engine.complete(reminder["id"])
+    assert before < added < reminder_engine.data_version()
+
+
+def test_version_is_the_same_on_every_thread():
+    _on_other_thread(reminder_engine.data_version)  # opens that thread's connection first
+    before = reminder_engine.data_version()
+    _on_other_thread(lambda: reminder_engine.add("Call mum", due_at="2030-01-01T10:00"))
+    after = reminder_engine.data_version()
+    assert after != before
+    assert _on_other_thread(reminder_engine.data_version) == after
@@ -0,0 +1,47 @@
+import pytest
+
+from tools import jsonstore, memory_tool, notes_tool, semantic_index
+
+
+@pytest.fixture(autouse=True)
+def empty_sources():
+    jsonstore.save(notes_tool.NOTES_FILE, {"notes": []})
+    jsonstore.save(memory_tool.MEMORY_FILE, {"memories": {}})
+
+
+def _note(note_id, title, content):
+    return {"id": note_id, "title": title, "content": content, "tags": [],
+            "created_at": "2026-01-01T00:00:00", "updated_at": "2026-01-01T00:00:00"}
+
+
+def test_a_single_document_is_found():
+    jsonstore.save(notes_tool.NOTES_FILE, {"notes": [_note("n1", "Dentist", "appointment on friday")]})
+    hits = semantic_index.search("dentist appointment")
+    assert [(h["source"], h["label"]) for h in hits] == [("notes", "note n1: Dentist")]
+    assert hits[0]["score"] > semantic_index.MIN_SCORE
+
+
+def test_related_forms_and_typos_match():
+    jsonstore.save(notes_tool.NOTES_FILE, {"notes": [
+        _note("n1", "Standup", "weekly meetings with the design team"),
+        _note("n2", "Groceries", "oat milk, coffee beans"),
+    ]})
+    hits = semantic_index.search("meetng")
+    assert hits and hits[0]["label"].startswith("note n1")
+
+
+def test_sources_filter_and_tool_writes():
+    memory_tool.remember("favourite_airline", "prefers window seats on long flights", "travel")
+    jsonstore.save(notes_tool.NOTES_FILE, {"notes": [_note("n1", "Flights", "book flights to Lisbon")]})
+
+    sources = {h["source"] for h in semantic_index.search("flights")}
+    assert sources == {"notes", "memory"}
+    assert {h["source"] for h in semantic_index.search("flights", sources=["memory"])} == {"memory"}
+
+    memory_tool.forget("favourite_airline", "travel")
+    assert semantic_index.search("window seats", sources=["memory"]) == []
+
+
+def test_unrelated_queries_find_nothing():
+    jsonstore.save(notes_tool.NOTES_FILE, {"notes": [_note("n1", "Dentist", "appointment on friday")]})
+    assert semantic_index.search("xylophone quartz") == []
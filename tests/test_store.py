@@ -0,0 +1,125 @@
+import threading
+
+from store import Store
+
+
+def _reply(reply_id, **fields):
+    return {"id": reply_id, "chat_id": f"chat:{reply_id}", "status": "pending",
+            "source": "imessage", "created_at": f"2026-01-01T00:00:0{reply_id}", **fields}
+
+
+def test_pending_reply_round_trip(store):
+    added = store.add_pending_reply(_reply("1", draft_reply="hi"))
+    assert added["seq"] == 1
+    assert store.get_pending_reply("1")["draft_reply"] == "hi"
+
+    updated = store.update_pending_reply("1", status="approved", approved_text="hello")
+    assert updated["seq"] == 2
+    assert store.get_pending_reply("1")["approved_text"] == "hello"
+    assert store.update_pending_reply("missing", status="approved") is None
+
+
+def test_dismissed_replies_move_to_the_archive(store):
+    store.add_pending_reply(_reply("1"))
+    store.add_pending_reply(_reply("2"))
+    store.update_pending_reply("1", status="dismissed")
+
+    assert [r["id"] for r in store.list_pending_replies()] == ["2"]
+    assert [r["id"] for r in store.query_pending_replies(archived=True)] == ["1"]
+    assert store.has_chat_id("chat:1")
+    assert store.get_pending_reply("1")["status"] == "dismissed"
+
+
+def test_query_pages_in_creation_order(store):
+    for i in range(1, 6):
+        store.add_pending_reply(_reply(str(i), source="sms" if i % 2 else "email"))
+    first = store.query_pending_replies(limit=2)
+    after = (first[-1]["created_at"], first[-1]["id"])
+    assert [r["id"] for r in first] == ["1", "2"]
+    assert [r["id"] for r in store.query_pending_replies(after=after, limit=2)] == ["3", "4"]
+    assert [r["id"] for r in store.query_pending_replies(source="email")] == ["2", "4"]
+
+
+def test_archive_keeps_the_companion_outbox(store):
+    store.add_pending_reply(_reply("1", status="approved", source="imessage"))
+    store.add_pending_reply(_reply("2", status="approved", source="email"))
+    store.add_pending_reply(_reply("3", status="approved", source="sms"))
+
+    assert store.archive_pending_replies(approved_before="2027") == 1
+    assert sorted(r["id"] for r in store.list_pending_replies()) == ["1", "2"]
+    assert store.count_companion_backlog(approved_before="2027") == 2
+
+
+def test_devices_are_upserted(store):
+    store.upsert_device("tok-a", "ios")
+    store.upsert_device("tok-a", "android")
+    store.upsert_device("tok-b", "ios")
+    assert store.list_devices() == [{"token": "tok-a", "platform": "android"},
+                                    {"token": "tok-b", "platform": "ios"}]
+    assert store.remove_devices(["tok-a"]) == 1
+    assert store.device_tokens() == ["tok-b"]
+
+
+def test_sessions_append_and_purge(store):
+    assert store.create_session("s", [{"role": "user", "content": "hi"}]) == 1
+    appended = store.append_session_messages("s", [{"role": "assistant", "content": "hello"}])
+    assert [m["seq"] for m in appended] == [2]
+    assert [m["content"] for m in store.session_messages("s", since=1)] == ["hello"]
+    assert store.append_session_messages("missing", []) is None
+
+    assert store.purge_sessions(updated_before="2000") == 0
+    assert store.purge_sessions(updated_before="9999") == 1
+    assert store.session_messages("s") is None
+
+
+def test_swap_value_only_moves_from_the_expected_value(store):
+    assert store.swap_value("watermark", None, 10)
+    assert not store.swap_value("watermark", None, 20)
+    assert not store.swap_value("watermark", 5, 20)
+    assert store.swap_value("watermark", 10, 20)
+    assert store.get_value("watermark") == 20
+
+
+def test_writes_change_the_version_and_notify(store):
+    calls = []
+    store.subscribe("pending_replies", lambda: calls.append(1))
+    before = store.version("pending_replies")
+    store.add_pending_reply(_reply("1"))
+    assert store.version("pending_replies") != before
+    assert calls == [1]
+
+
+def test_connections_see_each_others_writes(tmp_path):
+    path = str(tmp_path / "shared.db")
+    a, b = Store(path), Store(path)
+    a.set_value("k", {"n": 1})
+    assert b.get_value("k") == {"n": 1}
+
+
+def test_version_is_the_same_on_every_thread(store):
+    from concurrent.futures import ThreadPoolExecutor
+
+    barrier = threading.Barrier(2)
+
+    def on_both(fn):
+        """Run `fn` once on each of the pool's two threads (each has its own connection)."""
+        def run(i):
+            barrier.wait()
+            return fn(i)
+        return [f.result() for f in [pool.submit(run, 0), pool.submit(run, 1)]]
+
+    with ThreadPoolExecutor(2) as pool:
+        before = on_both(lambda i: store.version("pending_replies"))
+        on_both(lambda i: i == 0 and store.add_pending_reply(_reply("1")))  # written on thread 0
+        after = on_both(lambda i: store.version("pending_replies"))
+    assert before[0] == before[1]
+    assert after[0] == after[1] != before[0]
+
+
+def test_writes_from_another_connection_change_the_version(tmp_path):
+    path = str(tmp_path / "shared.db")
+    a, b = Store(path), Store(path)
+    seen = a.version("devices")
+    b.upsert_device("tok", "ios")  # as if from another process
+    assert a.version("devices") == seen + 1
+    assert a.version("pending_replies") == 0
@@ -1,9 +1,16 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
 from .web_search import web_search
-from .calendar_tool import add_event, list_events, delete_event, update_event
+from .calendar_tool import (add_event, list_events, delete_event, update_event,
+                            find_free_slots, check_conflicts)
 from .notes_tool import create_note, list_notes, read_note, update_note, delete_note
 from .reminders_tool import set_reminder, check_reminders, complete_reminder, delete_reminder
 from .memory_tool import remember, recall, forget
 from .file_tool import list_files, read_file, write_file, delete_file
+from .semantic_search import semantic_search
 
 TOOL_DEFINITIONS = [
     {
@@ -30,6 +37,13 @@ TOOL_DEFINITIONS = [
                 "time": {"type": "string", "description": "Time in HH:MM 24h format (optional)"},
                 "duration_minutes": {"type": "integer", "description": "Duration in minutes (default 60)"},
                 "description": {"type": "string"},
+                "recurrence": {
+                    "type": "string",
+                    "description": (
+                        "Repeat rule in RRULE syntax, e.g. 'FREQ=WEEKLY;BYDAY=MO,WE' or "
+                        "'FREQ=DAILY;COUNT=5' (optional; at most daily). Add a repeating event once, not one per date."
+                    ),
+                },
             },
             "required": ["title", "date"],
         },
@@ -41,14 +55,14 @@ TOOL_DEFINITIONS = [
             "type": "object",
             "properties": {
                 "start_date": {"type": "string", "description": "Start date YYYY-MM-DD"},
-                "end_date": {"type": "string", "description": "End date YYYY-MM-DD (optional)"},
+                "end_date": {"type": "string", "description": "End date YYYY-MM-DD (optional; without it, repeating events are listed once)"},
             },
             "required": ["start_date"],
         },
     },
     {
         "name": "delete_calendar_event",
-        "description": "Delete a calendar event by its ID.",
+        "description": "Delete a calendar event by its ID (for a repeating event, the whole series).",
         "input_schema": {
             "type": "object",
             "properties": {
@@ -59,7 +73,7 @@ TOOL_DEFINITIONS = [
     },
     {
         "name": "update_calendar_event",
-        "description": "Update details of an existing calendar event.",
+        "description": "Update details of an existing calendar event (for a repeating event, the whole series).",
         "input_schema": {
             "type": "object",
             "properties": {
@@ -67,11 +81,45 @@ TOOL_DEFINITIONS = [
                 "title": {"type": "string"},
                 "date": {"type": "string"},
                 "time": {"type": "string"},
+                "duration_minutes": {"type": "integer"},
                 "description": {"type": "string"},
+                "recurrence": {"type": "string", "description": "New RRULE, or '' to stop repeating"},
             },
             "required": ["event_id"],
         },
     },
+    {
+        "name": "find_free_slots",
+        "description": "Find the first free time slots of a given length in the user's calendar, "
+                       "within working hours. All-day events don't block time.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "duration_minutes": {"type": "integer", "description": "Length of the slot needed"},
+                "start_date": {"type": "string", "description": "First day to search, YYYY-MM-DD"},
+                "end_date": {"type": "string", "description": "Last day to search, YYYY-MM-DD (default: a week)"},
+                "earliest": {"type": "string", "description": "Start of the day, HH:MM (default 09:00)"},
+                "latest": {"type": "string", "description": "End of the day, HH:MM (default 17:00)"},
+                "max_results": {"type": "integer", "description": "How many slots to return (default 3)"},
+                "weekdays_only": {"type": "boolean", "description": "Skip Saturdays and Sundays"},
+            },
+            "required": ["duration_minutes", "start_date"],
+        },
+    },
+    {
+        "name": "check_conflicts",
+        "description": "Check whether a proposed time overlaps existing calendar events, before adding or moving one.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "date": {"type": "string", "description": "YYYY-MM-DD"},
+                "time": {"type": "string", "description": "HH:MM"},
+                "duration_minutes": {"type": "integer", "description": "Default 60"},
+                "exclude_event_id": {"type": "string", "description": "Event being moved, so it doesn't clash with itself"},
+            },
+            "required": ["date", "time"],
+        },
+    },
     # --- Notes ---
     {
         "name": "create_note",
@@ -261,6 +309,28 @@ TOOL_DEFINITIONS = [
             "required": ["path"],
         },
     },
+    # --- Semantic search ---
+    {
+        "name": "semantic_search",
+        "description": (
+            "Find notes, memories and workspace files by meaning rather than exact wording. "
+            "Returns the best-matching snippets with their note ID, memory key or file path, "
+            "so you can read just those instead of listing everything."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "What to look for, in natural language"},
+                "k": {"type": "integer", "description": "Number of results (1-20, default 5)"},
+                "sources": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": ["notes", "memory", "files"]},
+                    "description": "Limit to these sources (default all)",
+                },
+            },
+            "required": ["query"],
+        },
+    },
     # --- Research sub-agent ---
     {
         "name": "research_task",
@@ -298,6 +368,10 @@ def execute_tool(name: str, inputs: dict) -> str:
                 return delete_event(**inputs)
             case "update_calendar_event":
                 return update_event(**inputs)
+            case "find_free_slots":
+                return find_free_slots(**inputs)
+            case "check_conflicts":
+                return check_conflicts(**inputs)
             case "create_note":
                 return create_note(**inputs)
             case "list_notes":
@@ -330,6 +404,8 @@ def execute_tool(name: str, inputs: dict) -> str:
                 return write_file(**inputs)
             case "delete_file":
                 return delete_file(**inputs)
+            case "semantic_search":
+                return semantic_search(**inputs)
             case "research_task":
                 from .research_agent import run_research
                 return run_research(**inputs)
@@ -339,3 +415,89 @@ def execute_tool(name: str, inputs: dict) -> str:
         return f"Tool call error for '{name}': {e}"
     except Exception as e:
         return f"Error executing '{name}': {e}"
+
+
+# ── Parallel execution ────────────────────────────────────────────────────────
+
+TOOL_WORKERS = int(os.environ.get("TOOL_WORKERS", "8"))
+_tool_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+# Tools backed by the same store run one at a time, in the order requested,
+# so e.g. two create_note calls (or an add followed by a list) stay ordered.
+TOOL_STORES = {
+    **dict.fromkeys(["add_calendar_event", "list_calendar_events",
+                     "delete_calendar_event", "update_calendar_event",
+                     "find_free_slots", "check_conflicts"], "calendar"),
+    **dict.fromkeys(["create_note", "list_notes", "read_note",
+                     "update_note", "delete_note"], "notes"),
+    **dict.fromkeys(["set_reminder", "check_reminders",
+                     "complete_reminder", "delete_reminder"], "reminders"),
+    **dict.fromkeys(["remember", "recall", "forget"], "memory"),
+    **dict.fromkeys(["list_files", "read_file", "write_file", "delete_file"], "workspace"),
+}
+
+# Seconds before a tool call is abandoned (its result becomes a timeout message)
+TOOL_TIMEOUTS = {"web_search": 30, "research_task": 600}
+DEFAULT_TOOL_TIMEOUT = 60
+
+# Store → an abandoned call whose thread is still running. The next call on
+# that store (in this batch or a later one) waits for it first, so a store
+# never has two calls in flight.
+_overrunning: dict[str, Future] = {}
+
+
+async def execute_tools_async(calls: list[tuple[str, dict]]) -> list[str]:
+    """Run the tool calls from one model response concurrently.
+
+    Calls on different stores (and every web_search) run in parallel on a
+    bounded thread pool; calls on the same store are serialized. A call that
+    times out can't be stopped, so its store stays busy: later calls on it
+    wait for the abandoned thread, or give up after their own timeout.
+    Results come back in the same order as `calls`.
+    """
+    results: list[str] = [""] * len(calls)
+    timings: list[float] = [0.0] * len(calls)
+
+    lanes: dict = {}
+    for i, (name, _) in enumerate(calls):
+        lanes.setdefault(TOOL_STORES.get(name, i), []).append(i)
+
+    async def run_lane(lane, indexes: list[int]) -> None:
+        for i in indexes:
+            name, inputs = calls[i]
+            timeout = TOOL_TIMEOUTS.get(name, DEFAULT_TOOL_TIMEOUT)
+            start = time.perf_counter()
+            earlier = _overrunning.get(lane)
+            if earlier is not None:
+                try:
+                    await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(earlier)), timeout)
+                except asyncio.TimeoutError:
+                    results[i] = f"Tool '{name}' not run: an earlier {lane} call is still running."
+                    timings[i] = time.perf_counter() - start
+                    continue
+                except Exception:
+                    pass  # its failure was reported when it was abandoned
+                if _overrunning.get(lane) is earlier:
+                    del _overrunning[lane]
+            future = _tool_pool.submit(execute_tool, name, inputs)
+            try:
+                results[i] = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            except asyncio.TimeoutError:
+                results[i] = f"Tool '{name}' timed out after {timeout}s."
+                if isinstance(lane, str):
+                    _overrunning[lane] = future
+            timings[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_lane(lane, indexes) for lane, indexes in lanes.items()))
+    wall = time.perf_counter() - start
+
+    if calls:
+        detail = ", ".join(f"{name} {t:.2f}s" for (name, _), t in zip(calls, timings))
+        print(f"[tools] {len(calls)} calls in {wall:.2f}s wall / {sum(timings):.2f}s serial — {detail}")
+    return results
+
+
+def execute_tools(calls: list[tuple[str, dict]]) -> list[str]:
+    """Blocking wrapper around execute_tools_async for sync agent loops."""
+    return asyncio.run(execute_tools_async(calls))
@@ -0,0 +1,268 @@
+"""Indexed access to calendar.json, with recurring events.
+
+Events stay in calendar.json (through jsonstore), and this module keeps
+indexes derived from them: an id map, plus one-off events sorted by start
+time. A date-range query is then a bisect plus the k events in range,
+instead of a filter and sort over every event. An event with a
+`recurrence` rule (RRULE syntax, e.g. "FREQ=WEEKLY;BYDAY=MO") is stored
+once and expanded with dateutil only across the window being queried, at
+most MAX_OCCURRENCES times per event and query. Rules repeating more often
+than daily are rejected.
+
+Writes through this module update the indexes in place. A change made
+anywhere else shows up as a new jsonstore.version() and the indexes are
+rebuilt.
+"""
+
+import bisect
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from dateutil.rrule import DAILY, rrulestr
+
+from . import jsonstore
+from .config import DATA_DIR
+
+CALENDAR_FILE = DATA_DIR / "calendar.json"
+
+# Expansions of one recurring event per query; a longer run is cut off here
+MAX_OCCURRENCES = 500
+
+
+class Occurrence(NamedTuple):
+    start: datetime
+    end: datetime
+    event: dict
+
+    @property
+    def all_day(self) -> bool:
+        return not self.event.get("time")
+
+
+def parse_start(date: str, time: str | None = None) -> datetime:
+    """Start of an event from its "YYYY-MM-DD" date and optional "HH:MM" time."""
+    return datetime.fromisoformat(f"{date}T{time}" if time else date)
+
+
+def span(event: dict) -> timedelta:
+    """How long an event lasts; events without a time take the whole day."""
+    if not event.get("time"):
+        return timedelta(days=1)
+    return timedelta(minutes=event.get("duration_minutes") or 0)
+
+
+def parse_rule(rule: str, start: datetime):
+    text = rule.strip()
+    if text.upper().startswith("RRULE:"):
+        text = text[6:]
+    return rrulestr(text, dtstart=start, cache=True)
+
+
+class _Index:
+    def __init__(self, events: list[dict], version: int):
+        self.version = version
+        self.by_id: dict[str, dict] = {}
+        self.starts: list[tuple[datetime, str]] = []   # one-off events, sorted
+        self.rules: dict[str, object] = {}             # recurring event id → rrule
+        self.max_span = timedelta(0)                   # longest one-off event, for overlap lookups
+        for event in events:
+            self.add(event, ordered=False)
+        self.starts.sort()
+
+    def add(self, event: dict, ordered: bool = True) -> None:
+        self.by_id[event["id"]] = event
+        try:
+            start = parse_start(event["date"], event.get("time"))
+            rule = parse_rule(event["recurrence"], start) if event.get("recurrence") else None
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"[calendar] Event {event.get('id')} left out of date queries: {e}")
+            return
+        if rule is not None:
+            self.rules[event["id"]] = rule
+        elif ordered:
+            bisect.insort(self.starts, (start, event["id"]))
+        else:
+            self.starts.append((start, event["id"]))
+        if rule is None:
+            self.max_span = max(self.max_span, span(event))
+
+    def remove(self, event_id: str) -> dict | None:
+        event = self.by_id.pop(event_id, None)
+        if event is None:
+            return None
+        if self.rules.pop(event_id, None) is None:
+            try:
+                key = (parse_start(event["date"], event.get("time")), event_id)
+            except (KeyError, TypeError, ValueError):
+                return event
+            i = bisect.bisect_left(self.starts, key)
+            if i < len(self.starts) and self.starts[i] == key:
+                del self.starts[i]
+        return event
+
+    def occurrences(self, start: datetime, end: datetime, overlapping: bool,
+                    recurring: bool = True) -> list[Occurrence]:
+        """Occurrences starting in [start, end), or with `overlapping` any that overlap it."""
+        earliest = start - self.max_span if overlapping else start
+        lo = bisect.bisect_left(self.starts, (earliest,))
+        hi = bisect.bisect_left(self.starts, (end,), lo)
+        found = []
+        for begin, event_id in self.starts[lo:hi]:
+            event = self.by_id[event_id]
+            finish = begin + span(event)
+            if begin >= start or (overlapping and finish > start):
+                found.append(Occurrence(begin, finish, event))
+        for event_id, rule in self.rules.items() if recurring else ():
+            event = self.by_id[event_id]
+            length = span(event)
+            after = start - length if overlapping else start
+            for begin in rule.xafter(after, count=MAX_OCCURRENCES, inc=True):
+                if begin >= end:
+                    break
+                if begin >= start or (overlapping and begin + length > start):
+                    found.append(Occurrence(begin, begin + length, event))
+        found.sort(key=lambda o: (o.start, o.event.get("title", "")))
+        return found
+
+    def next_repeats(self, start: datetime) -> list[Occurrence]:
+        """Each recurring event's first occurrence at or after `start`, if it has one."""
+        found = []
+        for event_id, rule in self.rules.items():
+            begin = rule.after(start, inc=True)
+            if begin is not None:
+                event = self.by_id[event_id]
+                found.append(Occurrence(begin, begin + span(event), event))
+        return found
+
+
+_lock = threading.RLock()
+_index: _Index | None = None
+
+
+def _current() -> _Index:
+    global _index
+    version = jsonstore.version(CALENDAR_FILE)
+    if _index is None or _index.version != version:
+        events = jsonstore.load(CALENDAR_FILE, {"events": []})["events"]
+        _index = _Index(events, version)
+    return _index
+
+
+@contextmanager
+def _write():
+    """Update calendar.json and the index together."""
+    with _lock:
+        with jsonstore.update(CALENDAR_FILE, {"events": []}) as data:
+            index = _current()
+            yield data, index
+        index.version = jsonstore.version(CALENDAR_FILE)
+
+
+def _validate(event: dict) -> None:
+    start = parse_start(event["date"], event.get("time"))
+    if event.get("recurrence"):
+        rule = parse_rule(event["recurrence"], start)
+        rules = getattr(rule, "_rrule", [rule])  # an rruleset holds several
+        if any(r._freq > DAILY for r in rules):
+            raise ValueError("events can repeat at most daily (no HOURLY, MINUTELY or SECONDLY rules)")
+
+
+# ── Events ───────────────────────────────────────────────────────────────────
+
+def add(title: str, date: str, time: str | None = None, duration_minutes: int = 60,
+        description: str = "", recurrence: str | None = None) -> dict:
+    """Create an event; raises ValueError for a bad date, time or recurrence rule."""
+    event = {
+        "id": str(uuid.uuid4())[:8],
+        "title": title,
+        "date": date,
+        "time": time,
+        "duration_minutes": duration_minutes,
+        "description": description or "",
+        "created_at": datetime.now().isoformat(),
+    }
+    if recurrence:
+        event["recurrence"] = recurrence
+    _validate(event)
+    with _write() as (data, index):
+        data["events"].append(event)
+        index.add(event)
+    return event
+
+
+def get(event_id: str) -> dict | None:
+    with _lock:
+        return _current().by_id.get(event_id)
+
+
+def update(event_id: str, **fields) -> dict | None:
+    """Change the given fields (None = leave as is); recurrence "" stops repeating."""
+    with _write() as (data, index):
+        event = next((e for e in data["events"] if e["id"] == event_id), None)
+        if event is None:
+            return None
+        changed = dict(event)
+        changed.update({k: v for k, v in fields.items() if v is not None})
+        if not changed.get("recurrence"):
+            changed.pop("recurrence", None)
+        _validate(changed)
+        event.clear()
+        event.update(changed)
+        index.remove(event_id)
+        index.add(event)
+    return event
+
+
+def delete(event_id: str) -> bool:
+    with _write() as (data, index):
+        if index.remove(event_id) is None:
+            return False
+        data["events"] = [e for e in data["events"] if e["id"] != event_id]
+    return True
+
+
+def between(start: datetime, end: datetime, recurring: bool = True) -> list[Occurrence]:
+    """Occurrences starting in [start, end), by start time.
+
+    Recurring events are expanded across the window unless `recurring` is
+    False (needed for open-ended windows).
+    """
+    with _lock:
+        return _current().occurrences(start, end, overlapping=False, recurring=recurring)
+
+
+def next_repeats(start: datetime) -> list[Occurrence]:
+    """One occurrence per recurring event: the next one at or after `start`.
+
+    For open-ended listings, where expanding every rule would repeat a daily
+    event for as long as the window runs.
+    """
+    with _lock:
+        return _current().next_repeats(start)
+
+
+def overlapping(start: datetime, end: datetime) -> list[Occurrence]:
+    """Occurrences that overlap [start, end), including ones that began earlier."""
+    with _lock:
+        return _current().occurrences(start, end, overlapping=True)
+
+
+def busy(start: datetime, end: datetime) -> list[tuple[datetime, datetime]]:
+    """Merged busy intervals from timed events, clipped to [start, end).
+
+    All-day events (no time) don't block time: they are usually birthdays,
+    deadlines and reminders rather than appointments.
+    """
+    merged: list[list[datetime]] = []
+    for o in overlapping(start, end):
+        if o.all_day or o.end <= o.start:
+            continue
+        s, e = max(o.start, start), min(o.end, end)
+        if merged and s <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], e)
+        else:
+            merged.append([s, e])
+    return [(s, e) for s, e in merged]
@@ -1,88 +1,166 @@
-import json
-import uuid
-from datetime import datetime, date
-from pathlib import Path
+from collections import Counter
+from datetime import datetime, timedelta
 
-from .config import DATA_DIR
-CALENDAR_FILE = DATA_DIR / "calendar.json"
+from . import calendar_engine
 
-
-def _load() -> dict:
-    if CALENDAR_FILE.exists():
-        return json.loads(CALENDAR_FILE.read_text())
-    return {"events": []}
-
-
-def _save(data: dict) -> None:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    CALENDAR_FILE.write_text(json.dumps(data, indent=2))
+SLOT_STEP = 15         # minutes; free slots start on this grid
+SEARCH_DAYS = 7        # find_free_slots window when no end date is given
+MAX_SLOTS = 10
 
 
 def add_event(title: str, date: str, time: str = None,
-              duration_minutes: int = 60, description: str = None) -> str:
-    data = _load()
-    event = {
-        "id": str(uuid.uuid4())[:8],
-        "title": title,
-        "date": date,
-        "time": time,
-        "duration_minutes": duration_minutes,
-        "description": description or "",
-        "created_at": datetime.now().isoformat(),
-    }
-    data["events"].append(event)
-    _save(data)
+              duration_minutes: int = 60, description: str = None,
+              recurrence: str = None) -> str:
+    try:
+        event = calendar_engine.add(title, date, time, duration_minutes, description or "", recurrence)
+    except ValueError as e:
+        return f"Could not add event: {e}"
     time_str = f" at {time}" if time else ""
-    return f"Added event '{title}' on {date}{time_str} (ID: {event['id']})"
+    repeat_str = f", repeating {recurrence}" if recurrence else ""
+    return f"Added event '{title}' on {date}{time_str}{repeat_str} (ID: {event['id']})"
+
+
+def _format(occurrence: calendar_engine.Occurrence) -> str:
+    e = occurrence.event
+    line = f"[{e['id']}] {occurrence.start.date().isoformat()}"
+    if e.get("time"):
+        line += f" {occurrence.start.strftime('%H:%M')}"
+    line += f" — {e['title']}"
+    if e.get("duration_minutes"):
+        line += f" ({e['duration_minutes']} min)"
+    if e.get("recurrence"):
+        line += f" [repeats: {e['recurrence']}]"
+    if e.get("description"):
+        line += f"\n    {e['description']}"
+    return line
 
 
 def list_events(start_date: str, end_date: str = None) -> str:
-    data = _load()
-    events = [e for e in data["events"] if e["date"] >= start_date]
-    if end_date:
-        events = [e for e in events if e["date"] <= end_date]
-    events.sort(key=lambda e: (e["date"], e.get("time") or ""))
+    try:
+        start = calendar_engine.parse_start(start_date)
+        end = calendar_engine.parse_start(end_date) + timedelta(days=1) if end_date else None
+    except ValueError:
+        return "Dates must be in YYYY-MM-DD format."
 
-    if not events:
-        return "No events found for the given date range."
+    if end is None:
+        # One-off events all the way; each repeating event once, at its next occurrence
+        occurrences = (calendar_engine.between(start, datetime.max, recurring=False)
+                       + calendar_engine.next_repeats(start))
+        occurrences.sort(key=lambda o: (o.start, o.event.get("title", "")))
+    else:
+        occurrences = calendar_engine.between(start, end)
 
-    lines = []
-    for e in events:
-        line = f"[{e['id']}] {e['date']}"
-        if e.get("time"):
-            line += f" {e['time']}"
-        line += f" — {e['title']}"
-        if e.get("duration_minutes"):
-            line += f" ({e['duration_minutes']} min)"
-        if e.get("description"):
-            line += f"\n    {e['description']}"
-        lines.append(line)
+    if not occurrences:
+        return "No events found for the given date range."
+    lines = [_format(o) for o in occurrences]
+    if end_date is None and any(o.event.get("recurrence") for o in occurrences):
+        lines.append("(Repeating events are listed once, at their next occurrence; "
+                     "give an end date to see every occurrence.)")
+    repeats = Counter(o.event["id"] for o in occurrences if o.event.get("recurrence"))
+    cut = [event_id for event_id, n in repeats.items() if n >= calendar_engine.MAX_OCCURRENCES]
+    if cut:
+        lines.append(f"(Only the first {calendar_engine.MAX_OCCURRENCES} occurrences of "
+                     f"{', '.join(cut)} are shown; use a shorter date range to see later ones.)")
     return "\n".join(lines)
 
 
 def delete_event(event_id: str) -> str:
-    data = _load()
-    before = len(data["events"])
-    data["events"] = [e for e in data["events"] if e["id"] != event_id]
-    if len(data["events"]) == before:
+    if not calendar_engine.delete(event_id):
         return f"No event found with ID '{event_id}'."
-    _save(data)
     return f"Event {event_id} deleted."
 
 
 def update_event(event_id: str, title: str = None, date: str = None,
-                 time: str = None, description: str = None) -> str:
-    data = _load()
-    for event in data["events"]:
-        if event["id"] == event_id:
-            if title:
-                event["title"] = title
-            if date:
-                event["date"] = date
-            if time is not None:
-                event["time"] = time
-            if description is not None:
-                event["description"] = description
-            _save(data)
-            return f"Event {event_id} updated."
-    return f"No event found with ID '{event_id}'."
+                 time: str = None, description: str = None,
+                 duration_minutes: int = None, recurrence: str = None) -> str:
+    try:
+        event = calendar_engine.update(
+            event_id, title=title or None, date=date or None, time=time,
+            description=description, duration_minutes=duration_minutes, recurrence=recurrence,
+        )
+    except ValueError as e:
+        return f"Could not update event: {e}"
+    if event is None:
+        return f"No event found with ID '{event_id}'."
+    return f"Event {event_id} updated."
+
+
+def _at(day, hhmm: str) -> datetime:
+    return datetime.combine(day, datetime.strptime(hhmm, "%H:%M").time())
+
+
+def _round_up(moment: datetime) -> datetime:
+    minutes = -(-(moment.hour * 60 + moment.minute + (moment.second > 0 or moment.microsecond > 0))
+                // SLOT_STEP) * SLOT_STEP
+    return datetime.combine(moment.date(), datetime.min.time()) + timedelta(minutes=minutes)
+
+
+def find_free_slots(duration_minutes: int, start_date: str, end_date: str = None,
+                    earliest: str = "09:00", latest: str = "17:00",
+                    max_results: int = 3, weekdays_only: bool = False) -> str:
+    try:
+        first = calendar_engine.parse_start(start_date).date()
+        last = calendar_engine.parse_start(end_date).date() if end_date else first + timedelta(days=SEARCH_DAYS - 1)
+        _at(first, earliest), _at(first, latest)
+    except ValueError:
+        return "Dates must be YYYY-MM-DD and times HH:MM."
+    if duration_minutes <= 0:
+        return "duration_minutes must be positive."
+    length = timedelta(minutes=duration_minutes)
+    max_results = max(1, min(max_results, MAX_SLOTS))
+    now = datetime.now()
+
+    # One indexed lookup for the whole range, then a sweep per day
+    busy = calendar_engine.busy(_at(first, earliest), _at(last, latest))
+    slots, i = [], 0
+    day = first
+    while day <= last and len(slots) < max_results:
+        if weekdays_only and day.weekday() >= 5:
+            day += timedelta(days=1)
+            continue
+        window_start, window_end = _at(day, earliest), _at(day, latest)
+        cursor = _round_up(max(window_start, now))
+        while i < len(busy) and busy[i][1] <= cursor:
+            i += 1
+        j = i
+        while cursor + length <= window_end and len(slots) < max_results:
+            if j < len(busy) and busy[j][0] < cursor + length:
+                cursor = _round_up(max(cursor, busy[j][1]))
+                j += 1
+                continue
+            slots.append((cursor, cursor + length))
+            cursor += length
+        day += timedelta(days=1)
+
+    if not slots:
+        return (f"No free {duration_minutes}-minute slot between {earliest} and {latest} "
+                f"from {first.isoformat()} to {last.isoformat()}.")
+    lines = [f"Free {duration_minutes}-minute slots:"]
+    for s, e in slots:
+        lines.append(f"  {s.strftime('%Y-%m-%d (%a) %H:%M')}–{e.strftime('%H:%M')}")
+    return "\n".join(lines)
+
+
+def check_conflicts(date: str, time: str, duration_minutes: int = 60,
+                    exclude_event_id: str = None) -> str:
+    try:
+        start = calendar_engine.parse_start(date, time)
+    except ValueError:
+        return "Date must be YYYY-MM-DD and time HH:MM."
+    end = start + timedelta(minutes=duration_minutes)
+    clashes = [o for o in calendar_engine.overlapping(start, end)
+               if o.event["id"] != exclude_event_id]
+    timed = [o for o in clashes if not o.all_day]
+    all_day = [o for o in clashes if o.all_day]
+
+    lines = []
+    if timed:
+        lines.append(f"Conflicts with {start.strftime('%Y-%m-%d %H:%M')}–{end.strftime('%H:%M')}:")
+        for o in timed:
+            lines.append(f"  [{o.event['id']}] {o.start.strftime('%Y-%m-%d %H:%M')}–"
+                         f"{o.end.strftime('%H:%M')} — {o.event['title']}")
+    else:
+        lines.append(f"No conflicts for {start.strftime('%Y-%m-%d %H:%M')}–{end.strftime('%H:%M')}.")
+    if all_day:
+        lines.append("All-day that day: " + ", ".join(f"[{o.event['id']}] {o.event['title']}" for o in all_day))
+    return "\n".join(lines)
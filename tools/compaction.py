@@ -0,0 +1,175 @@
+"""Token-budgeted history compaction for long conversations.
+
+When the prior history of a conversation exceeds HISTORY_TOKEN_BUDGET, the
+last KEEP_RECENT_TURNS user/assistant exchanges are kept verbatim and
+everything older is folded into a rolling summary written by a cheap model.
+Summaries are cached per conversation (in DATA_DIR/history_summaries.json).
+Later requests reuse the cached summary and send everything after it
+verbatim until that tail itself outgrows the budget; only then are the
+messages that aged out since the last fold merged into the summary.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import anthropic
+
+from . import jsonstore, llm, metrics
+from .config import DATA_DIR
+
+SUMMARIES_FILE = DATA_DIR / "history_summaries.json"
+SUMMARY_MODEL = "claude-haiku-4-5-20251001"
+
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", "24000"))
+KEEP_RECENT_TURNS = int(os.environ.get("KEEP_RECENT_TURNS", "6"))
+MAX_CACHED_SUMMARIES = 500
+
+SUMMARY_SYSTEM = (
+    "You maintain a running summary of a conversation between a user and their "
+    "personal assistant. Merge the new messages into the existing summary. Keep "
+    "facts, decisions, names, dates, open tasks and user preferences; drop "
+    "pleasantries. Write compact bullet points, no preamble."
+)
+
+_client = anthropic.Anthropic()
+
+
+def estimate_tokens(messages: list) -> int:
+    """Rough token count (~4 characters per token) — no API round-trip."""
+    chars = 0
+    for m in messages:
+        content = m["content"]
+        if isinstance(content, str):
+            chars += len(content)
+        else:
+            for block in content:
+                if isinstance(block, dict):
+                    chars += len(str(block.get("text") or block.get("content") or ""))
+    return chars // 4 + 4 * len(messages)
+
+
+def _digest(messages: list) -> str:
+    raw = json.dumps([[m["role"], m["content"]] for m in messages], sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _conversation_key(history: list, conversation_id: str | None) -> str:
+    if conversation_id:
+        return conversation_id
+    return "h:" + _digest(history[:1])[:24]
+
+
+def _split(history: list) -> tuple[list, list]:
+    """(older, recent): recent is the last KEEP_RECENT_TURNS turns, starting on a user message."""
+    cut = max(0, len(history) - 2 * KEEP_RECENT_TURNS)
+    while cut < len(history) and history[cut]["role"] != "user":
+        cut += 1
+    return history[:cut], history[cut:]
+
+
+def _plan(history: list, conversation_id: str | None):
+    """Work out what to send and what (if anything) still needs folding.
+
+    Returns None when the history fits the budget as-is, otherwise
+    (key, older, recent, previous_summary, pending) where `pending` are the
+    messages to merge into the summary (empty when it can be reused).
+    """
+    if estimate_tokens(history) <= HISTORY_TOKEN_BUDGET:
+        return None
+    key = _conversation_key(history, conversation_id)
+    entry = jsonstore.load(SUMMARIES_FILE, {}).get(key)
+    covered = 0
+    if entry and entry["covered"] <= len(history) and _digest(history[:entry["covered"]]) == entry["digest"]:
+        covered = entry["covered"]
+        tail = history[covered:]
+        if estimate_tokens(tail) <= HISTORY_TOKEN_BUDGET:
+            return key, None, tail, entry["summary"], []
+    older, recent = _split(history)
+    if len(older) <= covered:
+        # Nothing new has aged out: the recent turns alone are over budget
+        return (key, None, history[covered:], entry["summary"], []) if covered else None
+    previous = entry["summary"] if covered else ""
+    return key, older, recent, previous, older[covered:]
+
+
+def _summary_request(previous: str, pending: list) -> dict:
+    transcript = "\n\n".join(
+        f"{m['role'].upper()}: {m['content'] if isinstance(m['content'], str) else '(non-text content)'}"
+        for m in pending
+    )
+    return {
+        "model": SUMMARY_MODEL,
+        "max_tokens": 1024,
+        "system": SUMMARY_SYSTEM,
+        "messages": [{
+            "role": "user",
+            "content": f"Existing summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}",
+        }],
+    }
+
+
+def _save(key: str, older: list, summary: str) -> None:
+    with jsonstore.update(SUMMARIES_FILE, {}) as cache:
+        cache[key] = {
+            "covered": len(older),
+            "digest": _digest(older),
+            "summary": summary,
+            "updated_at": time.time(),
+        }
+        if len(cache) > MAX_CACHED_SUMMARIES:
+            for stale in sorted(cache, key=lambda k: cache[k]["updated_at"])[:len(cache) - MAX_CACHED_SUMMARIES]:
+                del cache[stale]
+
+
+def _fallback(error: Exception, older: list, recent: list, summary: str, pending: list):
+    """The summary call failed: send the last cached summary and everything
+    after it, or with no summary yet just the recent window. The fold is
+    retried on the next turn."""
+    metrics.incr("compaction.errors")
+    print(f"[compaction] Summary failed, using {'the cached summary' if summary else 'recent turns only'}: {error}")
+    if summary:
+        return summary, pending + recent
+    return None, recent
+
+
+def compact_history(history: list, conversation_id: str | None = None) -> tuple[str | None, list]:
+    """Return (summary of older turns or None, messages to send verbatim)."""
+    plan = _plan(history, conversation_id)
+    if plan is None:
+        return None, history
+    key, older, recent, summary, pending = plan
+    if pending:
+        start = time.perf_counter()
+        try:
+            response = _client.messages.create(**_summary_request(summary, pending))
+            new_summary = response.content[0].text.strip()
+        except Exception as e:
+            return _fallback(e, older, recent, summary, pending)
+        summary = new_summary
+        metrics.observe("compaction.summarize", time.perf_counter() - start)
+        _save(key, older, summary)
+    else:
+        metrics.incr("compaction.cache_hits")
+    return summary, recent
+
+
+async def compact_history_async(history: list, conversation_id: str | None = None) -> tuple[str | None, list]:
+    """Async equivalent of compact_history."""
+    plan = _plan(history, conversation_id)
+    if plan is None:
+        return None, history
+    key, older, recent, summary, pending = plan
+    if pending:
+        start = time.perf_counter()
+        try:
+            new_summary = await llm.text(**_summary_request(summary, pending))
+        except Exception as e:
+            return _fallback(e, older, recent, summary, pending)
+        summary = new_summary
+        metrics.observe("compaction.summarize", time.perf_counter() - start)
+        _save(key, older, summary)
+    else:
+        metrics.incr("compaction.cache_hits")
+    return summary, recent
@@ -0,0 +1,188 @@
+"""Shared JSON persistence for the tool and server data files.
+
+Every file gets one lock that covers the whole read-modify-write, commits are
+crash-atomic (temp file + fsync + rename), and bursts of updates to the same
+file are coalesced into a single flush a few milliseconds later. Until that
+flush lands, readers are served the newest in-memory snapshot, so nothing
+written through this module is ever lost or read stale.
+
+Parsed contents stay cached in memory and are only re-read when the file's
+mtime/size changes underneath us (another process or a manual edit), so hot
+read paths cost one stat() instead of a full parse. version() exposes a
+counter that changes whenever the contents do, for ETags and derived caches.
+
+Snapshots returned by load() are shared: treat them as read-only and use
+update() for any change.
+"""
+
+import atexit
+import copy
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# How long to wait for more updates before writing a dirty file
+COALESCE_DELAY = float(os.environ.get("JSON_COALESCE_DELAY", "0.05"))
+
+
+class _Entry:
+    __slots__ = ("lock", "data", "stat", "generation", "dirty", "timer")
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.data = None      # newest parsed snapshot (None = not loaded)
+        self.stat = None      # (mtime_ns, size) of the file data was read from
+        self.generation = 0   # bumped whenever the contents change
+        self.dirty = False    # data is newer than the file on disk
+        self.timer = None
+
+
+_entries: dict[str, _Entry] = {}
+_entries_lock = threading.Lock()
+
+
+def _entry(path) -> _Entry:
+    key = os.path.abspath(os.fspath(path))
+    with _entries_lock:
+        entry = _entries.get(key)
+        if entry is None:
+            entry = _entries[key] = _Entry()
+        return entry
+
+
+def _read(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return copy.deepcopy(default)
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _revalidate(path, entry: _Entry) -> None:
+    """Drop the cached snapshot if the file changed outside this module."""
+    if entry.dirty:
+        return
+    sig = _stat(path)
+    if sig != entry.stat or entry.generation == 0:
+        entry.data = None
+        entry.stat = sig
+        entry.generation += 1
+
+
+def _snapshot(path, entry: _Entry, default):
+    _revalidate(path, entry)
+    if entry.data is None:
+        entry.data = _read(path, default)
+    return entry.data
+
+
+def _write_atomic(path, data) -> None:
+    path = os.fspath(path)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # platforms without directory fds
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def _flush_entry(path, entry: _Entry) -> None:
+    with entry.lock:
+        entry.timer = None
+        if not entry.dirty:
+            return
+        try:
+            _write_atomic(path, entry.data)
+        except OSError as e:
+            print(f"[jsonstore] Flush failed for {path}: {e}")
+            return
+        entry.dirty = False
+        entry.stat = _stat(path)
+
+
+def _schedule_flush(path, entry: _Entry) -> None:
+    entry.dirty = True
+    entry.generation += 1
+    if entry.timer is None:
+        entry.timer = threading.Timer(COALESCE_DELAY, _flush_entry, (path, entry))
+        entry.timer.daemon = True
+        entry.timer.start()
+
+
+def load(path, default):
+    """Return the current contents of a JSON file (read-only snapshot)."""
+    entry = _entry(path)
+    with entry.lock:
+        return _snapshot(path, entry, default)
+
+
+def version(path) -> int:
+    """Counter that changes whenever the file's contents change."""
+    entry = _entry(path)
+    with entry.lock:
+        _revalidate(path, entry)
+        return entry.generation
+
+
+@contextmanager
+def update(path, default):
+    """Lock a JSON file for a read-modify-write.
+
+    Yields a private working copy; on a clean exit it becomes the new contents
+    and a coalesced flush is scheduled. On an exception nothing is changed.
+    """
+    entry = _entry(path)
+    with entry.lock:
+        data = copy.deepcopy(_snapshot(path, entry, default))
+        yield data
+        entry.data = data
+        _schedule_flush(path, entry)
+
+
+def save(path, data) -> None:
+    """Replace the contents of a JSON file."""
+    entry = _entry(path)
+    with entry.lock:
+        entry.data = data
+        _schedule_flush(path, entry)
+
+
+def flush(path=None) -> None:
+    """Write pending updates now (one file, or every file when path is None)."""
+    if path is not None:
+        _flush_entry(path, _entry(path))
+        return
+    with _entries_lock:
+        items = list(_entries.items())
+    for key, entry in items:
+        _flush_entry(key, entry)
+
+
+atexit.register(flush)
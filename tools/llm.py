@@ -0,0 +1,147 @@
+"""Process-wide AsyncAnthropic client for the server.
+
+Every async code path shares one client (so one keep-alive connection pool)
+instead of building a sync client per call and parking it on a worker thread.
+Calls are capped per model family (Haiku / Sonnet / Opus) with a semaphore,
+retried on 429/5xx/connection errors with capped exponential backoff and full
+jitter, and reported to tools.metrics:
+
+  llm.<family>.in_flight / llm.<family>.queued   gauges
+  llm.<family>.latency / llm.<family>.queue_wait timings
+  llm.<family>.calls / .retries / .errors        counters
+"""
+
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+
+import anthropic
+import httpx
+
+from . import metrics
+
+MODEL_LIMITS = {
+    "haiku": int(os.environ.get("LLM_HAIKU_CONCURRENCY", "8")),
+    "sonnet": int(os.environ.get("LLM_SONNET_CONCURRENCY", "4")),
+    "opus": int(os.environ.get("LLM_OPUS_CONCURRENCY", "4")),
+}
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE = 0.5   # seconds; doubled per attempt, then fully jittered
+BACKOFF_CAP = 20.0
+MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "32"))
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+_client: anthropic.AsyncAnthropic | None = None
+_semaphores: dict[str, asyncio.Semaphore] = {}
+_in_flight: dict[str, int] = {}
+_queued: dict[str, int] = {}
+
+
+def client() -> anthropic.AsyncAnthropic:
+    """The shared client. SDK retries are off — create() retries with its own accounting."""
+    global _client
+    if _client is None:
+        _client = anthropic.AsyncAnthropic(
+            api_key=os.environ.get("ANTHROPIC_API_KEY"),
+            max_retries=0,
+            http_client=anthropic.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_CONNECTIONS,
+                    keepalive_expiry=60,
+                ),
+            ),
+        )
+    return _client
+
+
+def family(model: str) -> str:
+    for name in MODEL_LIMITS:
+        if name in model:
+            return name
+    return "opus"
+
+
+def _gauges(fam: str) -> None:
+    metrics.gauge(f"llm.{fam}.in_flight", _in_flight.get(fam, 0))
+    metrics.gauge(f"llm.{fam}.queued", _queued.get(fam, 0))
+
+
+@asynccontextmanager
+async def slot(model: str):
+    """Hold one of the model family's concurrency slots for the duration.
+
+    For a stream, hold it only while the request is opened: a slow reader
+    shouldn't keep other calls to the model waiting.
+    """
+    fam = family(model)
+    sem = _semaphores.get(fam)
+    if sem is None:
+        sem = _semaphores[fam] = asyncio.Semaphore(MODEL_LIMITS[fam])
+    _queued[fam] = _queued.get(fam, 0) + 1
+    _gauges(fam)
+    start = time.perf_counter()
+    try:
+        await sem.acquire()
+    finally:
+        _queued[fam] -= 1
+    metrics.observe(f"llm.{fam}.queue_wait", time.perf_counter() - start)
+    _in_flight[fam] = _in_flight.get(fam, 0) + 1
+    _gauges(fam)
+    try:
+        yield
+    finally:
+        _in_flight[fam] -= 1
+        sem.release()
+        _gauges(fam)
+
+
+def _retry_delay(error: Exception, attempt: int) -> float | None:
+    """Seconds to wait before retrying `error`, or None if it isn't retryable."""
+    if isinstance(error, anthropic.APIConnectionError):  # includes timeouts
+        pass
+    elif isinstance(error, anthropic.APIStatusError) and error.status_code in RETRYABLE_STATUS:
+        retry_after = error.response.headers.get("retry-after")
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), BACKOFF_CAP)
+        except ValueError:
+            pass
+    else:
+        return None
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+async def create(**kwargs):
+    """messages.create() through the shared client, limited and retried."""
+    fam = family(kwargs["model"])
+    attempt = 0
+    while True:
+        async with slot(kwargs["model"]):
+            start = time.perf_counter()
+            try:
+                response = await client().messages.create(**kwargs)
+            except Exception as e:
+                error = e
+            else:
+                metrics.observe(f"llm.{fam}.latency", time.perf_counter() - start)
+                metrics.incr(f"llm.{fam}.calls")
+                return response
+        # Back off outside the slot so waiting callers can use it meanwhile
+        delay = _retry_delay(error, attempt) if attempt < MAX_RETRIES else None
+        if delay is None:
+            metrics.incr(f"llm.{fam}.errors")
+            raise error
+        attempt += 1
+        metrics.incr(f"llm.{fam}.retries")
+        print(f"[llm] {type(error).__name__} from {kwargs['model']}, retry {attempt}/{MAX_RETRIES} in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+
+async def text(**kwargs) -> str:
+    """create() and return the stripped text of the first content block."""
+    response = await create(**kwargs)
+    return response.content[0].text.strip()
@@ -0,0 +1,175 @@
+"""Key index and relevance ranking over memory.json.
+
+Memories are stored by category, then key. This module keeps two indexes
+derived from them: key → the categories holding it, for recall(key=...),
+and word → memories containing it (in the key, value or category), for
+ranking memories against a user message. The agent loops call relevant()
+before the first model call of a turn and attach the result to the user's
+message, so the model rarely needs a recall round-trip to see what it
+knows about the user.
+
+The memory tool updates the indexes inside its own memory.json updates.
+A change made anywhere else shows up as a new jsonstore.version() and the
+indexes are rebuilt (memory stores are small).
+"""
+
+import math
+import os
+import re
+import threading
+
+from . import jsonstore
+from .config import DATA_DIR
+
+MEMORY_FILE = DATA_DIR / "memory.json"
+
+# Cap on what relevant() returns, in estimated tokens (~4 characters each)
+CONTEXT_TOKENS = int(os.environ.get("MEMORY_CONTEXT_TOKENS", "400"))
+CONTEXT_MAX = int(os.environ.get("MEMORY_CONTEXT_MAX", "12"))
+KEY_WEIGHT = 2.0          # a word in the key counts double
+MIN_WORD = 3
+STOPWORDS = frozenset(
+    "the and for are but not you your with this that have has was what when where "
+    "who how can could would should will about from into them they their there "
+    "then than just some any all our out get got let me my please thanks".split()
+)
+
+_WORD = re.compile(r"\w+")
+_lock = threading.RLock()
+
+
+def _words(text: str) -> set[str]:
+    """Distinct content words, with a trailing plural 's' dropped."""
+    words = set()
+    for word in _WORD.findall(text.lower()):
+        if len(word) < MIN_WORD or word in STOPWORDS:
+            continue
+        if len(word) > MIN_WORD and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.add(word)
+    return words
+
+
+def _line(category: str, key: str, value) -> str:
+    return f"[{category}] {key}: {value}"
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class _Index:
+    def __init__(self, memories: dict, version: int):
+        self.version = version
+        self.entries: dict[tuple[str, str], dict] = {}       # (category, key) → entry
+        self.keys: dict[str, list[str]] = {}                  # key → categories holding it
+        self.words: dict[str, dict[tuple, float]] = {}        # word → {(category, key): weight}
+        for category, entries in memories.items():
+            for key, entry in entries.items():
+                self.add(category, key, entry)
+
+    def add(self, category: str, key: str, entry: dict) -> None:
+        self.remove(category, key)
+        ref = (category, key)
+        self.entries[ref] = entry
+        self.keys.setdefault(key, []).append(category)
+        weights = dict.fromkeys(_words(f"{category} {entry.get('value', '')}"), 1.0)
+        weights.update(dict.fromkeys(_words(key), KEY_WEIGHT))
+        for word, weight in weights.items():
+            self.words.setdefault(word, {})[ref] = weight
+
+    def remove(self, category: str, key: str) -> None:
+        ref = (category, key)
+        entry = self.entries.pop(ref, None)
+        if entry is None:
+            return
+        self.keys[key].remove(category)
+        if not self.keys[key]:
+            del self.keys[key]
+        for word in _words(f"{category} {key} {entry.get('value', '')}"):
+            refs = self.words.get(word)
+            if refs is not None:
+                refs.pop(ref, None)
+                if not refs:
+                    del self.words[word]
+
+    def rank(self, text: str) -> list[tuple[str, str]]:
+        """Memories sharing words with `text`, best first (rare words weigh more)."""
+        n = len(self.entries)
+        scores: dict[tuple, float] = {}
+        for word in _words(text):
+            refs = self.words.get(word)
+            if not refs:
+                continue
+            idf = math.log(1 + n / len(refs))
+            for ref, weight in refs.items():
+                scores[ref] = scores.get(ref, 0.0) + idf * weight
+        # Newer first among equal scores
+        refs = sorted(scores, key=lambda ref: self.entries[ref].get("updated_at", ""), reverse=True)
+        return sorted(refs, key=scores.__getitem__, reverse=True)
+
+
+_index: _Index | None = None
+
+
+def _current() -> _Index:
+    global _index
+    version = jsonstore.version(MEMORY_FILE)
+    if _index is None or _index.version != version:
+        _index = _Index(jsonstore.load(MEMORY_FILE, {"memories": {}})["memories"], version)
+    return _index
+
+
+# ── Keeping in step with memory.json ─────────────────────────────────────────
+
+def index_memory(category: str, key: str, entry: dict) -> None:
+    with _lock:
+        if _index is not None:
+            _index.add(category, key, entry)
+
+
+def remove_memory(category: str, key: str) -> None:
+    with _lock:
+        if _index is not None:
+            _index.remove(category, key)
+
+
+def advance(before: int, after: int) -> None:
+    """Our own write took memory.json from `before` to `after`; still in sync if we were."""
+    with _lock:
+        if _index is not None and _index.version == before:
+            _index.version = after
+
+
+# ── Lookups ──────────────────────────────────────────────────────────────────
+
+def lookup(key: str) -> list[tuple[str, dict]]:
+    """(category, entry) for every category holding `key`."""
+    with _lock:
+        index = _current()
+        return [(category, index.entries[(category, key)]) for category in index.keys.get(key, ())]
+
+
+def relevant(text: str, budget: int = CONTEXT_TOKENS, limit: int = CONTEXT_MAX) -> list[str]:
+    """Memory lines worth showing the model alongside `text`, within `budget` tokens.
+
+    When the whole store fits in the budget every memory is returned (matches
+    first), since then there's nothing to gain by leaving any out.
+    """
+    with _lock:
+        index = _current()
+        ranked = index.rank(text)
+        if len(index.entries) <= limit and sum(
+            _estimate_tokens(_line(c, k, e.get("value", ""))) for (c, k), e in index.entries.items()
+        ) <= budget:
+            matched = set(ranked)
+            ranked += [ref for ref in index.entries if ref not in matched]
+        chosen, used = [], 0
+        for category, key in ranked[:limit]:
+            line = _line(category, key, index.entries[(category, key)].get("value", ""))
+            cost = _estimate_tokens(line)
+            if used + cost > budget:
+                continue
+            chosen.append(line)
+            used += cost
+        return chosen
@@ -1,31 +1,35 @@
-import json
+from contextlib import contextmanager
 from datetime import datetime
-from pathlib import Path
 
-from .config import DATA_DIR
-MEMORY_FILE = DATA_DIR / "memory.json"
+from . import jsonstore, memory_index, semantic_index
+from .memory_index import MEMORY_FILE
 
 
 def _load() -> dict:
-    if MEMORY_FILE.exists():
-        return json.loads(MEMORY_FILE.read_text())
-    return {"memories": {}}
+    return jsonstore.load(MEMORY_FILE, {"memories": {}})
 
 
-def _save(data: dict) -> None:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    MEMORY_FILE.write_text(json.dumps(data, indent=2))
+@contextmanager
+def _update():
+    """Read-modify-write memory.json; callers update the indexes inside the block."""
+    with jsonstore.update(MEMORY_FILE, {"memories": {}}) as data:
+        before = jsonstore.version(MEMORY_FILE)
+        yield data
+    after = jsonstore.version(MEMORY_FILE)
+    memory_index.advance(before, after)
+    semantic_index.advance("memory", before, after)
 
 
 def remember(key: str, value: str, category: str = "general") -> str:
-    data = _load()
-    if category not in data["memories"]:
-        data["memories"][category] = {}
-    data["memories"][category][key] = {
-        "value": value,
-        "updated_at": datetime.now().isoformat(),
-    }
-    _save(data)
+    with _update() as data:
+        if category not in data["memories"]:
+            data["memories"][category] = {}
+        entry = data["memories"][category][key] = {
+            "value": value,
+            "updated_at": datetime.now().isoformat(),
+        }
+        memory_index.index_memory(category, key, entry)
+        semantic_index.index_memory(category, key, value)
     return f"Remembered [{category}] {key}: {value}"
 
 
@@ -44,10 +48,7 @@ def recall(key: str = None, category: str = None) -> str:
         return f"No memory found for key '{key}' in category '{category}'."
 
     if key:
-        results = []
-        for cat_name, cat_data in memories.items():
-            if key in cat_data:
-                results.append(f"[{cat_name}] {key}: {cat_data[key]['value']}")
+        results = [f"[{cat_name}] {key}: {entry['value']}" for cat_name, entry in memory_index.lookup(key)]
         return "\n".join(results) if results else f"No memory found for key '{key}'."
 
     if category:
@@ -68,12 +69,13 @@ def recall(key: str = None, category: str = None) -> str:
 
 
 def forget(key: str, category: str = "general") -> str:
-    data = _load()
-    cat = data["memories"].get(category, {})
-    if key in cat:
-        del cat[key]
-        if not cat:
-            del data["memories"][category]
-        _save(data)
-        return f"Forgot [{category}] {key}."
+    with _update() as data:
+        cat = data["memories"].get(category, {})
+        if key in cat:
+            del cat[key]
+            if not cat:
+                del data["memories"][category]
+            memory_index.remove_memory(category, key)
+            semantic_index.remove_memory(category, key)
+            return f"Forgot [{category}] {key}."
     return f"No memory found for '{key}' in '{category}'."
@@ -0,0 +1,340 @@
+"""Inverted index over notes.json for list_notes search.
+
+Each word maps to a posting list of the notes containing it (note numbers
+and term frequencies in compact arrays), and each tag to its notes, so a
+search reads a few posting lists instead of scanning every note's content.
+Results are ranked with BM25. Every query word of two or more letters also
+matches as a prefix ("meet" finds "meeting"), and all words must match.
+Title words count twice.
+
+The notes tool updates the index inside the same notes.json update. A
+change made anywhere else (another process, a hand edit) shows up as a new
+jsonstore.version() and is reconciled on the next search by comparing
+per-note stamps. The index is snapshotted to DATA_DIR/notes_index.bin a
+little after it changes (and at exit), so a restart reconciles a few notes
+instead of re-indexing all of them; a missing or unreadable snapshot just
+means a full build.
+"""
+
+import atexit
+import bisect
+import hashlib
+import heapq
+import json
+import marshal
+import math
+import os
+import re
+import tempfile
+import threading
+from array import array
+from collections import Counter
+
+from .config import DATA_DIR
+
+SNAPSHOT_FILE = DATA_DIR / "notes_index.bin"
+SNAPSHOT_DELAY = 30.0     # seconds after the last change before writing a snapshot
+SNAPSHOT_FORMAT = 1
+
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 2
+PREFIX_EXPANSIONS = 64    # most frequent completions used per query word
+MIN_PREFIX = 2            # shorter query words match whole words only
+
+_TOKEN = re.compile(r"\w+")
+_lock = threading.RLock()
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _stamp(note: dict) -> str:
+    key = json.dumps([note.get("title", ""), note.get("content", ""), note.get("tags", [])])
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+def _terms(note: dict) -> Counter:
+    counts = Counter(tokenize(note.get("content", "")))
+    for word in tokenize(note.get("title", "")):
+        counts[word] += TITLE_WEIGHT
+    return counts
+
+
+class _Index:
+    """The index proper. Notes get increasing numbers; a removed note leaves a hole."""
+
+    def __init__(self):
+        self.ids: list[str | None] = []            # number → note id
+        self.numbers: dict[str, int] = {}          # note id → number
+        self.stamps: dict[str, str] = {}           # note id → content stamp
+        self.lengths = array("I")                  # number → weighted word count
+        self.doc_terms: list[tuple] = []           # number → its distinct words
+        self.doc_tags: list[tuple] = []            # number → its lowercased tags
+        self.postings: dict[str, tuple[array, array]] = {}  # word → (numbers ascending, tfs)
+        self.vocab: list[str] | None = None        # sorted words for prefix lookups, built lazily
+        self.tags: dict[str, set[int]] = {}
+        self.total_length = 0
+
+    # ── Updates ──────────────────────────────────────────────────────────────
+
+    def add(self, note: dict) -> None:
+        self.remove(note["id"])
+        counts = _terms(note)
+        number = len(self.ids)
+        self.ids.append(note["id"])
+        self.numbers[note["id"]] = number
+        self.stamps[note["id"]] = _stamp(note)
+        length = sum(counts.values())
+        self.lengths.append(length)
+        self.total_length += length
+        self.doc_terms.append(tuple(counts))
+        for term, tf in counts.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = (array("I"), array("I"))
+                if self.vocab is not None:
+                    bisect.insort(self.vocab, term)
+            posting[0].append(number)  # numbers only grow, so lists stay sorted
+            posting[1].append(tf)
+        tags = tuple({t.lower() for t in note.get("tags") or []})
+        self.doc_tags.append(tags)
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(number)
+
+    def remove(self, note_id: str) -> bool:
+        number = self.numbers.pop(note_id, None)
+        if number is None:
+            return False
+        del self.stamps[note_id]
+        self.ids[number] = None
+        self.total_length -= self.lengths[number]
+        self.lengths[number] = 0
+        for term in self.doc_terms[number]:
+            numbers, tfs = self.postings[term]
+            i = bisect.bisect_left(numbers, number)
+            del numbers[i], tfs[i]
+            if not numbers:
+                del self.postings[term]
+                if self.vocab is not None:
+                    del self.vocab[bisect.bisect_left(self.vocab, term)]
+        for tag in self.doc_tags[number]:
+            self.tags[tag].discard(number)
+            if not self.tags[tag]:
+                del self.tags[tag]
+        self.doc_terms[number] = self.doc_tags[number] = ()
+        return True
+
+    # ── Queries ──────────────────────────────────────────────────────────────
+
+    def expand(self, word: str) -> list[str]:
+        """The word itself plus its most frequent completions."""
+        if len(word) < MIN_PREFIX:
+            return [word] if word in self.postings else []
+        if self.vocab is None:
+            self.vocab = sorted(self.postings)
+        lo = bisect.bisect_left(self.vocab, word)
+        hi = bisect.bisect_left(self.vocab, word + "\U0010ffff", lo)
+        terms = self.vocab[lo:hi]
+        if len(terms) > PREFIX_EXPANSIONS:
+            terms = heapq.nlargest(PREFIX_EXPANSIONS, terms, key=lambda t: len(self.postings[t][0]))
+            if word in self.postings and word not in terms:
+                terms.append(word)
+        return terms
+
+    def term_frequencies(self, terms: list[str]) -> dict[int, int]:
+        """note number → summed tf over `terms`."""
+        lists = sorted((self.postings[t] for t in terms), key=lambda p: len(p[0]), reverse=True)
+        if not lists:
+            return {}
+        tf = dict(zip(*lists[0]))
+        get = tf.get
+        for numbers, counts in lists[1:]:
+            for number, count in zip(numbers, counts):
+                tf[number] = get(number, 0) + count
+        return tf
+
+    def search(self, words: list[str], tag: str | None) -> list[int] | None:
+        candidates = set(self.tags.get(tag.lower(), ())) if tag else None
+        if not words:
+            return sorted(candidates) if candidates is not None else None
+
+        per_word = []
+        for word in words:
+            tf = self.term_frequencies(self.expand(word))
+            per_word.append(tf)
+            candidates = set(tf) if candidates is None else candidates.intersection(tf)
+            if not candidates:
+                return []
+
+        n = len(self.numbers)
+        avgdl = self.total_length / n if n else 1.0
+        lengths = self.lengths
+        # BM25 length normalisation, K1 * (1 - B + B * length / avgdl), as a + c * length
+        a, c = K1 * (1 - B), K1 * B / avgdl
+        scores = dict.fromkeys(candidates, 0.0)
+        for tf in per_word:
+            w = (K1 + 1) * math.log(1 + (n - len(tf) + 0.5) / (len(tf) + 0.5))
+            for number in candidates:
+                f = tf[number]
+                scores[number] += w * f / (f + a + c * lengths[number])
+        return sorted(scores, key=scores.__getitem__, reverse=True)
+
+    # ── Snapshots ────────────────────────────────────────────────────────────
+
+    def dump(self) -> bytes:
+        return marshal.dumps({
+            "format": SNAPSHOT_FORMAT,
+            "typecode": array("I").itemsize,
+            "ids": self.ids,
+            "stamps": self.stamps,
+            "lengths": self.lengths.tobytes(),
+            "doc_terms": self.doc_terms,
+            "doc_tags": self.doc_tags,
+            "postings": {t: (n.tobytes(), f.tobytes()) for t, (n, f) in self.postings.items()},
+        })
+
+    @classmethod
+    def load(cls, blob: bytes) -> "_Index":
+        state = marshal.loads(blob)
+        if state.get("format") != SNAPSHOT_FORMAT or state.get("typecode") != array("I").itemsize:
+            raise ValueError("snapshot format changed")
+        index = cls()
+        index.ids = state["ids"]
+        index.numbers = {note_id: i for i, note_id in enumerate(index.ids) if note_id is not None}
+        index.stamps = state["stamps"]
+        index.lengths = array("I", state["lengths"])
+        index.total_length = sum(index.lengths)
+        index.doc_terms = state["doc_terms"]
+        index.doc_tags = state["doc_tags"]
+        for term, (numbers, tfs) in state["postings"].items():
+            index.postings[term] = (array("I", numbers), array("I", tfs))
+        for number, tags in enumerate(index.doc_tags):
+            for tag in tags:
+                index.tags.setdefault(tag, set()).add(number)
+        return index
+
+
+_index: _Index | None = None
+_synced_version = None    # jsonstore version of notes.json the index matches
+_snapshot_timer: threading.Timer | None = None
+_dirty = False
+
+
+def _get() -> _Index:
+    global _index
+    if _index is None:
+        try:
+            _index = _Index.load(SNAPSHOT_FILE.read_bytes())
+        except FileNotFoundError:
+            _index = _Index()
+        except Exception as e:
+            print(f"[notes] Ignoring unreadable index snapshot: {e}")
+            _index = _Index()
+    return _index
+
+
+def _changed() -> None:
+    global _dirty, _snapshot_timer
+    _dirty = True
+    if _snapshot_timer is None:
+        _snapshot_timer = threading.Timer(SNAPSHOT_DELAY, snapshot)
+        _snapshot_timer.daemon = True
+        _snapshot_timer.start()
+
+
+def snapshot() -> None:
+    """Write the index to SNAPSHOT_FILE now if it changed since the last write."""
+    global _dirty, _snapshot_timer
+    with _lock:
+        _snapshot_timer = None
+        if not _dirty or _index is None:
+            return
+        blob = _index.dump()
+        _dirty = False
+    directory = os.fspath(SNAPSHOT_FILE.parent)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, SNAPSHOT_FILE)
+    except OSError as e:
+        print(f"[notes] Index snapshot failed: {e}")
+
+
+atexit.register(snapshot)
+
+
+# ── Keeping in step with notes.json ──────────────────────────────────────────
+
+def index_note(note: dict) -> None:
+    """Add a note, or re-index it after an edit."""
+    with _lock:
+        _get().add(note)
+        _changed()
+
+
+def remove_note(note_id: str) -> None:
+    with _lock:
+        if _get().remove(note_id):
+            _changed()
+
+
+def advance(before: int, after: int) -> None:
+    """Our own write took notes.json from `before` to `after`; still in sync if we were."""
+    global _synced_version
+    if _synced_version == before:
+        _synced_version = after
+
+
+def sync(notes: list[dict], version: int) -> None:
+    """Bring the index up to date with `notes` unless it already matches `version`."""
+    global _synced_version
+    if version == _synced_version:
+        return
+    with _lock:
+        if version == _synced_version:
+            return
+        index = _get()
+        live = {n["id"] for n in notes}
+        stale = [n for n in notes if index.stamps.get(n["id"]) != _stamp(n)]
+        gone = [note_id for note_id in index.numbers if note_id not in live]
+        if stale or gone:
+            if len(stale) + len(gone) > len(index.numbers) // 2:
+                index = _index_from_scratch(notes)
+            else:
+                for note_id in gone:
+                    index.remove(note_id)
+                for note in stale:
+                    index.add(note)
+            _changed()
+            print(f"[notes] Index synced: {len(stale)} changed, {len(gone)} removed")
+        _synced_version = version
+
+
+def _index_from_scratch(notes: list[dict]) -> _Index:
+    global _index
+    _index = _Index()
+    for note in notes:
+        _index.add(note)
+    return _index
+
+
+# ── Search ───────────────────────────────────────────────────────────────────
+
+def search(query: str | None = None, tag: str | None = None) -> list[str] | None:
+    """Ids of notes matching every query word (best first) and the tag.
+
+    Tag-only searches come back in creation order. Returns None when there is
+    nothing the index can filter on (no tag, and no words in the query).
+    """
+    words = list(dict.fromkeys(tokenize(query or "")))
+    with _lock:
+        index = _get()
+        numbers = index.search(words, tag)
+        if numbers is None:
+            return None
+        return [index.ids[number] for number in numbers]
+
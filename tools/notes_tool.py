@@ -1,25 +1,39 @@
-import json
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from pathlib import Path
 
+from . import jsonstore, notes_index, semantic_index
 from .config import DATA_DIR
 NOTES_FILE = DATA_DIR / "notes.json"
+SEARCH_LIMIT = 50  # ranked search results listed; the rest are counted
 
 
 def _load() -> dict:
-    if NOTES_FILE.exists():
-        return json.loads(NOTES_FILE.read_text())
-    return {"notes": []}
+    return jsonstore.load(NOTES_FILE, {"notes": []})
 
 
-def _save(data: dict) -> None:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    NOTES_FILE.write_text(json.dumps(data, indent=2))
+@contextmanager
+def _update():
+    """Read-modify-write notes.json; callers update the search indexes inside the block."""
+    with jsonstore.update(NOTES_FILE, {"notes": []}) as data:
+        before = jsonstore.version(NOTES_FILE)
+        yield data
+    after = jsonstore.version(NOTES_FILE)
+    notes_index.advance(before, after)
+    semantic_index.advance("notes", before, after)
+
+
+def _indexed(note: dict) -> None:
+    notes_index.index_note(note)
+    semantic_index.index_note(note)
+
+
+def _unindexed(note_id: str) -> None:
+    notes_index.remove_note(note_id)
+    semantic_index.remove_note(note_id)
 
 
 def create_note(title: str, content: str, tags: list = None) -> str:
-    data = _load()
     note = {
         "id": str(uuid.uuid4())[:8],
         "title": title,
@@ -28,8 +42,9 @@ def create_note(title: str, content: str, tags: list = None) -> str:
         "created_at": datetime.now().isoformat(),
         "updated_at": datetime.now().isoformat(),
     }
-    data["notes"].append(note)
-    _save(data)
+    with _update() as data:
+        data["notes"].append(note)
+        _indexed(note)
     return f"Note created: '{title}' (ID: {note['id']})"
 
 
@@ -37,11 +52,20 @@ def list_notes(search: str = None, tag: str = None) -> str:
     data = _load()
     notes = data["notes"]
 
-    if tag:
-        notes = [n for n in notes if tag.lower() in [t.lower() for t in n.get("tags", [])]]
-    if search:
-        q = search.lower()
-        notes = [n for n in notes if q in n["title"].lower() or q in n["content"].lower()]
+    more = 0
+    if tag or search:
+        notes_index.sync(notes, jsonstore.version(NOTES_FILE))
+        ids = notes_index.search(search, tag)
+        if ids is None:  # query has no words to look up: plain substring scan
+            q = search.lower()
+            notes = [n for n in notes if q in n["title"].lower() or q in n["content"].lower()]
+        elif notes_index.tokenize(search or ""):
+            more = max(0, len(ids) - SEARCH_LIMIT)
+            rank = {note_id: i for i, note_id in enumerate(ids[:SEARCH_LIMIT])}
+            notes = sorted((n for n in notes if n["id"] in rank), key=lambda n: rank[n["id"]])
+        else:
+            keep = set(ids)
+            notes = [n for n in notes if n["id"] in keep]
 
     if not notes:
         return "No notes found."
@@ -56,6 +80,8 @@ def list_notes(search: str = None, tag: str = None) -> str:
             preview += "..."
         lines.append(f"    {preview}")
         lines.append("")
+    if more:
+        lines.append(f"...and {more} more matches. Add words to narrow the search.")
     return "\n".join(lines)
 
 
@@ -83,26 +109,26 @@ def read_note(note_id: str = None, title: str = None) -> str:
 
 def update_note(note_id: str, title: str = None, content: str = None,
                 tags: list = None) -> str:
-    data = _load()
-    for note in data["notes"]:
-        if note["id"] == note_id:
-            if title:
-                note["title"] = title
-            if content is not None:
-                note["content"] = content
-            if tags is not None:
-                note["tags"] = tags
-            note["updated_at"] = datetime.now().isoformat()
-            _save(data)
-            return f"Note {note_id} updated."
+    with _update() as data:
+        for note in data["notes"]:
+            if note["id"] == note_id:
+                if title:
+                    note["title"] = title
+                if content is not None:
+                    note["content"] = content
+                if tags is not None:
+                    note["tags"] = tags
+                note["updated_at"] = datetime.now().isoformat()
+                _indexed(note)
+                return f"Note {note_id} updated."
     return f"Note '{note_id}' not found."
 
 
 def delete_note(note_id: str) -> str:
-    data = _load()
-    before = len(data["notes"])
-    data["notes"] = [n for n in data["notes"] if n["id"] != note_id]
-    if len(data["notes"]) == before:
-        return f"No note found with ID '{note_id}'."
-    _save(data)
+    with _update() as data:
+        before = len(data["notes"])
+        data["notes"] = [n for n in data["notes"] if n["id"] != note_id]
+        if len(data["notes"]) == before:
+            return f"No note found with ID '{note_id}'."
+        _unindexed(note_id)
     return f"Note {note_id} deleted."
@@ -0,0 +1,68 @@
+"""Prompt-caching helpers for the agent loops.
+
+Requests are laid out so the prefix is byte-stable across loop iterations and
+turns: tools → static system prompt → history. A cache breakpoint is placed
+after each of those; anything that changes per request (today's date) goes
+after the system breakpoint so it never invalidates the cached prefix.
+Per-turn additions to the user's message (relevant memories) are kept
+behind the history breakpoint for the same reason, since the stored
+history doesn't have them.
+"""
+
+from . import metrics
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def cached_tools(tools: list) -> list:
+    """Copy of a tool list with a breakpoint on the last definition."""
+    if not tools:
+        return tools
+    return tools[:-1] + [{**tools[-1], "cache_control": CACHE_CONTROL}]
+
+
+def cached_system(static: str, dynamic: str | None = None) -> list:
+    """System blocks: cached static prompt, then an uncached dynamic suffix."""
+    blocks = [{"type": "text", "text": static, "cache_control": CACHE_CONTROL}]
+    if dynamic:
+        blocks.append({"type": "text", "text": dynamic})
+    return blocks
+
+
+def with_history_breakpoint(messages: list, uncached: dict | None = None) -> list:
+    """Copy of `messages` with a breakpoint on the last block of the last message.
+
+    If that block is `uncached` (something sent this turn only), the
+    breakpoint goes on the block before it instead, so the cached prefix
+    matches the history as stored. The stored message list is left
+    untouched, so breakpoints never pile up past the API limit as the loop
+    appends tool results.
+    """
+    if not messages:
+        return messages
+    last = messages[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = list(content)
+    i = len(blocks) - 1
+    if uncached is not None and i > 0 and blocks[i] is uncached:
+        i -= 1
+    if i < 0 or not isinstance(blocks[i], dict):
+        return messages
+    blocks[i] = {**blocks[i], "cache_control": CACHE_CONTROL}
+    return messages[:-1] + [{**last, "content": blocks}]
+
+
+def record_usage(scope: str, usage) -> dict:
+    """Add one response's token usage to metrics under `scope`; returns the counts."""
+    counts = {
+        "input": getattr(usage, "input_tokens", 0) or 0,
+        "cache_read": getattr(usage, "cache_read_input_tokens", 0) or 0,
+        "cache_write": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        "output": getattr(usage, "output_tokens", 0) or 0,
+    }
+    for key, value in counts.items():
+        metrics.incr(f"{scope}.tokens.{key}", value)
+    return counts
@@ -0,0 +1,294 @@
+"""The one reminder store, shared by the reminder tools and the API server.
+
+Reminders live in DATA_DIR/reminders.db (SQLite, WAL) with their due time
+parsed once, at write time, into an epoch `due_ts`; listing and dispatch
+read it through indexes ordered by due time instead of re-parsing every
+record. `due_at` keeps the time as the user gave it, for display.
+
+In-process writers notify subscribers (the server's reminder scheduler), so
+a reminder set from /chat is armed immediately; other processes' writes show
+up as a change in data_version(), a counter every write bumps. The legacy reminders.json — either the
+tool format ({"reminders": [...]}) or the server's bare list with due_ts — is
+imported once on first open.
+"""
+
+import json
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable
+
+from .config import DATA_DIR
+
+DB_FILE = DATA_DIR / "reminders.db"
+LEGACY_FILE = DATA_DIR / "reminders.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reminders (
+    id           TEXT PRIMARY KEY,
+    title        TEXT NOT NULL,
+    description  TEXT NOT NULL DEFAULT '',
+    due_at       TEXT NOT NULL,
+    due_ts       REAL,
+    done         INTEGER NOT NULL DEFAULT 0,
+    sent         INTEGER NOT NULL DEFAULT 0,
+    created_at   TEXT NOT NULL,
+    completed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reminders_open ON reminders(done, due_ts);
+CREATE INDEX IF NOT EXISTS idx_reminders_unsent ON reminders(due_ts) WHERE done = 0 AND sent = 0;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+_subscribers: list[Callable[[str, float | None], None]] = []
+
+
+def parse_due(datetime_str: str) -> float | None:
+    """Epoch seconds for an ISO date/time (naive = local time), or None if unparseable."""
+    try:
+        return datetime.fromisoformat(datetime_str).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+# ── Connection handling ──────────────────────────────────────────────────────
+
+def _conn() -> sqlite3.Connection:
+    global _initialized
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        DB_FILE.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(DB_FILE, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+        with _init_lock:
+            if not _initialized:
+                conn.executescript(SCHEMA)
+                _import_legacy(conn)
+                _initialized = True
+    return conn
+
+
+@contextmanager
+def _tx():
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        _bump_version(conn)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _bump_version(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES ('version', '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+
+
+def data_version() -> int:
+    """Counter bumped by every committed write, read the same from any connection or process."""
+    row = _conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def subscribe(callback: Callable[[str, float | None], None]) -> None:
+    """Call `callback(id, due_ts)` after each in-process change; due_ts None = nothing to send."""
+    _subscribers.append(callback)
+
+
+def _notify(reminder: dict | None, reminder_id: str) -> None:
+    armed = reminder is not None and not reminder["done"] and not reminder["sent"]
+    due_ts = reminder["due_ts"] if armed else None
+    for callback in _subscribers:
+        callback(reminder_id, due_ts)
+
+
+def _row(row: sqlite3.Row) -> dict:
+    reminder = dict(row)
+    reminder["done"] = bool(reminder["done"])
+    reminder["sent"] = bool(reminder["sent"])
+    return reminder
+
+
+# ── Reminders ────────────────────────────────────────────────────────────────
+
+def add(title: str, due_at: str | None = None, due_ts: float | None = None,
+        description: str = "") -> dict:
+    """Create a reminder from an ISO `due_at` or an epoch `due_ts` (one is enough)."""
+    if due_ts is None:
+        due_ts = parse_due(due_at)
+    elif due_at is None:
+        due_at = datetime.fromtimestamp(due_ts).isoformat(timespec="minutes")
+    reminder = {
+        "id": str(uuid.uuid4())[:8],
+        "title": title,
+        "description": description or "",
+        "due_at": due_at or "",
+        "due_ts": due_ts,
+        "done": False,
+        "sent": False,
+        "created_at": datetime.now().isoformat(),
+        "completed_at": None,
+    }
+    with _tx() as conn:
+        conn.execute(
+            "INSERT INTO reminders (id, title, description, due_at, due_ts, done, sent, "
+            "created_at, completed_at) VALUES (:id, :title, :description, :due_at, :due_ts, "
+            ":done, :sent, :created_at, :completed_at)",
+            reminder,
+        )
+    _notify(reminder, reminder["id"])
+    return reminder
+
+
+def get(reminder_id: str) -> dict | None:
+    row = _conn().execute("SELECT * FROM reminders WHERE id = ?", (reminder_id,)).fetchone()
+    return _row(row) if row else None
+
+
+def update(reminder_id: str, title: str | None = None, due_at: str | None = None,
+           due_ts: float | None = None, description: str | None = None) -> dict | None:
+    """Edit a reminder; a new due time re-arms it for sending. None if missing."""
+    with _tx() as conn:
+        row = conn.execute("SELECT * FROM reminders WHERE id = ?", (reminder_id,)).fetchone()
+        if not row:
+            return None
+        reminder = _row(row)
+        if title is not None:
+            reminder["title"] = title
+        if description is not None:
+            reminder["description"] = description
+        if due_at is not None or due_ts is not None:
+            reminder["due_at"] = due_at or datetime.fromtimestamp(due_ts).isoformat(timespec="minutes")
+            reminder["due_ts"] = due_ts if due_ts is not None else parse_due(due_at)
+            reminder["sent"] = False
+        conn.execute(
+            "UPDATE reminders SET title = ?, description = ?, due_at = ?, due_ts = ?, sent = ? "
+            "WHERE id = ?",
+            (reminder["title"], reminder["description"], reminder["due_at"],
+             reminder["due_ts"], int(reminder["sent"]), reminder_id),
+        )
+    _notify(reminder, reminder_id)
+    return reminder
+
+
+def complete(reminder_id: str) -> dict | None:
+    with _tx() as conn:
+        conn.execute(
+            "UPDATE reminders SET done = 1, completed_at = ? WHERE id = ?",
+            (datetime.now().isoformat(), reminder_id),
+        )
+        row = conn.execute("SELECT * FROM reminders WHERE id = ?", (reminder_id,)).fetchone()
+    reminder = _row(row) if row else None
+    if reminder:
+        _notify(reminder, reminder_id)
+    return reminder
+
+
+def delete(reminder_id: str) -> bool:
+    with _tx() as conn:
+        deleted = conn.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,)).rowcount > 0
+    if deleted:
+        _notify(None, reminder_id)
+    return deleted
+
+
+def open_reminders() -> list[dict]:
+    """Reminders not yet done, by due time (unparseable times last)."""
+    rows = _conn().execute(
+        "SELECT * FROM reminders WHERE done = 0 ORDER BY due_ts IS NULL, due_ts"
+    ).fetchall()
+    return [_row(r) for r in rows]
+
+
+def all_reminders() -> list[dict]:
+    rows = _conn().execute("SELECT * FROM reminders ORDER BY due_ts IS NULL, due_ts").fetchall()
+    return [_row(r) for r in rows]
+
+
+def unsent(due_before: float | None = None) -> list[tuple[str, float]]:
+    """(id, due_ts) of open reminders still to be pushed, in due order."""
+    sql = "SELECT id, due_ts FROM reminders WHERE done = 0 AND sent = 0 AND due_ts IS NOT NULL"
+    args: tuple = ()
+    if due_before is not None:
+        sql += " AND due_ts <= ?"
+        args = (due_before,)
+    rows = _conn().execute(sql + " ORDER BY due_ts", args).fetchall()
+    return [(r["id"], r["due_ts"]) for r in rows]
+
+
+def claim(reminder_id: str) -> dict | None:
+    """Mark one reminder sent. Returns it only if this call made the change."""
+    with _tx() as conn:
+        if not conn.execute(
+            "UPDATE reminders SET sent = 1 WHERE id = ? AND done = 0 AND sent = 0",
+            (reminder_id,),
+        ).rowcount:
+            return None
+        row = conn.execute("SELECT * FROM reminders WHERE id = ?", (reminder_id,)).fetchone()
+    return _row(row)
+
+
+# ── Legacy JSON import ───────────────────────────────────────────────────────
+
+def _import_legacy(conn: sqlite3.Connection) -> None:
+    if not LEGACY_FILE.exists() or conn.execute(
+        "SELECT 1 FROM meta WHERE key = 'imported:reminders.json'"
+    ).fetchone():
+        return
+    try:
+        data = json.loads(LEGACY_FILE.read_text())
+    except (OSError, ValueError) as e:
+        print(f"[reminders] Could not read {LEGACY_FILE}: {e}")
+        return
+    records = data.get("reminders", []) if isinstance(data, dict) else data
+    now = datetime.now().timestamp()
+    rows = []
+    for r in records:
+        if not isinstance(r, dict):
+            continue
+        if "due_ts" in r:  # server format: {text, due_ts, sent}
+            due_ts = float(r["due_ts"])
+            due_at = datetime.fromtimestamp(due_ts).isoformat(timespec="minutes")
+            sent = bool(r.get("sent"))
+        else:              # tool format: {title, datetime, description, done}
+            due_at = r.get("datetime", "")
+            due_ts = parse_due(due_at)
+            # never pushed before; don't flood the phone with ones already past due
+            sent = due_ts is not None and due_ts < now
+        rows.append((
+            r.get("id") or str(uuid.uuid4())[:8],
+            r.get("title") or r.get("text") or "Reminder",
+            r.get("description", ""),
+            due_at,
+            due_ts,
+            int(bool(r.get("done"))),
+            int(sent),
+            r.get("created_at") or datetime.now().isoformat(),
+            r.get("completed_at"),
+        ))
+    conn.execute("BEGIN IMMEDIATE")
+    conn.executemany(
+        "INSERT OR IGNORE INTO reminders (id, title, description, due_at, due_ts, done, sent, "
+        "created_at, completed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.execute("INSERT INTO meta (key, value) VALUES ('imported:reminders.json', 'true')")
+    _bump_version(conn)
+    conn.execute("COMMIT")
+    print(f"[reminders] Imported {len(rows)} reminders from {LEGACY_FILE.name}")
@@ -1,6 +1,7 @@
 """Research sub-agent: performs multi-step web research and returns a synthesized report."""
 
 import anthropic
+from .prompt_cache import cached_system, cached_tools, record_usage, with_history_breakpoint
 from .web_search import web_search
 
 _client = anthropic.Anthropic()
@@ -48,9 +49,14 @@ def run_research(task: str, depth: str = "thorough") -> str:
             model="claude-opus-4-6",
             max_tokens=8192,
             thinking={"type": "adaptive"},
-            system=RESEARCH_SYSTEM,
-            tools=RESEARCH_TOOLS,
-            messages=messages,
+            system=cached_system(RESEARCH_SYSTEM),
+            tools=cached_tools(RESEARCH_TOOLS),
+            messages=with_history_breakpoint(messages),
+        )
+        tokens = record_usage("research", response.usage)
+        print(
+            f"[research] input tokens: {tokens['cache_read']} cached, "
+            f"{tokens['cache_write']} cache-written, {tokens['input']} uncached"
         )
 
         if response.stop_reason == "end_turn":
@@ -0,0 +1,312 @@
+"""Local semantic index over notes, memories and workspace files.
+
+Text is embedded without a model or network call, using the hashing trick.
+Each word and its character trigrams are hashed with a sign into a sparse
+2**20-bucket vector, which is log-scaled and L2-normalised. Trigrams let
+related forms and typos match ("meeting" / "meetings" / "meetng"). At query
+time rare features weigh more (idf), and only the query's most informative
+features are looked up. Documents are split into overlapping chunks of
+CHUNK_WORDS words, so a hit points at the passage that matched.
+
+Vectors are held in memory as posting lists (bucket → chunk numbers and
+weights), so a query only touches the chunks sharing one of its features.
+The index is built at server startup, or else on the first search. After
+that the notes and memory tools update it as they write, writes made
+elsewhere are caught through jsonstore.version(), and changed workspace
+files are found by an mtime/size check at each search.
+"""
+
+import bisect
+import hashlib
+import heapq
+import math
+import os
+import re
+import threading
+import zlib
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+
+from . import jsonstore
+from .config import WORKSPACE_DIR
+
+SOURCES = ("notes", "memory", "files")
+DIM_BITS = 20
+CHUNK_WORDS = 60
+CHUNK_OVERLAP = 15
+TRIGRAM_WEIGHT = 0.5
+MAX_FEATURES = 256       # strongest features kept per chunk
+QUERY_FEATURES = 48      # most informative query features looked up
+MIN_SCORE = 0.05         # cosine below which a hit is noise
+SNIPPET_CHARS = 300
+MAX_FILE_SIZE = 1_000_000
+
+_WORD = re.compile(r"\w+")
+_MASK = (1 << DIM_BITS) - 1
+_lock = threading.RLock()
+
+
+# ── Embedding ────────────────────────────────────────────────────────────────
+
+@lru_cache(maxsize=200_000)
+def _word_features(word: str) -> tuple[tuple[int, float], ...]:
+    """Signed (bucket, weight) pairs for a word and its character trigrams."""
+    padded = f"<{word}>"
+    grams = [(f"w:{word}", 1.0)]
+    grams += [(padded[i:i + 3], TRIGRAM_WEIGHT) for i in range(len(padded) - 2)]
+    features = []
+    for gram, weight in grams:
+        h = zlib.crc32(gram.encode())
+        features.append(((h >> 1) & _MASK, -weight if h & 1 else weight))
+    return tuple(features)
+
+
+def _embed(words, limit: int = MAX_FEATURES) -> dict[int, float]:
+    counts: dict[int, float] = defaultdict(float)
+    for word in words:
+        for bucket, weight in _word_features(word):
+            counts[bucket] += weight
+    vec = [(b, math.copysign(math.log1p(abs(v)), v)) for b, v in counts.items() if v]
+    if len(vec) > limit:
+        vec = heapq.nlargest(limit, vec, key=lambda item: abs(item[1]))
+    norm = math.sqrt(sum(w * w for _, w in vec)) or 1.0
+    return {b: w / norm for b, w in vec}
+
+
+def _chunks(text: str) -> list[tuple[list[str], str]]:
+    """(words, snippet) for each overlapping window of CHUNK_WORDS words."""
+    matches = list(_WORD.finditer(text))
+    step = CHUNK_WORDS - CHUNK_OVERLAP
+    chunks = []
+    for start in range(0, max(len(matches) - CHUNK_OVERLAP, 1), step):
+        window = matches[start:start + CHUNK_WORDS]
+        if not window:
+            break
+        snippet = " ".join(text[window[0].start():window[-1].end()].split())
+        if len(snippet) > SNIPPET_CHARS:
+            snippet = snippet[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "..."
+        chunks.append(([m.group().lower() for m in window], snippet))
+    return chunks
+
+
+def _hash(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+# ── Index ────────────────────────────────────────────────────────────────────
+
+class _Index:
+    """Chunks get increasing numbers; a removed document leaves holes."""
+
+    def __init__(self):
+        self.docs: dict[tuple, tuple] = {}           # key → (stamp, label, chunk numbers)
+        self.chunk_docs: list[tuple | None] = []     # number → document key
+        self.chunk_snippets: list[str] = []
+        self.chunk_buckets: list[array] = []         # number → its buckets, for removal
+        self.postings: dict[int, tuple[array, array]] = {}  # bucket → (numbers ascending, weights)
+        self.live_chunks = 0
+
+    def add(self, key: tuple, stamp, label: str, text: str) -> None:
+        self.remove(key)
+        numbers = []
+        for words, snippet in _chunks(text):
+            vec = _embed(words)
+            number = len(self.chunk_docs)
+            self.chunk_docs.append(key)
+            self.chunk_snippets.append(snippet)
+            self.chunk_buckets.append(array("I", vec))
+            for bucket, weight in vec.items():
+                posting = self.postings.get(bucket)
+                if posting is None:
+                    posting = self.postings[bucket] = (array("I"), array("f"))
+                posting[0].append(number)
+                posting[1].append(weight)
+            numbers.append(number)
+        self.live_chunks += len(numbers)
+        self.docs[key] = (stamp, label, numbers)
+
+    def remove(self, key: tuple) -> None:
+        doc = self.docs.pop(key, None)
+        if doc is None:
+            return
+        for number in doc[2]:
+            for bucket in self.chunk_buckets[number]:
+                numbers, weights = self.postings[bucket]
+                i = bisect.bisect_left(numbers, number)
+                del numbers[i], weights[i]
+                if not numbers:
+                    del self.postings[bucket]
+            self.chunk_docs[number] = None
+            self.chunk_snippets[number] = ""
+            self.chunk_buckets[number] = array("I")
+        self.live_chunks -= len(doc[2])
+
+    def reconcile(self, source: str, current: dict) -> None:
+        """Match `source` to `current`: key → (stamp, label, load_text)."""
+        for key in [k for k in self.docs if k[0] == source and k not in current]:
+            self.remove(key)
+        for key, (stamp, label, load_text) in current.items():
+            if key not in self.docs or self.docs[key][0] != stamp:
+                text = load_text()
+                if text is None:
+                    self.remove(key)
+                else:
+                    self.add(key, stamp, label, text)
+
+    def search(self, query: str, k: int, sources) -> list[tuple[float, tuple, str, str]]:
+        n = self.live_chunks
+        query_vec = _embed(_WORD.findall(query.lower()), limit=1 << DIM_BITS)
+        weighted = []
+        for bucket, weight in query_vec.items():
+            posting = self.postings.get(bucket)
+            if posting is not None:
+                # Smoothed idf stays positive, so a feature in every chunk (or the
+                # only chunk) still counts, just least
+                weighted.append((bucket, weight * math.log(1 + (n + 1) / (len(posting[0]) + 1))))
+        weighted = heapq.nlargest(QUERY_FEATURES, weighted, key=lambda item: abs(item[1]))
+        norm = math.sqrt(sum(w * w for _, w in weighted)) or 1.0
+
+        scores: dict[int, float] = defaultdict(float)
+        for bucket, weight in weighted:
+            numbers, weights = self.postings[bucket]
+            w = weight / norm
+            for number, dw in zip(numbers, weights):
+                scores[number] += w * dw
+
+        best: dict[tuple, tuple[float, int]] = {}   # one hit (its best chunk) per document
+        for number, score in scores.items():
+            key = self.chunk_docs[number]
+            if key[0] in sources and score >= MIN_SCORE and score > best.get(key, (0.0, 0))[0]:
+                best[key] = (score, number)
+        top = heapq.nlargest(k, best.items(), key=lambda item: item[1][0])
+        return [(score, key, self.docs[key][1], self.chunk_snippets[number])
+                for key, (score, number) in top]
+
+
+_index: _Index | None = None
+_synced: dict[str, int] = {}   # source → jsonstore version the index matches
+
+
+# ── Sources ──────────────────────────────────────────────────────────────────
+
+def _note_doc(note: dict) -> tuple:
+    """(key, stamp, label, text) for a note."""
+    text = f"{note.get('title', '')}\n{note.get('content', '')}"
+    return ("notes", note["id"]), _hash(text), f"note {note['id']}: {note.get('title', '')}", text
+
+
+def _memory_doc(category: str, key: str, value) -> tuple:
+    text = f"{key}: {value}"
+    return ("memory", category, key), _hash(text), f"memory [{category}] {key}", text
+
+
+def _sync_json(index: _Index, source: str, path, docs) -> None:
+    version = jsonstore.version(path)
+    if _synced.get(source) == version:
+        return
+    current = {key: (stamp, label, lambda text=text: text) for key, stamp, label, text in docs()}
+    index.reconcile(source, current)
+    _synced[source] = version
+
+
+def _sync_notes(index: _Index) -> None:
+    from .notes_tool import NOTES_FILE
+    _sync_json(index, "notes", NOTES_FILE, lambda: [
+        _note_doc(note) for note in jsonstore.load(NOTES_FILE, {"notes": []})["notes"]
+    ])
+
+
+def _sync_memory(index: _Index) -> None:
+    from .memory_tool import MEMORY_FILE
+    _sync_json(index, "memory", MEMORY_FILE, lambda: [
+        _memory_doc(category, key, entry.get("value", ""))
+        for category, entries in jsonstore.load(MEMORY_FILE, {"memories": {}})["memories"].items()
+        for key, entry in entries.items()
+    ])
+
+
+def _read_text(path: str) -> str | None:
+    try:
+        with open(path, "rb") as f:
+            data = f.read(MAX_FILE_SIZE + 1)
+    except OSError:
+        return None
+    if len(data) > MAX_FILE_SIZE or b"\0" in data[:1024]:
+        return None  # too large for read_file, or binary
+    return data.decode("utf-8", errors="replace")
+
+
+def _sync_files(index: _Index) -> None:
+    current = {}
+    if WORKSPACE_DIR.is_dir():
+        for root, dirs, files in os.walk(WORKSPACE_DIR):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in files:
+                if name.startswith("."):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if st.st_size > MAX_FILE_SIZE:
+                    continue
+                rel = os.path.relpath(path, WORKSPACE_DIR)
+                current[("files", rel)] = ((st.st_mtime_ns, st.st_size), f"file {rel}",
+                                           lambda path=path: _read_text(path))
+    index.reconcile("files", current)
+
+
+# ── Public API ───────────────────────────────────────────────────────────────
+
+def build() -> _Index:
+    """Build the index, or bring it up to date; the server warms it at startup."""
+    global _index
+    with _lock:
+        if _index is None:
+            _index = _Index()
+        _sync_notes(_index)
+        _sync_memory(_index)
+        _sync_files(_index)
+        return _index
+
+
+def search(query: str, k: int = 5, sources=None) -> list[dict]:
+    """Top-k documents for `query`, each with its best-matching snippet."""
+    sources = [s for s in (sources or SOURCES) if s in SOURCES] or list(SOURCES)
+    with _lock:
+        hits = build().search(query, k, set(sources))
+    return [{"source": key[0], "label": label, "score": score, "snippet": snippet}
+            for score, key, label, snippet in hits]
+
+
+def advance(source: str, before: int, after: int) -> None:
+    """Our own write took a source's file from `before` to `after`; still in sync if we were."""
+    with _lock:
+        if _synced.get(source) == before:
+            _synced[source] = after
+
+
+def index_note(note: dict) -> None:
+    with _lock:
+        if _index is not None:
+            _index.add(*_note_doc(note))
+
+
+def remove_note(note_id: str) -> None:
+    with _lock:
+        if _index is not None:
+            _index.remove(("notes", note_id))
+
+
+def index_memory(category: str, key: str, value) -> None:
+    with _lock:
+        if _index is not None:
+            _index.add(*_memory_doc(category, key, value))
+
+
+def remove_memory(category: str, key: str) -> None:
+    with _lock:
+        if _index is not None:
+            _index.remove(("memory", category, key))
@@ -0,0 +1,16 @@
+from . import semantic_index
+
+MAX_RESULTS = 20
+
+
+def semantic_search(query: str, k: int = 5, sources: list = None) -> str:
+    hits = semantic_index.search(query, k=max(1, min(k, MAX_RESULTS)), sources=sources)
+    if not hits:
+        return "No matches found."
+
+    lines = []
+    for hit in hits:
+        lines.append(f"[{hit['label']}] (score {hit['score']:.2f})")
+        lines.append(f"    {hit['snippet']}")
+        lines.append("")
+    return "\n".join(lines)